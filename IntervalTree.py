@@ -0,0 +1,210 @@
+from RedBlackTree import RedBlackTree, RBNode, Color
+
+class IntervalNode(RBNode):
+    """Node class for Interval tree"""
+    def __init__(self, lo, hi, value=None):
+        super().__init__((lo, hi))
+        self.value = value
+        self.max = hi  # Largest high endpoint in this subtree
+
+class IntervalTree(RedBlackTree):
+    """
+    Interval Tree built on top of the Red-Black tree.
+    Nodes are ordered by (lo, hi) and every node keeps the largest high
+    endpoint of its subtree, so overlap queries can skip whole subtrees.
+    Intervals are closed: [lo, hi].
+    Queries run in O(log n + k) where k is the number of reported intervals.
+    """
+
+    def __init__(self):
+        """Initialize empty Interval tree"""
+        super().__init__()
+        self.NIL.max = None
+
+    @classmethod
+    def from_sorted(cls, intervals):
+        """
+        Build a tree in O(n) from intervals sorted by (lo, hi).
+        Each item is either (lo, hi) or (lo, hi, value).
+        """
+        tree = cls()
+        items = [tuple(item) for item in intervals]
+        for prev, cur in zip(items, items[1:]):
+            if (prev[0], prev[1]) >= (cur[0], cur[1]):
+                raise ValueError("Intervals must be sorted by (lo, hi) without duplicates")
+        for item in items:
+            tree._check_interval(item[0], item[1])
+
+        # Black height of a balanced build is the number of full levels,
+        # nodes below that are colored red.
+        black_depth = (len(items) + 1).bit_length() - 1
+
+        def build(start, end, parent, depth):
+            if start >= end:
+                return tree.NIL
+            mid = (start + end) // 2
+            item = items[mid]
+            node = IntervalNode(item[0], item[1], item[2] if len(item) > 2 else None)
+            node.parent = parent
+            node.color = Color.BLACK if depth < black_depth else Color.RED
+            node.left = build(start, mid, node, depth + 1)
+            node.right = build(mid + 1, end, node, depth + 1)
+            tree._update_max(node)
+            return node
+
+        tree.root = build(0, len(items), None, 0)
+        if tree.root != tree.NIL:
+            tree.root.color = Color.BLACK
+        return tree
+
+    def insert(self, lo, hi, value=None):
+        """Insert interval [lo, hi]; re-inserting an interval replaces its value"""
+        self._check_interval(lo, hi)
+        existing = self._find_node((lo, hi))
+        if existing is not None:
+            existing.value = value
+            return
+
+        node = IntervalNode(lo, hi, value)
+        node.left = self.NIL
+        node.right = self.NIL
+
+        # Standard BST insert, widening max along the search path
+        y = None
+        x = self.root
+        while x != self.NIL:
+            y = x
+            if x.max < hi:
+                x.max = hi
+            if node.key < x.key:
+                x = x.left
+            else:
+                x = x.right
+
+        node.parent = y
+        if y == None:
+            self.root = node
+        elif node.key < y.key:
+            y.left = node
+        else:
+            y.right = node
+
+        self._fix_insert(node)
+
+    def delete(self, lo, hi):
+        """Delete interval [lo, hi] from the tree"""
+        z = self._find_node((lo, hi))
+        if z:
+            self._delete_node(z)
+
+    def _delete_node(self, z):
+        """Delete a node and repair max values on the affected path"""
+        # Lowest node whose subtree loses an element once z is unlinked
+        if z.left == self.NIL or z.right == self.NIL:
+            start = z.parent
+        else:
+            y = self._minimum(z.right)
+            start = y if y.parent == z else y.parent
+        super()._delete_node(z)
+        self._update_max_upward(start)
+
+    def _fix_delete(self, x):
+        """Repair max values before rebalancing so rotations see correct children"""
+        self._update_max_upward(x.parent)
+        super()._fix_delete(x)
+
+    def _left_rotate(self, x):
+        """Perform left rotation and recompute max of the rotated nodes"""
+        y = x.right
+        super()._left_rotate(x)
+        self._update_max(x)
+        self._update_max(y)
+
+    def _right_rotate(self, x):
+        """Perform right rotation and recompute max of the rotated nodes"""
+        y = x.left
+        super()._right_rotate(x)
+        self._update_max(x)
+        self._update_max(y)
+
+    def _update_max(self, node):
+        """Recompute max of a node from its own interval and its children"""
+        node.max = node.key[1]
+        if node.left != self.NIL and node.left.max > node.max:
+            node.max = node.left.max
+        if node.right != self.NIL and node.right.max > node.max:
+            node.max = node.right.max
+
+    def _update_max_upward(self, node):
+        """Recompute max from node up to the root"""
+        while node is not None and node != self.NIL:
+            self._update_max(node)
+            node = node.parent
+
+    def _check_interval(self, lo, hi):
+        """Validate interval endpoints"""
+        if lo is None or hi is None:
+            raise ValueError("Interval endpoints cannot be None")
+        if hi < lo:
+            raise ValueError(f"Invalid interval [{lo}, {hi}]: hi is smaller than lo")
+
+    def overlap(self, lo, hi=None):
+        """
+        Return intervals overlapping [lo, hi] as (lo, hi, value) tuples sorted by (lo, hi).
+        With a single argument, return intervals containing the point lo.
+        """
+        if hi is None:
+            hi = lo
+        self._check_interval(lo, hi)
+        result = []
+        self._overlap_recursive(self.root, lo, hi, result)
+        return result
+
+    def _overlap_recursive(self, node, lo, hi, result):
+        """Helper method for overlap queries"""
+        # Nothing in this subtree reaches lo
+        if node == self.NIL or node.max < lo:
+            return
+        self._overlap_recursive(node.left, lo, hi, result)
+        node_lo, node_hi = node.key
+        # Everything to the right starts after node_lo, so after hi as well
+        if node_lo > hi:
+            return
+        if node_hi >= lo:
+            result.append((node_lo, node_hi, node.value))
+        self._overlap_recursive(node.right, lo, hi, result)
+
+    def intervals(self):
+        """Return all intervals as (lo, hi, value) tuples sorted by (lo, hi)"""
+        result = []
+        self._intervals_recursive(self.root, result)
+        return result
+
+    def _intervals_recursive(self, node, result):
+        """Helper method for intervals"""
+        if node != self.NIL:
+            self._intervals_recursive(node.left, result)
+            result.append((node.key[0], node.key[1], node.value))
+            self._intervals_recursive(node.right, result)
+
+def main():
+    """Test Interval tree operations"""
+    ranges = [
+        (0x0000, 0x0FFF, "DRAM"),
+        (0xE000, 0xEFFF, "PCI ECAM"),
+        (0xF000, 0xF0FF, "NVMe BAR0"),
+        (0xF100, 0xF1FF, "NIC BAR0"),
+        (0xF0F0, 0xF10F, "NIC BAR2"),
+    ]
+    tree = IntervalTree()
+    for lo, hi, name in ranges:
+        tree.insert(lo, hi, name)
+    tree.draw_tree()
+
+    address = 0xF100
+    print(f"\nRanges containing {address:#06x}:")
+    for lo, hi, name in tree.overlap(address):
+        print(f"  [{lo:#06x}, {hi:#06x}] {name}")
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,37 @@
-import wmi
+import argparse
 import subprocess
+import sys
+from functools import partial
+from PCIe_backends import DeviceSnapshot, default_backend
+from PCIe_results import snapshot_records, update_state, write_jsonl
+from PCIe_stages import Stage, run_stages
 
 class PCIeDiagnostics:
-    def __init__(self):
+    def __init__(self, backend=None, log_file="PCIe_diagnostic_results.log", stage_timeout=300):
         """
-        Initialize the PCIeDiagnostics class.
+        Initialize the PCIeDiagnostics class. backend supplies the devices and
+        defaults to WMI on Windows and sysfs on Linux (see PCIe_backends).
+        log_file receives the wmic device dump; stage_timeout is the seconds
+        allowed to each external command run_all_diagnostics starts.
         """
-        self.wmi_client = wmi.WMI()
+        self.backend = backend or default_backend()
+        self.log_file = log_file
+        self.stage_timeout = stage_timeout
+        self.wmi_client = getattr(self.backend, "client", None)
+        self.snapshot = None
         self.pcie_devices = self.get_pci_devices()
 
     def get_pci_devices(self):
         """
-        Get information about all PCIe devices on the system using WMI.
+        Take a snapshot of all PCIe devices on the system and their drivers.
+        The checks below read this snapshot instead of querying the system.
         """
         try:
-            pci_devices = self.wmi_client.Win32_PnPEntity()
-            devices = []
-
-            for device in pci_devices:
-                if "PCI" in (device.PNPDeviceID or ""):  # Filter for PCI devices
-                    devices.append({
-                        "name": device.Name,
-                        "device_id": device.DeviceID,
-                        "status": device.Status,
-                        "pnp_device_id": device.PNPDeviceID
-                    })
-
-            return devices
+            self.snapshot = self.backend.snapshot()
         except Exception as e:
             print(f"An error occurred while accessing PCI devices: {e}")
-            return []
+            self.snapshot = DeviceSnapshot([], self.backend.name)
+        return self.snapshot.devices
 
     def diagnose_devices(self):
         """
@@ -53,24 +55,16 @@ class PCIeDiagnostics:
         """
         for device in self.pcie_devices:
             print(f"Checking driver for device: {device['name']}")
-            try:
-                drivers = self.wmi_client.query(
-                f"SELECT * FROM Win32_PnPSignedDriver WHERE DeviceID LIKE '%{device['pnp_device_id']}%'"
-            )            
-                if drivers:
-                    for driver in drivers:
-                        print(f"  Driver Name: {driver.Name}")
-                        print(f"  State: {driver.State}")
-                        print(f"  Status: {driver.Status}")
-                        if driver.State != "Running":
-                            print("  Issue: Driver is not running.")
-                else:
-                    print("  Issue: No driver found for this device.")
-            
-            except Exception as e:
-                print(f"  An error occurred while checking driver status: {e}")
-            finally:
-                print("-&-" * 40)
+            if device["drivers"]:
+                for driver in device["drivers"]:
+                    print(f"  Driver Name: {driver['name']}")
+                    print(f"  State: {driver['state']}")
+                    print(f"  Status: {driver['status']}")
+                    if driver["state"] != "Running":
+                        print("  Issue: Driver is not running.")
+            else:
+                print("  Issue: No driver found for this device.")
+            print("-&-" * 40)
 
     def check_hardware_errors(self):
         """
@@ -78,14 +72,13 @@ class PCIeDiagnostics:
         """
         for device in self.pcie_devices:
             print(f"Checking hardware status for device: {device['name']}")
-            if hasattr(device, "ConfigManagerErrorCode"):
-                error_code = device.ConfigManagerErrorCode
-                if error_code != 0:
-                    print(f"  Issue: Device has error code {error_code}.")
-                else:
-                    print("  No hardware errors detected.")
-            else:
+            error_code = device.get("error_code")
+            if error_code is None:
                 print("  Unable to retrieve hardware error status.")
+            elif error_code != 0:
+                print(f"  Issue: Device has error code {error_code}.")
+            else:
+                print("  No hardware errors detected.")
             print("-" * 40)
 
     def check_power_state(self):
@@ -94,10 +87,10 @@ class PCIeDiagnostics:
         """
         for device in self.pcie_devices:
             print(f"Checking power state for device: {device['name']}")
-            if hasattr(device, "PowerManagementCapabilities"):
-                power_state = device.PowerManagementCapabilities
+            power_state = device.get("power_state")
+            if power_state is not None:
                 print(f"  Power State: {power_state}")
-                if power_state == 0:
+                if power_state.startswith("D3"):
                     print("  Issue: Device is in a low-power state.")
             else:
                 print("  Unable to retrieve power state.")
@@ -109,89 +102,144 @@ class PCIeDiagnostics:
         """
         for device in self.pcie_devices:
             print(f"Checking power status for device: {device['name']}")
-            try:
-                # Check if the device supports power management
-                if hasattr(device, "PowerManagementSupported") and device.PowerManagementSupported:
-                    print("  Power Management: Supported")
-                else:
-                    print("  Power Management: Not Supported")
-
-                # Check the power management capabilities
-                if hasattr(device, "PowerManagementCapabilities") and device.PowerManagementCapabilities:
-                    capabilities = device.PowerManagementCapabilities
-                    print(f"  Power Management Capabilities: {capabilities}")
-                    if 1 in capabilities:
-                        print("  Device is in a low-power state.")
-                    else:
-                        print("  Device is in a normal power state.")
+            # Check if the device supports power management
+            if device.get("power_management_supported"):
+                print("  Power Management: Supported")
+            else:
+                print("  Power Management: Not Supported")
+
+            # Check the power management capabilities
+            capabilities = device.get("power_management_capabilities")
+            if capabilities:
+                print(f"  Power Management Capabilities: {capabilities}")
+                if 1 in capabilities:
+                    print("  Device is in a low-power state.")
                 else:
-                    print("  Power Management Capabilities: Not Available")
-            except Exception as e:
-                print(f"  An error occurred while checking power status: {e}")
+                    print("  Device is in a normal power state.")
+            else:
+                print("  Power Management Capabilities: Not Available")
             print("-" * 40)
 
+    def check_link_status(self):
+        """
+        Check for PCIe links trained below their maximum speed or width.
+        Needs a backend that reports link information (sysfs).
+        """
+        for device in self.pcie_devices:
+            if device.get("max_link_speed") is None and device.get("max_link_width") is None:
+                continue
+            print(f"Checking link for device: {device['name']} ({device['device_id']})")
+            print(f"  Speed: {device['current_link_speed']} of {device['max_link_speed']} GT/s")
+            print(f"  Width: x{device['current_link_width']} of x{device['max_link_width']}")
+            if (device["current_link_speed"] or 0) < (device["max_link_speed"] or 0):
+                print("  Issue: Link is running below its maximum speed.")
+            if (device["current_link_width"] or 0) < (device["max_link_width"] or 0):
+                print("  Issue: Link is running below its maximum width.")
+            print("-" * 40)
+
+    def check_aer_errors(self):
+        """
+        Check the Advanced Error Reporting counters of each PCIe device.
+        Needs a backend that reports AER counters (sysfs).
+        """
+        for device in self.pcie_devices:
+            if not device.get("aer"):
+                continue
+            errors = {kind: count for kind, count in device["aer"].items() if count}
+            if errors:
+                print(f"Device {device['name']} ({device['device_id']}) reported PCIe errors:")
+                for kind, count in errors.items():
+                    print(f"  {kind}: {count}")
+                print("-" * 40)
+
+    def _windows_only(self, check):
+        """Print a note and return True when a Windows tool cannot be used"""
+        if self.backend.windows:
+            return False
+        print(f"Skipping {check}: it needs Windows.")
+        return True
+
+    def query_event_logs(self, timeout=None):
+        """
+        Return the System event log entries about device problems (event IDs
+        9, 11 and 15) as printed by wevtutil.
+        """
+        result = subprocess.run(
+            ["wevtutil", "qe", "System", "/q:*[System[(EventID=9 or EventID=11 or EventID=15)]]"],
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+        return result.stdout
+
     def check_event_logs(self):
         """
         Check the event logs for any issues related to PCIe devices.
         """
+        if self._windows_only("event log check"):
+            return
         try:
-            result = subprocess.run(
-                ["wevtutil", "qe", "System", "/q:*[System[(EventID=9 or EventID=11 or EventID=15)]]"],
-                capture_output=True,
-                text=True
-            )
-            print(result.stdout)
+            print(self.query_event_logs(self.stage_timeout))
         except Exception as e:
             print(f"An error occurred while checking event logs: {e}")
 
-    def run_diagnostic_command(self):
+    def write_diagnostic_log(self, timeout=None):
         """
-        Run a diagnostic command to check PCIe devices and write results to a log file.
+        Write the wmic list of all Plug and Play devices to the log file and
+        return its path. On failure the error is written to the log instead
+        and raised again.
         """
-        log_file = "PCIe_diagnostic_results.log"
         try:
             result = subprocess.run(
                 ["wmic", "path", "Win32_PnPEntity", "get", "/format:list"],
                 capture_output=True,
-                text=True
+                text=True,
+                timeout=timeout
             )
             # Write the results to the log file
-            with open(log_file, "w") as file:
+            with open(self.log_file, "w") as file:
                 file.write("PCIe Diagnostic Results:\n")
                 file.write(result.stdout)
-            print(f"Diagnostic results written to {log_file}")
+            return self.log_file
         except Exception as e:
-            error_message = f"An error occurred while running the diagnostic command: {e}"
-            print(error_message)
             # Write the error to the log file
-            with open(log_file, "w") as file:
-                file.write(error_message)
+            with open(self.log_file, "w") as file:
+                file.write(f"An error occurred while running the diagnostic command: {e}")
+            raise
+
+    def run_diagnostic_command(self):
+        """
+        Run a diagnostic command to check PCIe devices and write results to a log file.
+        """
+        if self._windows_only("wmic device dump"):
+            return
+        try:
+            print(f"Diagnostic results written to {self.write_diagnostic_log(self.stage_timeout)}")
+        except Exception as e:
+            print(f"An error occurred while running the diagnostic command: {e}")
 
     def check_yellow_bang_devices(self):
         """
         Check all devices for a yellow bang (driver issues or incorrect installation).
         """
         print("Checking for devices with a yellow bang (driver issues)...")
-        for device in self.pcie_devices:
-            try:
-                # Check if the device has a ConfigManagerErrorCode property
-                if hasattr(device, "ConfigManagerErrorCode"):
-                    error_code = device.ConfigManagerErrorCode
-                    if error_code != 0:  # Non-zero error codes indicate an issue
-                        print(f"Device Name: {device['name']}")
-                        print(f"Device ID: {device['device_id']}")
-                        print(f"PNP Device ID: {device['pnp_device_id']}")
-                        print(f"Error Code: {error_code}")
-                        print(f"Issue: {self.get_error_description(error_code)}")
-                        print("-" * 40)
-            except Exception as e:
-                print(f"An error occurred while checking device: {device['name']}. Error: {e}")
+        # Non-zero ConfigManagerErrorCodes indicate an issue
+        for device in self.snapshot.with_errors():
+            error_code = device["error_code"]
+            print(f"Device Name: {device['name']}")
+            print(f"Device ID: {device['device_id']}")
+            print(f"PNP Device ID: {device['pnp_device_id']}")
+            print(f"Error Code: {error_code}")
+            print(f"Issue: {self.get_error_description(error_code)}")
+            print("-" * 40)
         print("Yellow bang device check completed.\n")
 
     def powershell_check_yellow_bang_devices(self):
         """
         Use PowerShell to check all PCIe devices for a yellow bang (driver issues or incorrect installation).
         """
+        if self._windows_only("PowerShell yellow bang check"):
+            return
         print("Using PowerShell to check for devices with a yellow bang (driver issues)...")
         try:
             # PowerShell command to query devices with non-zero ConfigManagerErrorCode
@@ -224,6 +272,8 @@ class PCIeDiagnostics:
         Use PowerShell to detect all available drivers in Windows and check them for yellow bang issues.
         Outputs a list of devices with yellow bang problems.
         """
+        if self._windows_only("PowerShell driver check"):
+            return
         print("Using PowerShell to check all drivers for yellow bang issues...")
         try:
             # PowerShell command to query all drivers with non-zero ConfigManagerErrorCode
@@ -276,27 +326,88 @@ class PCIeDiagnostics:
         }
         return error_descriptions.get(error_code, "Unknown error code.")
 
+    def external_stages(self):
+        """
+        Return the stages that wait on external commands; they do not depend
+        on each other or on the device snapshot.
+        """
+        if not self.backend.windows:
+            return []
+        return [
+            Stage("event_logs", partial(self.query_event_logs, self.stage_timeout), self.stage_timeout),
+            Stage("diagnostic_log", partial(self.write_diagnostic_log, self.stage_timeout), self.stage_timeout),
+        ]
+
     def run_all_diagnostics(self):
         """
-        Run all diagnostic methods.
+        Run all diagnostic methods and return the results of the external
+        stages. The device checks read the snapshot taken when the class was
+        created, so they do not query the system again; the yellow bang check
+        covers what the PowerShell variant reports. The external commands
+        run concurrently while the device checks print, and their output is
+        printed afterwards in a fixed order, so the report reads the same as
+        a sequential run and takes about as long as the slowest command.
         """
         print("Diagnosing PCIe devices...\n")
-        self.diagnose_devices()
-        self.check_driver_status()
-        self.check_hardware_errors()
-        self.check_power_state()
-        self.check_power_status()
-        self.check_event_logs()
-        self.run_diagnostic_command()
+
+        def device_checks():
+            self.diagnose_devices()
+            self.check_driver_status()
+            self.check_hardware_errors()
+            self.check_power_state()
+            self.check_power_status()
+            self.check_link_status()
+            self.check_aer_errors()
+
+        stages = run_stages(self.external_stages(), foreground=device_checks)
+        if not self.backend.windows:
+            self._windows_only("event log check")
+            self._windows_only("wmic device dump")
+        for stage in stages:
+            self._print_stage(stage)
         self.check_yellow_bang_devices()
-        self.powershell_check_yellow_bang_devices()
+        return stages
+
+    def results(self, host=None):
+        """
+        Return the snapshot as JSON-ready records: a header followed by one
+        record per device with its properties and issues (see PCIe_results).
+        """
+        return list(snapshot_records(self.snapshot, host))
+
+    def _print_stage(self, stage):
+        """Print an external stage's result the way its check method does"""
+        if stage["name"] == "event_logs":
+            if stage["status"] == "ok":
+                print(stage["result"])
+            else:
+                print(f"An error occurred while checking event logs: {stage['error']}")
+        elif stage["name"] == "diagnostic_log":
+            if stage["status"] == "ok":
+                print(f"Diagnostic results written to {stage['result']}")
+            else:
+                print(f"An error occurred while running the diagnostic command: {stage['error']}")
 
         
     
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Diagnose PCIe devices")
+    parser.add_argument("--json", action="store_true",
+                        help="Print the device snapshot as JSON lines instead of the report")
+    parser.add_argument("--diff", metavar="STATE",
+                        help="Print only devices that changed since the snapshot saved in STATE "
+                             "as JSON lines, then save the current snapshot there")
+    args = parser.parse_args()
+
     diagnostics = PCIeDiagnostics()
+    if args.diff:
+        write_jsonl(update_state(args.diff, diagnostics.results()), sys.stdout)
+        return
+    if args.json:
+        write_jsonl(diagnostics.results(), sys.stdout)
+        return
 
     if not diagnostics.pcie_devices:
         print("No PCIe devices found or an error occurred.")
@@ -0,0 +1,272 @@
+"""
+Sources of PCIe device information for PCIeDiagnostics.
+
+WMIBackend asks Windows Management Instrumentation, SysfsBackend reads
+/sys/bus/pci/devices on Linux without starting any processes. Both return
+devices as dictionaries with at least name, device_id, status,
+pnp_device_id, error_code (ConfigManagerErrorCode), power_management_supported
+and power_management_capabilities (None where the platform does not report
+them), and the drivers bound to a device as dictionaries with name, state
+and status. snapshot() collects all of it in one pass.
+"""
+import os
+import time
+
+# PCI base class codes (first byte of the class register)
+PCI_CLASSES = {
+    0x00: "Unclassified device",
+    0x01: "Mass storage controller",
+    0x02: "Network controller",
+    0x03: "Display controller",
+    0x04: "Multimedia controller",
+    0x05: "Memory controller",
+    0x06: "Bridge",
+    0x07: "Communication controller",
+    0x08: "Generic system peripheral",
+    0x09: "Input device controller",
+    0x0a: "Docking station",
+    0x0b: "Processor",
+    0x0c: "Serial bus controller",
+    0x0d: "Wireless controller",
+    0x0e: "Intelligent controller",
+    0x0f: "Satellite communications controller",
+    0x10: "Encryption controller",
+    0x11: "Signal processing controller",
+    0x12: "Processing accelerators",
+    0x13: "Non-Essential Instrumentation",
+    0x40: "Coprocessor",
+    0xff: "Unassigned class",
+}
+
+class DeviceSnapshot:
+    """
+    The PCI devices of a host with their drivers, taken once and shared by
+    every diagnostic check. backend names the source ("wmi" or "sysfs").
+    """
+    __slots__ = ("devices", "backend", "taken")
+
+    def __init__(self, devices, backend, taken=None):
+        self.devices = devices
+        self.backend = backend
+        self.taken = time.time() if taken is None else taken
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __iter__(self):
+        return iter(self.devices)
+
+    def with_errors(self):
+        """
+        Return the devices with a non-zero ConfigManagerErrorCode.
+        """
+        return [device for device in self.devices if device.get("error_code")]
+
+class PCIeBackend:
+    """
+    Base of the backends: pci_devices() and drivers(device) come from the
+    subclass, snapshot() combines them.
+    """
+    name = None
+    windows = False
+
+    def snapshot(self):
+        """
+        Enumerate the devices and their drivers once. Each device dictionary
+        gets a drivers list.
+        """
+        devices = self.pci_devices()
+        for device in devices:
+            device["drivers"] = self.drivers(device)
+        return DeviceSnapshot(devices, self.name)
+
+class WMIBackend(PCIeBackend):
+    """
+    Devices from the Win32_PnPEntity and Win32_PnPSignedDriver WMI classes.
+    client defaults to wmi.WMI(), which needs the wmi package on Windows.
+    """
+    name = "wmi"
+    windows = True
+
+    def __init__(self, client=None):
+        if client is None:
+            try:
+                import wmi
+            except ImportError:
+                raise RuntimeError("The WMI backend needs the wmi package (Windows only)") from None
+            client = wmi.WMI()
+        self.client = client
+        self._drivers = None  # Upper-cased device instance ID -> drivers
+
+    def pci_devices(self):
+        """
+        Return the Plug and Play devices on the PCI bus.
+        """
+        self._drivers = None
+        devices = []
+        for device in self.client.Win32_PnPEntity():
+            if "PCI" in (device.PNPDeviceID or ""):  # Filter for PCI devices
+                capabilities = device.PowerManagementCapabilities
+                devices.append({
+                    "name": device.Name,
+                    "device_id": device.DeviceID,
+                    "status": device.Status,
+                    "pnp_device_id": device.PNPDeviceID,
+                    "error_code": device.ConfigManagerErrorCode,
+                    "power_management_supported": device.PowerManagementSupported,
+                    "power_management_capabilities": None if capabilities is None else list(capabilities),
+                })
+        return devices
+
+    def driver_index(self):
+        """
+        Fetch every signed driver with a single query and index them by the
+        upper-cased instance ID of their device.
+        """
+        index = {}
+        for driver in self.client.query("SELECT * FROM Win32_PnPSignedDriver"):
+            if driver.DeviceID:
+                index.setdefault(driver.DeviceID.upper(), []).append(
+                    {"name": driver.Name, "state": driver.State, "status": driver.Status})
+        return index
+
+    def drivers(self, device):
+        """
+        Return the signed drivers installed for a device. All drivers are
+        fetched on the first call after pci_devices() and looked up in memory,
+        instead of one query (a full scan of Win32_PnPSignedDriver) per device.
+        """
+        if self._drivers is None:
+            self._drivers = self.driver_index()
+        return self._drivers.get((device["pnp_device_id"] or "").upper(), [])
+
+class SysfsBackend(PCIeBackend):
+    """
+    Devices from the Linux sysfs PCI tree, one directory per device named by
+    its address. Besides the common keys a device has vendor, device, class,
+    driver, link speed and width (current and maximum, in GT/s and lanes,
+    for PCIe devices) and the AER error totals where the kernel reports them.
+    root can point at a copy of the tree for testing.
+    """
+    name = "sysfs"
+
+    def __init__(self, root="/sys/bus/pci/devices"):
+        self.root = root
+
+    def pci_devices(self):
+        """
+        Return every device in the tree, ordered by address.
+        """
+        with os.scandir(self.root) as entries:
+            addresses = sorted(entry.name for entry in entries)
+        return [self.read_device(address) for address in addresses]
+
+    def read_device(self, address):
+        """
+        Read one device directory.
+        """
+        path = os.path.join(self.root, address)
+        attributes = {}
+        for name in ("vendor", "device", "subsystem_vendor", "subsystem_device", "class", "revision"):
+            value = _read(path, name)
+            attributes[name] = int(value, 16) if value else None
+        vendor, device_code, pci_class = attributes["vendor"], attributes["device"], attributes["class"]
+        driver = os.path.join(path, "driver")
+        driver = os.path.basename(os.readlink(driver)) if os.path.islink(driver) else None
+        aer_counters = {kind: _read_counters(path, f"aer_dev_{kind}")
+                        for kind in ("correctable", "nonfatal", "fatal")}
+        aer = {kind: _total(counters) for kind, counters in aer_counters.items() if counters is not None}
+
+        if aer.get("fatal") or aer.get("nonfatal"):
+            status = "Error"
+        elif driver is not None:
+            status = "OK"
+        else:
+            status = "Unknown"
+        class_name = PCI_CLASSES.get(pci_class >> 16, "Unknown class") if pci_class is not None else "Unknown class"
+        return {
+            "name": f"{class_name} [{vendor or 0:04x}:{device_code or 0:04x}]",
+            "device_id": address,
+            "status": status,
+            "pnp_device_id": _pnp_device_id(address, attributes),
+            "error_code": None,
+            "power_management_supported": None,
+            "power_management_capabilities": None,
+            "vendor": vendor,
+            "device": device_code,
+            "class": pci_class,
+            "driver": driver,
+            "power_state": _read(path, "power_state"),
+            "current_link_speed": _link_speed(_read(path, "current_link_speed")),
+            "max_link_speed": _link_speed(_read(path, "max_link_speed")),
+            "current_link_width": _link_width(_read(path, "current_link_width")),
+            "max_link_width": _link_width(_read(path, "max_link_width")),
+            "aer": aer,
+            "aer_counters": {kind: counters for kind, counters in aer_counters.items() if counters is not None},
+        }
+
+    def drivers(self, device):
+        """
+        Return the kernel driver bound to a device; a bound driver is running.
+        """
+        if device.get("driver") is None:
+            return []
+        return [{"name": device["driver"], "state": "Running", "status": "OK"}]
+
+def default_backend():
+    """
+    Return the backend for the current platform.
+    """
+    if os.name == "nt":
+        return WMIBackend()
+    return SysfsBackend()
+
+def _read(path, name):
+    """Contents of a sysfs attribute, or None if the device does not have it"""
+    try:
+        with open(os.path.join(path, name), "r") as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+def _read_counters(path, name):
+    """Parse "NAME COUNT" lines of an AER statistics attribute"""
+    text = _read(path, name)
+    if text is None:
+        return None
+    counters = {}
+    for line in text.splitlines():
+        key, _, value = line.rpartition(" ")
+        if key and value.isdigit():
+            counters[key.strip()] = int(value)
+    return counters
+
+def _total(counters):
+    for key, value in counters.items():
+        if key.startswith("TOTAL_"):
+            return value
+    return sum(counters.values())
+
+def _link_speed(value):
+    """Parse "8.0 GT/s PCIe" into 8.0; "Unknown" or a missing attribute gives None"""
+    try:
+        return float(value.split()[0])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def _link_width(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _pnp_device_id(address, attributes):
+    """A Windows-style PNPDeviceID, so devices can be compared across platforms"""
+    if attributes["vendor"] is None:
+        return f"PCI\\{address}"
+    pnp_id = f"PCI\\VEN_{attributes['vendor']:04X}&DEV_{attributes['device'] or 0:04X}"
+    if attributes["subsystem_vendor"] is not None:
+        pnp_id += f"&SUBSYS_{attributes['subsystem_device'] or 0:04X}{attributes['subsystem_vendor']:04X}"
+    if attributes["revision"] is not None:
+        pnp_id += f"&REV_{attributes['revision']:02X}"
+    return f"{pnp_id}\\{address}"
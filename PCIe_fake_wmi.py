@@ -0,0 +1,71 @@
+"""
+A stand-in for wmi.WMI() for the tests and benchmarks, so WMIBackend and
+PCIeDiagnostics run on any platform. It answers Win32_PnPEntity(),
+Win32_PnPSignedDriver() and the WQL queries the backend sends, and counts
+them. Each query walks the whole class like WMI does and can be slowed
+down with query_latency and row_latency seconds to imitate a real host.
+"""
+import re
+import time
+from types import SimpleNamespace
+
+_QUERY = re.compile(r"SELECT \* FROM (\w+)(?: WHERE (\w+) LIKE '%(.*)%')?$", re.IGNORECASE)
+
+def entity(pnp_device_id, name, status="OK", error_code=0, pnp_class="System", **properties):
+    """A Win32_PnPEntity instance"""
+    properties = dict({"PowerManagementSupported": None, "PowerManagementCapabilities": None}, **properties)
+    return SimpleNamespace(Name=name, DeviceID=pnp_device_id, PNPDeviceID=pnp_device_id, Status=status,
+                           ConfigManagerErrorCode=error_code, PNPClass=pnp_class, **properties)
+
+def signed_driver(device_id, name, state="Running", status="OK", **properties):
+    """A Win32_PnPSignedDriver instance"""
+    return SimpleNamespace(DeviceID=device_id, Name=name, State=state, Status=status, **properties)
+
+class FakeWMI:
+    def __init__(self, entities=(), drivers=(), query_latency=0.0, row_latency=0.0):
+        self.classes = {"Win32_PnPEntity": list(entities), "Win32_PnPSignedDriver": list(drivers)}
+        self.query_latency = query_latency
+        self.row_latency = row_latency
+        self.queries = []
+
+    @classmethod
+    def generate(cls, devices=100, other_devices=0, **latency):
+        """
+        A host with devices PCI devices, each with one driver, and
+        other_devices non-PCI devices with drivers as well.
+        """
+        entities, drivers = [], []
+        for index in range(devices):
+            pnp_id = f"PCI\\VEN_8086&DEV_{index:04X}&SUBSYS_00000000&REV_00\\3&11583659&0&{index:02X}"
+            entities.append(entity(pnp_id, f"PCI device {index}"))
+            drivers.append(signed_driver(pnp_id, f"driver{index}"))
+        for index in range(other_devices):
+            pnp_id = f"ACPI\\PNP{index:04X}\\0"
+            entities.append(entity(pnp_id, f"ACPI device {index}"))
+            drivers.append(signed_driver(pnp_id, f"acpi{index}"))
+        return cls(entities, drivers, **latency)
+
+    def _scan(self, name, match=None):
+        self.queries.append(name)
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        rows = self.classes[name]
+        if self.row_latency:
+            time.sleep(self.row_latency * len(rows))
+        return [row for row in rows if match is None or match(row)]
+
+    def Win32_PnPEntity(self):
+        return self._scan("Win32_PnPEntity")
+
+    def Win32_PnPSignedDriver(self):
+        return self._scan("Win32_PnPSignedDriver")
+
+    def query(self, wql):
+        found = _QUERY.match(wql.strip())
+        if not found:
+            raise ValueError(f"FakeWMI does not understand {wql!r}")
+        name, column, pattern = found.groups()
+        if column is None:
+            return self._scan(name)
+        pattern = pattern.upper()
+        return self._scan(name, lambda row: pattern in (getattr(row, column) or "").upper())
@@ -0,0 +1,249 @@
+"""
+Read the `wmic path Win32_PnPEntity get /format:list` dumps written by
+PCIeDiagnostics.run_diagnostic_command, and index many of them on disk.
+
+The dump is a list of Key=Value lines, one blank line between properties
+and several between devices. Values are HTML-escaped (`&amp;`), lists look
+like {"a","b"} and booleans are TRUE/FALSE.
+
+Examples:
+    python PCIe_log.py parse PCIe_diagnostic_results.log --errors
+    python PCIe_log.py index devices.db logs/*.log
+    python PCIe_log.py query devices.db --class Net --device-id 'PCI\\VEN_8086*'
+"""
+import argparse
+import html
+import json
+import os
+import sqlite3
+import sys
+
+# Properties holding integers; every other scalar stays a string
+INTEGER_FIELDS = {"Availability", "ConfigManagerErrorCode", "LastErrorCode"}
+
+def parse_value(key, raw):
+    """
+    Convert a raw property value: "" becomes None, TRUE/FALSE become bools,
+    {...} becomes a list and integer properties become ints.
+    """
+    if raw == "":
+        return None
+    if _is_list(raw):
+        return [_scalar(item) for item in _split_list(raw[1:-1])]
+    if raw in ("TRUE", "FALSE"):
+        return raw == "TRUE"
+    value = html.unescape(raw)
+    if key in INTEGER_FIELDS:
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    return value
+
+def _is_list(raw):
+    """{"a","b"} and {1,2} are lists, a braced GUID like ClassGuid is not"""
+    if not (raw.startswith("{") and raw.endswith("}")):
+        return False
+    body = raw[1:-1]
+    return not body or body.startswith('"') or body.replace(",", "").isdigit()
+
+def _split_list(body):
+    """Split the inside of {"a","b"} or {1,2} on commas outside quotes"""
+    items, current, quoted = [], [], False
+    for char in body:
+        if char == '"':
+            quoted = not quoted
+            current.append(char)
+        elif char == "," and not quoted:
+            items.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current or items:
+        items.append("".join(current))
+    return items
+
+def _scalar(item):
+    if len(item) >= 2 and item[0] == item[-1] == '"':
+        return html.unescape(item[1:-1])
+    try:
+        return int(item)
+    except ValueError:
+        return html.unescape(item)
+
+def parse_log(source, encoding="utf-8"):
+    """
+    Yield one dictionary per device of a dump, given a path or an open text
+    file. Lines are read one at a time, so memory use does not grow with the
+    size of the file. A device ends at a run of blank lines or when one of
+    its keys appears again.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding=encoding, errors="replace") as file:
+            yield from parse_log(file)
+        return
+    record = {}
+    blank = 0
+    for line in source:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            blank += 1
+            continue
+        key, separator, raw = line.partition("=")
+        if not separator:
+            # The "PCIe Diagnostic Results:" header or an error message
+            blank = 0
+            continue
+        if record and (blank > 1 or key in record):
+            yield record
+            record = {}
+        blank = 0
+        record[key] = parse_value(key, raw)
+    if record:
+        yield record
+
+class LogIndex:
+    """
+    An SQLite index of devices across many dumps, searchable by DeviceID,
+    PNPClass and ConfigManagerErrorCode. Each device is stored with all its
+    properties, so queries never re-read the dumps. add() skips dumps whose
+    size and mtime are unchanged since they were indexed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                devices INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS devices (
+                log_id INTEGER NOT NULL REFERENCES logs(id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                device_id TEXT,
+                pnp_class TEXT,
+                error_code INTEGER,
+                name TEXT,
+                status TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (log_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS devices_device_id ON devices(device_id);
+            CREATE INDEX IF NOT EXISTS devices_pnp_class ON devices(pnp_class);
+            CREATE INDEX IF NOT EXISTS devices_error_code ON devices(error_code);
+        """)
+        self.db.execute("PRAGMA foreign_keys = ON")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, log_path, encoding="utf-8"):
+        """
+        Index a dump, replacing an older index of the same file.
+        Returns the number of devices indexed, or None if it was up to date.
+        """
+        log_path = os.path.abspath(log_path)
+        stat = os.stat(log_path)
+        row = self.db.execute("SELECT id, size, mtime FROM logs WHERE path = ?", (log_path,)).fetchone()
+        if row and row[1] == stat.st_size and row[2] == stat.st_mtime:
+            return None
+        with self.db:
+            if row:
+                self.db.execute("DELETE FROM logs WHERE id = ?", (row[0],))
+            log_id = self.db.execute("INSERT INTO logs (path, size, mtime, devices) VALUES (?, ?, ?, 0)",
+                                     (log_path, stat.st_size, stat.st_mtime)).lastrowid
+            rows = ((log_id, position, record.get("DeviceID"), record.get("PNPClass"),
+                     record.get("ConfigManagerErrorCode"), record.get("Name"), record.get("Status"),
+                     json.dumps(record))
+                    for position, record in enumerate(parse_log(log_path, encoding)))
+            self.db.executemany("INSERT INTO devices VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            count = self.db.execute("SELECT COUNT(*) FROM devices WHERE log_id = ?", (log_id,)).fetchone()[0]
+            self.db.execute("UPDATE logs SET devices = ? WHERE id = ?", (count, log_id))
+        return count
+
+    def remove(self, log_path):
+        """
+        Drop a dump from the index.
+        """
+        with self.db:
+            self.db.execute("DELETE FROM logs WHERE path = ?", (os.path.abspath(log_path),))
+
+    def logs(self):
+        """
+        Return the indexed dumps with their device counts.
+        """
+        rows = self.db.execute("SELECT path, size, mtime, devices FROM logs ORDER BY path")
+        return [{"path": path, "size": size, "mtime": mtime, "devices": devices}
+                for path, size, mtime, devices in rows]
+
+    def query(self, device_id=None, pnp_class=None, error_code=None, errors_only=False, log_path=None):
+        """
+        Yield (log path, device) for matching devices. device_id may be a glob
+        pattern (GLOB syntax, case-sensitive); errors_only selects devices
+        with a non-zero ConfigManagerErrorCode.
+        """
+        conditions, params = [], []
+        if device_id is not None:
+            conditions.append("devices.device_id GLOB ?")
+            params.append(device_id)
+        if pnp_class is not None:
+            conditions.append("devices.pnp_class = ?")
+            params.append(pnp_class)
+        if error_code is not None:
+            conditions.append("devices.error_code = ?")
+            params.append(error_code)
+        if errors_only:
+            conditions.append("devices.error_code != 0")
+        if log_path is not None:
+            conditions.append("logs.path = ?")
+            params.append(os.path.abspath(log_path))
+        sql = "SELECT logs.path, devices.data FROM devices JOIN logs ON logs.id = devices.log_id"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY logs.path, devices.position"
+        for path, data in self.db.execute(sql, params):
+            yield path, json.loads(data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse and index PCIe diagnostic logs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parse = commands.add_parser("parse", help="Print the devices of a log as JSON lines")
+    parse.add_argument("log")
+    parse.add_argument("--errors", action="store_true", help="Only devices with a non-zero error code")
+    index = commands.add_parser("index", help="Add logs to an index database")
+    index.add_argument("database")
+    index.add_argument("logs", nargs="+")
+    query = commands.add_parser("query", help="Print matching devices of an index as JSON lines")
+    query.add_argument("database")
+    query.add_argument("--device-id", help="DeviceID or glob pattern")
+    query.add_argument("--class", dest="pnp_class", help="PNPClass")
+    query.add_argument("--error-code", type=int, help="ConfigManagerErrorCode")
+    query.add_argument("--errors", action="store_true", help="Only devices with a non-zero error code")
+    args = parser.parse_args()
+
+    if args.command == "parse":
+        for record in parse_log(args.log):
+            if not args.errors or record.get("ConfigManagerErrorCode"):
+                print(json.dumps(record))
+    elif args.command == "index":
+        with LogIndex(args.database) as log_index:
+            for log_path in args.logs:
+                count = log_index.add(log_path)
+                status = "up to date" if count is None else f"{count} devices"
+                print(f"{log_path}: {status}", file=sys.stderr)
+    else:
+        with LogIndex(args.database) as log_index:
+            for path, record in log_index.query(args.device_id, args.pnp_class, args.error_code, args.errors):
+                print(json.dumps(dict(record, log=path)))
+
+if __name__ == "__main__":
+    main()
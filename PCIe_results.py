@@ -0,0 +1,138 @@
+"""
+Machine-readable PCIe diagnostics: device snapshots as JSON Lines, and the
+difference between two snapshots.
+
+A snapshot is a header line followed by one line per device:
+
+    {"type": "snapshot", "host": "web1", "backend": "wmi", "taken": 1700000000.0, "devices": 2}
+    {"type": "device", "device_id": "PCI\\...", "name": "...", "status": "OK", "error_code": 0,
+     "drivers": [...], "issues": []}
+
+Properties a platform does not report are left out. A diff is a header
+line followed by one line per added, removed or changed device, so
+periodic runs only need to ship the devices that changed.
+"""
+import json
+import os
+import socket
+
+# Device properties kept in a record, in output order
+FIELDS = (
+    "name", "pnp_device_id", "status", "error_code", "drivers", "driver",
+    "power_management_supported", "power_management_capabilities", "power_state",
+    "vendor", "device", "class",
+    "current_link_speed", "max_link_speed", "current_link_width", "max_link_width", "aer",
+)
+
+def device_issues(device):
+    """
+    Return short, stable names of the problems the diagnostic checks would
+    report for a device, such as "error_code:28" or "no_driver".
+    """
+    issues = []
+    if device.get("error_code"):
+        issues.append(f"error_code:{device['error_code']}")
+    if device.get("status") not in ("OK", "Unknown", None):
+        issues.append(f"status:{device['status']}")
+    if "drivers" in device:
+        if not device["drivers"]:
+            issues.append("no_driver")
+        for driver in device["drivers"]:
+            if driver["state"] != "Running":
+                issues.append(f"driver_not_running:{driver['name']}")
+    if (device.get("current_link_speed") or 0) < (device.get("max_link_speed") or 0):
+        issues.append("link_speed_degraded")
+    if (device.get("current_link_width") or 0) < (device.get("max_link_width") or 0):
+        issues.append("link_width_degraded")
+    for kind, count in (device.get("aer") or {}).items():
+        if count:
+            issues.append(f"aer_{kind}")
+    if (device.get("power_state") or "").startswith("D3"):
+        issues.append("low_power")
+    return issues
+
+def device_record(device):
+    """
+    Return the JSON-ready record of a snapshot device.
+    """
+    record = {"type": "device", "device_id": device["device_id"]}
+    for field in FIELDS:
+        if device.get(field) is not None:
+            record[field] = device[field]
+    record["issues"] = device_issues(device)
+    return record
+
+def snapshot_records(snapshot, host=None):
+    """
+    Yield the header and device records of a DeviceSnapshot.
+    """
+    yield {"type": "snapshot", "host": host or socket.gethostname(), "backend": snapshot.backend,
+           "taken": snapshot.taken, "devices": len(snapshot)}
+    for device in snapshot:
+        yield device_record(device)
+
+def diff_records(previous, current):
+    """
+    Compare two snapshots given as record lists (as read from JSON Lines)
+    and return a diff header and one record per device that was added,
+    removed or changed, ordered by device ID. A changed record lists each
+    differing property as [old, new].
+    """
+    old_header, old_devices = _split(previous)
+    new_header, new_devices = _split(current)
+    changes = []
+    for device_id in sorted(old_devices.keys() | new_devices.keys()):
+        old, new = old_devices.get(device_id), new_devices.get(device_id)
+        if old is None:
+            changes.append({"type": "added", "device_id": device_id, "device": new})
+        elif new is None:
+            changes.append({"type": "removed", "device_id": device_id, "device": old})
+        else:
+            fields = [field for field in dict.fromkeys(list(old) + list(new)) if old.get(field) != new.get(field)]
+            if fields:
+                changes.append({"type": "changed", "device_id": device_id,
+                                "changes": {field: [old.get(field), new.get(field)] for field in fields}})
+    header = {"type": "diff", "host": new_header.get("host"), "backend": new_header.get("backend"),
+              "taken": new_header.get("taken"), "previous_taken": old_header.get("taken")}
+    for kind in ("added", "removed", "changed"):
+        header[kind] = sum(1 for change in changes if change["type"] == kind)
+    return [header] + changes
+
+def _split(records):
+    header, devices = {}, {}
+    for record in records:
+        if record.get("type") == "snapshot":
+            header = record
+        elif record.get("type") == "device":
+            devices[record["device_id"]] = record
+    return header, devices
+
+def write_jsonl(records, file):
+    """
+    Write records to an open text file, one JSON object per line.
+    """
+    for record in records:
+        file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+def read_jsonl(path):
+    """
+    Return the records of a JSON Lines file.
+    """
+    with open(path, "r") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def update_state(path, records):
+    """
+    Compare records with the snapshot saved at path, save records in its
+    place and return the diff. Without a saved snapshot every device is
+    reported as added.
+    """
+    # Round-trip through JSON so tuples compare equal to the lists read back
+    records = [json.loads(json.dumps(record)) for record in records]
+    previous = read_jsonl(path) if os.path.exists(path) else []
+    changes = diff_records(previous, records)
+    temporary = path + ".tmp"
+    with open(temporary, "w") as file:
+        write_jsonl(records, file)
+    os.replace(temporary, path)
+    return changes
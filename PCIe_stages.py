@@ -0,0 +1,65 @@
+"""
+Run independent diagnostic stages at the same time.
+
+Each stage is a function without arguments, usually one that waits on a
+subprocess. run_stages starts them on a thread pool and returns their
+results in the order the stages were given, whatever order they finish in,
+so the report built from them is the same from run to run.
+"""
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+class Stage:
+    """
+    A named function to run, and the seconds to wait for it (None waits
+    forever). A stage that overruns is reported as timed out; its function
+    should also stop on its own, for example by passing the timeout on to
+    subprocess.run, because a thread cannot be killed.
+    """
+    def __init__(self, name, function, timeout=None):
+        self.name = name
+        self.function = function
+        self.timeout = timeout
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def run_stages(stages, max_workers=None, foreground=None):
+    """
+    Run stages concurrently and return one dictionary per stage, in order:
+    name, status ("ok", "error" or "timeout"), result, error and seconds.
+    foreground() is called in the calling thread while the stages run, for
+    work that has to stay there, such as printing. Timeouts count from the
+    call, so with fewer workers than stages a queued stage has less time.
+    """
+    stages = list(stages)
+    results = []
+    executor = ThreadPoolExecutor(max_workers=max_workers or max(1, len(stages)))
+    try:
+        start = time.perf_counter()
+        futures = [executor.submit(_timed, stage.function) for stage in stages]
+        if foreground is not None:
+            foreground()
+        for stage, future in zip(stages, futures):
+            result = {"name": stage.name, "status": "ok", "result": None, "error": None, "seconds": None}
+            remaining = None if stage.timeout is None else max(0, start + stage.timeout - time.perf_counter())
+            try:
+                result["result"], seconds = future.result(timeout=remaining)
+                result["seconds"] = round(seconds, 3)
+            except TimeoutError:
+                result.update(status="timeout", error=f"Stage {stage.name} timed out after {stage.timeout} seconds",
+                              seconds=round(time.perf_counter() - start, 3))
+            except subprocess.TimeoutExpired as e:
+                # The stage passed its timeout on to a subprocess, as Stage asks
+                result.update(status="timeout", error=str(e), seconds=round(time.perf_counter() - start, 3))
+            except Exception as e:
+                result.update(status="error", error=str(e) or type(e).__name__,
+                              seconds=round(time.perf_counter() - start, 3))
+            results.append(result)
+    finally:
+        # Stages that overran keep their thread until they return, but nobody waits for them
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import gzip
+import os
+import signal
+import xmlrpc.client
+import zlib
+
+class AsyncRPCServer:
+    """
+    XML-RPC server running on a single asyncio event loop.
+    Commands are started with asyncio subprocesses, so thousands of in-flight
+    commands cost file descriptors rather than OS threads. A semaphore caps how
+    many commands run at once and each command can be given a timeout.
+    """
+
+    # Largest request body accepted, in bytes
+    max_request_size = 64 * 1024 * 1024
+
+    # Seconds between checks that a client which closed its sending side is still there
+    probe_interval = 0.5
+
+    def __init__(self, host="localhost", port=8000, max_concurrency=256, timeout=None):
+        """
+        Initialize the server. timeout is the default per-command limit in seconds.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.host = host
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.in_flight = 0
+        self.server_address = None
+        self._server = None
+        self._semaphore = None
+        self._methods = {}
+        self.register_function(self.run_command, "run_command")
+        self.register_function(self.list_methods, "system.listMethods")
+
+    def register_function(self, function, name=None):
+        """
+        Register a coroutine function under the given XML-RPC method name.
+        """
+        self._methods[name or function.__name__] = function
+
+    async def list_methods(self):
+        """
+        Return the names of all registered methods.
+        """
+        return sorted(self._methods)
+
+    async def run_command(self, command, timeout=None):
+        """
+        Execute a command and return the same dictionary as RPC_server.run_command.
+        A string is run through the shell, a list is executed directly.
+        A client timeout can only shorten the server's default timeout.
+        """
+        if timeout is None or (self.timeout is not None and timeout > self.timeout):
+            timeout = self.timeout
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                # Own process group, so a timeout also kills children of the shell
+                options = {"stdout": asyncio.subprocess.PIPE, "stderr": asyncio.subprocess.PIPE,
+                           "start_new_session": os.name != "nt"}
+                if isinstance(command, (list, tuple)):
+                    process = await asyncio.create_subprocess_exec(*command, **options)
+                else:
+                    process = await asyncio.create_subprocess_shell(command, **options)
+            except Exception as e:
+                self.in_flight -= 1
+                return {"error": str(e)}
+
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                return {"error": f"Command timed out after {timeout} seconds"}
+            except asyncio.CancelledError:
+                # The client went away or the server is stopping, do not leave the command running
+                await self._kill(process)
+                raise
+            finally:
+                self.in_flight -= 1
+
+        return {
+            "stdout": stdout.decode(errors="replace"),
+            "stderr": stderr.decode(errors="replace"),
+            "returncode": process.returncode
+        }
+
+    async def _kill(self, process):
+        """
+        Kill a subprocess together with its process group and reap it.
+        """
+        try:
+            if os.name != "nt":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+        await process.communicate()
+
+    async def start(self):
+        """
+        Start listening. The actual address is stored in server_address.
+        """
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.server_address = self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        """
+        Start the server if needed and serve until cancelled.
+        """
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Stop accepting connections.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Serve HTTP requests on one connection, keeping it open between requests.
+        """
+        read_ahead = b""
+        try:
+            while True:
+                request = await self._read_request(reader, read_ahead)
+                if request is None:
+                    break
+                version, headers, body = request
+                handled = await self._handle_until_disconnect(reader, writer, version, headers, body)
+                if handled is None:
+                    break
+                status, response, read_ahead = handled
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, response, keep_alive, headers)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_until_disconnect(self, reader, writer, version, headers, body):
+        """
+        Handle a request while watching its connection. If the client
+        disconnects first the call is cancelled, which kills its command,
+        and None is returned. Otherwise returns (status, response,
+        read_ahead) where read_ahead is the first byte of a pipelined
+        request that arrived during the call.
+
+        End of stream alone does not mean the client is gone, it may only
+        have closed its sending side. HTTP/1.1 clients are then probed
+        with "100 Continue" every probe_interval seconds; a client that
+        closed the connection answers with a reset, which fails the next
+        write.
+        """
+        call = asyncio.ensure_future(self._handle_body(headers, body))
+        watch = asyncio.ensure_future(reader.read(1))
+        try:
+            await asyncio.wait({call, watch}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            call.cancel()
+            watch.cancel()
+            raise
+        if not watch.done():
+            watch.cancel()
+        read_ahead = b""
+        try:
+            read_ahead = await watch
+        except asyncio.CancelledError:
+            pass
+        except ConnectionError:
+            read_ahead = None
+        if read_ahead == b"" and version == "HTTP/1.1":
+            while not call.done():
+                try:
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    await writer.drain()
+                except ConnectionError:
+                    read_ahead = None
+                    break
+                if writer.is_closing():
+                    read_ahead = None
+                    break
+                await asyncio.wait({call}, timeout=self.probe_interval)
+        if read_ahead is None and not call.done():
+            call.cancel()
+            try:
+                await call
+            except asyncio.CancelledError:
+                pass
+            return None
+        status, response = await call
+        return status, response, read_ahead or b""
+
+    async def _read_request(self, reader, read_ahead=b""):
+        """
+        Read one HTTP request, starting with read_ahead bytes already taken
+        from the stream. Returns (version, headers, body) or None at end of stream.
+        A request that cannot be read gets an empty body, which is answered
+        with 400, and the connection is closed after it.
+        """
+        request_line = read_ahead + await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            return None
+        method, _, version = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if method != "POST":
+            return version, headers, None
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= self.max_request_size:
+            # The body is left unread, so the connection cannot be reused
+            headers["connection"] = "close"
+            return version, headers, b""
+        body = await reader.readexactly(length)
+        if headers.get("content-encoding", "").lower() == "gzip":
+            try:
+                body = gzip.decompress(body)
+            except (OSError, EOFError, zlib.error):
+                headers["connection"] = "close"
+                return version, headers, b""
+        return version, headers, body
+
+    async def _handle_body(self, headers, body):
+        """
+        Decode an XML-RPC call, dispatch it and return (status, response bytes).
+        """
+        if body is None:
+            return 501, b""
+        if not body:
+            return 400, b""
+        try:
+            params, method_name = xmlrpc.client.loads(body)
+        except Exception:
+            return 400, b""
+
+        function = self._methods.get(method_name)
+        try:
+            if function is None:
+                raise xmlrpc.client.Fault(1, f'method "{method_name}" is not supported')
+            result = await function(*params)
+            response = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True)
+        except xmlrpc.client.Fault as fault:
+            response = xmlrpc.client.dumps(fault, allow_none=True)
+        except Exception as e:
+            response = xmlrpc.client.dumps(xmlrpc.client.Fault(1, f"{type(e).__name__}:{e}"), allow_none=True)
+        return 200, response.encode("utf-8", "xmlcharrefreplace")
+
+    def _write_response(self, writer, status, response, keep_alive, headers):
+        """
+        Write an HTTP response, gzip-encoding large bodies when the client accepts it.
+        """
+        reasons = {200: "OK", 400: "Bad Request", 501: "Not Implemented"}
+        extra = ""
+        if len(response) > 1400 and "gzip" in headers.get("accept-encoding", ""):
+            response = gzip.compress(response)
+            extra = "Content-Encoding: gzip\r\n"
+        head = (
+            f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            f"Content-Type: text/xml\r\n"
+            f"Content-Length: {len(response)}\r\n"
+            f"{extra}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + response)
+
+def main():
+    """
+    Set up and start the asyncio RPC server.
+    """
+    parser = argparse.ArgumentParser(description="Command execution RPC server on asyncio")
+    parser.add_argument("--host", default="localhost", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--max-concurrency", type=int, default=256,
+                        help="Commands allowed to run at once, others wait their turn")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Per-command timeout in seconds, clients may only ask for less")
+    args = parser.parse_args()
+
+    server = AsyncRPCServer(args.host, args.port, args.max_concurrency, args.timeout)
+    print(f"Async RPC server is running on port {args.port}...")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\nShutting down the server.")
+
+if __name__ == "__main__":
+    main()
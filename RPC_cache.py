@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import fnmatch
+import threading
+import time
+from RPC_executors import SHELL_METACHARACTERS
+
+class CommandCache:
+    """
+    Caches run_command results for an allowlist of read-only commands.
+    Only commands matching one of the allowlist glob patterns and free of
+    shell metacharacters are cached, everything else is passed straight to
+    the runner. Entries expire after
+    ttl seconds and the least recently used entry is evicted beyond max_size.
+    Concurrent requests for the same command share one execution
+    (single-flight), so a burst of identical requests starts one subprocess.
+    """
+    def __init__(self, run, allowlist=(), ttl=5.0, max_size=256):
+        self._run = run
+        self.allowlist = list(allowlist)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # command -> (expires, result), oldest use first
+        self._inflight = {}  # command -> Future shared by concurrent callers
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0,
+                       "uncacheable": 0}
+
+    def is_cacheable(self, command):
+        """
+        Return True if the command matches the allowlist. A glob * also
+        matches ;, |, $() and redirections, so commands containing shell
+        metacharacters are never cached, whatever pattern they match.
+        """
+        return isinstance(command, str) and not SHELL_METACHARACTERS & set(command) and any(
+            fnmatch.fnmatchcase(command, pattern) for pattern in self.allowlist
+        )
+
+    def run(self, command):
+        """
+        Return a cached result for the command or run it.
+        """
+        if not self.is_cacheable(command):
+            with self._lock:
+                self._stats["uncacheable"] += 1
+            return self._run(command)
+
+        with self._lock:
+            entry = self._entries.get(command)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(command)
+                    self._stats["hits"] += 1
+                    return dict(entry[1])
+                del self._entries[command]
+                self._stats["expirations"] += 1
+
+            future = self._inflight.get(command)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                future = self._inflight[command] = Future()
+                self._stats["misses"] += 1
+                leader = True
+
+        if not leader:
+            return dict(future.result())
+
+        try:
+            result = self._run(command)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[command]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[command]
+            # Failures to start the command are not worth remembering
+            if "error" not in result:
+                self._entries[command] = (time.monotonic() + self.ttl, result)
+                self._entries.move_to_end(command)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        future.set_result(result)
+        return dict(result)
+
+    def clear(self):
+        """
+        Drop all cached results.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Return hit/miss counters and the current number of entries.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = (stats["hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,388 @@
+import base64
+import functools
+import gzip
+import http.client
+import itertools
+import json
+import os
+import queue
+import time
+import urllib.parse
+import xmlrpc.client
+from RPC_files import PARTIAL_SUFFIX, file_digest
+
+def _json_object_hook(value):
+    """
+    Turn base64 objects produced by the server back into Binary.
+    """
+    if len(value) == 1 and "__binary__" in value:
+        return xmlrpc.client.Binary(base64.b64decode(value["__binary__"]))
+    return value
+
+class _Method:
+    """Callable for a (possibly dotted) remote method name"""
+    def __init__(self, send, name):
+        self._send = send
+        self._name = name
+
+    def __getattr__(self, name):
+        return _Method(self._send, f"{self._name}.{name}")
+
+    def __call__(self, *args):
+        return self._send(self._name, args)
+
+class JSONRPCProxy:
+    """
+    Client for the JSON-RPC side of RPC_server, used like xmlrpc.client.ServerProxy.
+    The HTTP connection is kept open between calls. With compress=True the
+    client asks for gzip compressed responses, which pays off for large outputs
+    over slow links. Errors are raised as xmlrpc.client.Fault so callers can
+    switch wire formats without changing their error handling.
+    Like ServerProxy, one instance must not be shared between threads.
+    """
+    def __init__(self, url, compress=True, timeout=None):
+        parts = urllib.parse.urlsplit(url)
+        self._host = parts.hostname
+        self._port = parts.port or 80
+        self._path = parts.path or "/"
+        self._compress = compress
+        self._timeout = timeout
+        self._connection = None
+        self._ids = itertools.count(1)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _Method(self._call, name)
+
+    def _call(self, method, params):
+        """
+        Send one call, reconnecting once if a kept-alive connection was closed.
+        """
+        body = json.dumps({"jsonrpc": "2.0", "method": method, "params": list(params),
+                           "id": next(self._ids)}).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self._compress:
+            headers["Accept-Encoding"] = "gzip"
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+            try:
+                self._connection.request("POST", self._path, body, headers)
+                response = self._connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt:
+                    raise
+        if response.will_close:
+            self.close()
+        if response.status != 200:
+            raise xmlrpc.client.ProtocolError(f"{self._host}:{self._port}{self._path}", response.status,
+                                              response.reason, dict(response.getheaders()))
+        if response.getheader("Content-Encoding", "") == "gzip":
+            data = gzip.decompress(data)
+
+        reply = json.loads(data, object_hook=_json_object_hook)
+        if "error" in reply:
+            raise xmlrpc.client.Fault(reply["error"]["code"], reply["error"]["message"])
+        return reply["result"]
+
+    def close(self):
+        """
+        Close the underlying connection.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+def make_proxy(url, wire_format="xml", compress=True):
+    """
+    Return a proxy for RPC_server speaking the requested wire format, "xml" or "json".
+    """
+    if wire_format == "json":
+        return JSONRPCProxy(url, compress=compress)
+    if wire_format == "xml":
+        transport = xmlrpc.client.Transport()
+        transport.accept_gzip_encoding = compress
+        return xmlrpc.client.ServerProxy(url, transport=transport)
+    raise ValueError(f"Unknown wire format: {wire_format}")
+
+class PooledServerProxy:
+    """
+    Thread-safe client for RPC_server backed by a pool of keep-alive connections.
+    Each call borrows one proxy from the pool, so at most pool_size requests are
+    in flight and callers beyond that wait for a free connection. Connections
+    stay open between calls, avoiding a TCP handshake per request.
+
+    Calls rejected with HTTP 503 or refused connections are retried up to
+    retries times with exponential backoff; the server did not run the command
+    in those cases, so retrying is safe.
+    """
+    def __init__(self, url, pool_size=8, retries=3, backoff=0.1, wire_format="xml", compress=True):
+        self._url = url
+        self._wire_format = wire_format
+        self._compress = compress
+        self.retries = retries
+        self.backoff = backoff
+        self._pool = queue.LifoQueue()  # Most recently used first, its connection is warm
+        for _ in range(pool_size):
+            self._pool.put(None)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _Method(self._call, name)
+
+    def _call(self, method, params):
+        """
+        Run one call on a pooled proxy, retrying when the server could not take it.
+        """
+        proxy = self._pool.get()
+        try:
+            for attempt in range(self.retries + 1):
+                if proxy is None:
+                    proxy = make_proxy(self._url, self._wire_format, self._compress)
+                try:
+                    return functools.reduce(getattr, method.split("."), proxy)(*params)
+                except xmlrpc.client.ProtocolError as e:
+                    if e.errcode != 503 or attempt == self.retries:
+                        raise
+                except ConnectionRefusedError:
+                    proxy = self._close_proxy(proxy)
+                    if attempt == self.retries:
+                        raise
+                except xmlrpc.client.Fault:
+                    raise
+                except Exception:
+                    # The connection may be in an unknown state, start over next time
+                    proxy = self._close_proxy(proxy)
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+        finally:
+            self._pool.put(proxy)
+
+    def close(self):
+        """
+        Close all idle pooled connections.
+        """
+        proxies = []
+        while True:
+            try:
+                proxies.append(self._pool.get_nowait())
+            except queue.Empty:
+                break
+        for proxy in proxies:
+            self._pool.put(self._close_proxy(proxy))
+
+    @staticmethod
+    def _close_proxy(proxy):
+        """
+        Close the connection of an XML-RPC or JSON-RPC proxy and return None.
+        """
+        if isinstance(proxy, xmlrpc.client.ServerProxy):
+            proxy("close")()
+        elif proxy is not None:
+            proxy.close()
+        return None
+
+def iter_output(proxy, job_id, stream="stdout", poll_wait=1.0, max_bytes=0):
+    """
+    Yield chunks of a streaming job's output as bytes until the stream ends.
+    Each call long-polls the server for up to poll_wait seconds, so output
+    arrives as soon as the command produces it. Bytes the server already
+    dropped from its bounded buffer are skipped.
+    """
+    offset = 0
+    while True:
+        chunk = proxy.read_output(job_id, offset, stream, max_bytes, poll_wait)
+        if chunk["data"].data:
+            yield chunk["data"].data
+        offset = chunk["next_offset"]
+        if chunk["eof"]:
+            return
+        if not chunk["data"].data and not poll_wait:
+            time.sleep(0.05)
+
+def stream_command(proxy, command, write, stream="stdout"):
+    """
+    Run a command in streaming mode, passing each output chunk to write().
+    Returns the command's return code.
+    """
+    job_id = proxy.stream_command(command)
+    try:
+        for data in iter_output(proxy, job_id, stream):
+            write(data)
+        while True:
+            status = proxy.read_output(job_id, 0, stream, 1, 1.0)
+            if status["returncode"] is not None or status["error"] is not None:
+                return status["returncode"]
+            # Output is closed but the process has not been reaped yet
+            time.sleep(0.05)
+    finally:
+        proxy.release_job(job_id)
+
+def run_jobs(proxy, commands, timeout=None, poll_wait=30.0):
+    """
+    Submit commands as background jobs and wait for all of them.
+    Only one HTTP request is open at a time no matter how many commands run.
+    Returns results in the order of commands; jobs still running after
+    timeout seconds are cancelled and reported with an error.
+    """
+    job_ids = [proxy.submit_command(command) for command in commands]
+    deadline = None if timeout is None else time.monotonic() + timeout
+    pending = list(job_ids)
+    try:
+        while pending:
+            wait = poll_wait if deadline is None else min(poll_wait, deadline - time.monotonic())
+            if wait <= 0:
+                break
+            pending = proxy.wait_jobs(pending, wait)["pending"]
+
+        results = []
+        for job_id in job_ids:
+            if job_id in pending:
+                proxy.cancel_job(job_id)
+                results.append({"error": f"Command did not finish within {timeout} seconds"})
+            else:
+                results.append(proxy.job_result(job_id))
+        return results
+    finally:
+        for job_id in job_ids:
+            proxy.release_job(job_id)
+
+def run_commands_multicall(proxy, commands):
+    """
+    Run commands in one HTTP round-trip with system.multicall.
+    The server runs them one after another; results come back in order.
+    """
+    multicall = xmlrpc.client.MultiCall(proxy)
+    for command in commands:
+        multicall.run_command(command)
+    return list(multicall())
+
+def run_commands_batch(proxy, commands, parallelism=8, batch_size=500):
+    """
+    Run commands through the server's run_commands endpoint, which executes each
+    batch concurrently with the given parallelism. Large lists are split into
+    batches of batch_size to keep single responses reasonably small.
+    """
+    results = []
+    for start in range(0, len(commands), batch_size):
+        results.extend(proxy.run_commands(commands[start:start + batch_size], parallelism))
+    return results
+
+# Bytes per socket write or file read during file transfers
+TRANSFER_BLOCK = 1024 * 1024
+
+def _file_request(url, remote_path, timeout):
+    """
+    Return an HTTP connection to the server and the /files/ URL path for remote_path.
+    """
+    parts = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout,
+                                            blocksize=TRANSFER_BLOCK)
+    return connection, "/files/" + urllib.parse.quote(remote_path.lstrip("/"))
+
+def download_file(url, remote_path, local_path, resume=True, verify=True, timeout=None, progress=None):
+    """
+    Download a file from the server's file root over GET /files/<path>.
+    Data is written to local_path + ".part" and renamed once complete; with
+    resume=True an existing partial file is continued with a Range request.
+    With verify=True the result is compared with the server's file_checksum.
+    progress(done, total) is called after each block. Returns the file size.
+    """
+    partial = local_path + PARTIAL_SUFFIX
+    start = os.path.getsize(partial) if resume and os.path.isfile(partial) else 0
+    connection, path = _file_request(url, remote_path, timeout)
+    try:
+        headers = {"Range": f"bytes={start}-"} if start else {}
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        if response.status == 416 and start:
+            # The partial file is complete already, or longer than the remote file
+            response.read()
+            total = int(response.getheader("Content-Range", "*/-1").rsplit("/", 1)[1])
+            if total != start:
+                os.remove(partial)
+                return download_file(url, remote_path, local_path, False, verify, timeout, progress)
+        elif response.status in (200, 206):
+            if response.status == 200:
+                start = 0
+            total = start + int(response.getheader("Content-Length"))
+            done = start
+            with open(partial, "ab" if start else "wb") as file:
+                buffer = bytearray(TRANSFER_BLOCK)
+                view = memoryview(buffer)
+                while True:
+                    count = response.readinto(buffer)
+                    if not count:
+                        break
+                    file.write(view[:count])
+                    done += count
+                    if progress is not None:
+                        progress(done, total)
+            if done != total:
+                raise ConnectionError(f"Download of {remote_path} stopped at {done} of {total} bytes")
+        else:
+            response.read()
+            raise xmlrpc.client.ProtocolError(url + path, response.status, response.reason, response.msg)
+    finally:
+        connection.close()
+
+    if verify:
+        expected = make_proxy(url).file_checksum(remote_path)
+        if file_digest(partial, block_size=TRANSFER_BLOCK) != expected:
+            os.remove(partial)
+            raise ValueError(f"Checksum mismatch downloading {remote_path}")
+    os.replace(partial, local_path)
+    return total
+
+def upload_file(url, remote_path, local_path, resume=True, verify=True, timeout=None, progress=None):
+    """
+    Upload a file to the server's file root over PUT /files/<path>, then
+    commit it with commit_file. With resume=True an interrupted upload
+    continues from the size the server already received. With verify=True
+    the server checks the upload against the local sha256 before it
+    replaces the target. progress(done, total) is called after each block.
+    Returns the server's file_info.
+    """
+    proxy = make_proxy(url)
+    size = os.path.getsize(local_path)
+    start = 0
+    if resume:
+        received = int(proxy.file_info(remote_path)["partial_size"])
+        if received <= size:
+            start = received
+    checksum = file_digest(local_path, block_size=TRANSFER_BLOCK) if verify else None
+
+    connection, path = _file_request(url, remote_path, timeout)
+    try:
+        with open(local_path, "rb") as file:
+            file.seek(start)
+            headers = {"Content-Length": str(size - start), "Content-Type": "application/octet-stream"}
+            if start:
+                headers["Content-Range"] = f"bytes {start}-{size - 1}/{size}"
+            connection.putrequest("PUT", path)
+            for name, value in headers.items():
+                connection.putheader(name, value)
+            connection.endheaders()
+            done = start
+            while True:
+                block = file.read(TRANSFER_BLOCK)
+                if not block:
+                    break
+                connection.send(block)
+                done += len(block)
+                if progress is not None:
+                    progress(done, size)
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            raise xmlrpc.client.ProtocolError(url + path, response.status, response.reason, response.msg)
+    finally:
+        connection.close()
+    if checksum is None:
+        return proxy.commit_file(remote_path)
+    return proxy.commit_file(remote_path, checksum)
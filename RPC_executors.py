@@ -0,0 +1,293 @@
+import functools
+import os
+import queue
+import selectors
+import shlex
+import shutil
+import signal
+import subprocess
+import time
+import uuid
+from RPC_limits import communicate_limited
+from RPC_metrics import metrics
+
+# Characters that need a shell to be interpreted
+SHELL_METACHARACTERS = set("|&;<>()$`\\*?[]#~{}!\n")
+
+# Commands /bin/sh runs without exec, faster than executing their binaries
+SHELL_BUILTINS = {"echo", "printf", "true", "false", "test", "[", "pwd", ":"}
+
+@functools.lru_cache(maxsize=256)
+def _which(program):
+    """Cached PATH lookup, scanning PATH costs about as much as the exec we save"""
+    return shutil.which(program)
+
+def split_command(command):
+    """
+    Return the argv list for a command that needs no shell features, else None.
+    Commands whose program is not on PATH also go through the shell, so they
+    fail with the usual shell error message and exit status, and so do shell
+    builtins, which the shell runs faster than their binaries.
+    """
+    if not command or SHELL_METACHARACTERS & set(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or "=" in argv[0] or argv[0] in SHELL_BUILTINS or _which(argv[0]) is None:
+        return None
+    return argv
+
+def _decode(data):
+    """Decode output the way text=True would, including newline translation"""
+    return data.decode(errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+def run_process(args, shell, limits=None, executable=None):
+    """
+    Run a process to completion and return the run_command result dictionary.
+    executable is the path of the program to run in place of args[0].
+    Process start-up and execution time are recorded separately.
+    With RPC_limits.CommandLimits the process gets its rlimits and is killed
+    on timeout (an error result) or when it exceeds the output cap (the
+    output so far, marked truncated).
+    """
+    if limits is None:
+        try:
+            start = time.perf_counter()
+            with subprocess.Popen(args, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                  text=True, executable=executable) as process:
+                spawned = time.perf_counter()
+                stdout, stderr = process.communicate()
+            metrics.observe("command_spawn_seconds", spawned - start)
+            metrics.observe("command_exec_seconds", time.perf_counter() - spawned)
+            return {
+                "stdout": stdout,
+                "stderr": stderr,
+                "returncode": process.returncode
+            }
+        except Exception as e:
+            return {"error": str(e)}
+
+    if limits.ulimit_prefix():
+        if not shell and executable is not None:
+            args, executable = [executable, *args[1:]], None
+        args = limits.wrap(args)
+    try:
+        start = time.perf_counter()
+        with subprocess.Popen(args, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              executable=executable,
+                              start_new_session=os.name != "nt") as process:
+            spawned = time.perf_counter()
+            stdout, stderr, exceeded = communicate_limited(process, limits.timeout, limits.max_output)
+        metrics.observe("command_spawn_seconds", spawned - start)
+        metrics.observe("command_exec_seconds", time.perf_counter() - spawned)
+    except Exception as e:
+        return {"error": str(e)}
+    if exceeded == "timeout":
+        metrics.inc("command_timeouts_total")
+        return {"error": f"Command timed out after {limits.timeout} seconds"}
+    result = {
+        "stdout": _decode(stdout),
+        "stderr": _decode(stderr),
+        "returncode": process.returncode
+    }
+    if exceeded == "output":
+        metrics.inc("command_output_truncated_total")
+        result["truncated"] = True
+    return result
+
+class SubprocessExecutor:
+    """
+    Runs every command through /bin/sh, optionally with RPC_limits.CommandLimits.
+    """
+    def __init__(self, limits=None):
+        self.limits = limits
+
+    def run(self, command):
+        """
+        Execute a command on the command line and return the output.
+        """
+        return run_process(command, shell=True, limits=self.limits)
+
+    def close(self):
+        pass
+
+class ArgvExecutor(SubprocessExecutor):
+    """
+    Executes simple commands directly from an argv list, skipping the /bin/sh
+    process in between. The program's path is looked up once and cached, so
+    the child does not search PATH either. This pays off for external
+    programs; shell builtins and commands using pipes, redirection,
+    variables, globs and similar shell features still run through the shell.
+    """
+    def run(self, command):
+        argv = split_command(command) if isinstance(command, str) else None
+        if argv is None:
+            return super().run(command)
+        return run_process(argv, shell=False, limits=self.limits, executable=_which(argv[0]))
+
+class PersistentShell:
+    """
+    A long-running /bin/sh that executes commands sent to its stdin.
+    Each command runs in a subshell (a fork of the warm shell, no exec), so
+    cd, variables and exit do not leak into the next command. The end of a
+    command's output is marked by a random sentinel followed by its exit code.
+    """
+
+    # Room left past max_output for a sentinel line that has not fully arrived
+    sentinel_slack = 64
+
+    def __init__(self, shell="/bin/sh"):
+        self.process = subprocess.Popen(
+            [shell], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, command, timeout=None, max_output=None, prefix=""):
+        """
+        Run a command and return the run_command result dictionary.
+        prefix is shell code run in the subshell before the command, such as
+        ulimit calls. When the output exceeds max_output bytes the shell is
+        killed and the output so far is returned marked truncated.
+        """
+        token = uuid.uuid4().hex
+        quoted = "'" + command.replace("'", "'\\''") + "'"
+        script = (
+            f"( {prefix}eval {quoted} ) </dev/null\n"
+            f"printf '%s %d\\n' '{token}' \"$?\"\n"
+            f"printf '%s\\n' '{token}' >&2\n"
+        )
+        marker = token.encode("ascii")
+        self.process.stdin.write(script.encode())
+        self.process.stdin.flush()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        outputs = {self.process.stdout: bytearray(), self.process.stderr: bytearray()}
+        ends = {}
+        with selectors.DefaultSelector() as selector:
+            for pipe in outputs:
+                selector.register(pipe, selectors.EVENT_READ)
+            while len(ends) < 2:
+                remaining = None if deadline is None else max(0, deadline - time.monotonic())
+                events = selector.select(remaining)
+                if not events:
+                    self.close()
+                    return {"error": f"Command timed out after {timeout} seconds"}
+                for key, _ in events:
+                    data = os.read(key.fileobj.fileno(), 65536)
+                    if not data:
+                        self.close()
+                        return {"error": "Shell exited while running the command"}
+                    buffer = outputs[key.fileobj]
+                    buffer += data
+                    index = buffer.find(marker)
+                    if index != -1 and buffer.endswith(b"\n"):
+                        ends[key.fileobj] = index
+                        selector.unregister(key.fileobj)
+                if max_output is not None:
+                    output = sum(ends.get(pipe, len(buffer) - self.sentinel_slack)
+                                 for pipe, buffer in outputs.items())
+                    if output > max_output:
+                        self.close()
+                        stdout = outputs[self.process.stdout][:ends.get(self.process.stdout, max_output)]
+                        stdout = stdout[:max_output]
+                        stderr = outputs[self.process.stderr][:ends.get(self.process.stderr, max_output)]
+                        stderr = stderr[:max_output - len(stdout)]
+                        return {
+                            "stdout": stdout.decode(errors="replace"),
+                            "stderr": stderr.decode(errors="replace"),
+                            "returncode": -signal.SIGKILL,
+                            "truncated": True
+                        }
+
+        stdout = outputs[self.process.stdout]
+        stderr = outputs[self.process.stderr]
+        end = ends[self.process.stdout]
+        return {
+            "stdout": stdout[:end].decode(errors="replace"),
+            "stderr": stderr[:ends[self.process.stderr]].decode(errors="replace"),
+            "returncode": int(stdout[end + len(marker):].split()[0])
+        }
+
+    def close(self):
+        """
+        Kill the shell and anything it started.
+        """
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout, self.process.stderr):
+            pipe.close()
+
+class ShellPoolExecutor:
+    """
+    Runs commands on a pool of warm persistent shells, avoiding a fresh
+    /bin/sh fork/exec per command. At most `size` commands run at once;
+    further callers wait for a free shell. A shell that times out or dies is
+    replaced on the next use. Only available on POSIX systems.
+    RPC_limits.CommandLimits are applied with ulimit in each command's
+    subshell; their timeout is used when timeout is not given.
+    """
+    def __init__(self, size=4, timeout=None, shell="/bin/sh", limits=None):
+        if os.name == "nt":
+            raise RuntimeError("ShellPoolExecutor needs a POSIX shell")
+        self.size = size
+        self.limits = limits
+        self.timeout = timeout if timeout is not None or limits is None else limits.timeout
+        self.max_output = limits.max_output if limits is not None else None
+        self.prefix = limits.ulimit_prefix() if limits is not None else ""
+        self.shell = shell
+        self._shells = queue.LifoQueue()
+        for _ in range(size):
+            self._shells.put(None)
+
+    def run(self, command):
+        if not isinstance(command, str):
+            return {"error": "ShellPoolExecutor only runs command strings"}
+        shell = self._shells.get()
+        try:
+            if shell is None or not shell.alive:
+                start = time.perf_counter()
+                shell = PersistentShell(self.shell)
+                metrics.observe("command_spawn_seconds", time.perf_counter() - start)
+            start = time.perf_counter()
+            result = shell.run(command, self.timeout, self.max_output, self.prefix)
+            metrics.observe("command_exec_seconds", time.perf_counter() - start)
+            if result.get("truncated"):
+                metrics.inc("command_output_truncated_total")
+            elif result.get("error", "").startswith("Command timed out"):
+                metrics.inc("command_timeouts_total")
+            if not shell.alive:
+                shell = None
+            return result
+        except Exception as e:
+            if shell is not None:
+                shell.close()
+                shell = None
+            return {"error": str(e)}
+        finally:
+            self._shells.put(shell)
+
+    def close(self):
+        """
+        Stop all shells, waiting for commands still running on them.
+        """
+        for _ in range(self.size):
+            shell = self._shells.get()
+            if shell is not None:
+                shell.close()
+        for _ in range(self.size):
+            self._shells.put(None)
+
+EXECUTORS = {
+    "subprocess": SubprocessExecutor,
+    "argv": ArgvExecutor,
+    "shell-pool": ShellPoolExecutor,
+}
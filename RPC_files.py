@@ -0,0 +1,159 @@
+import hashlib
+import os
+import xmlrpc.client
+
+# Suffix of files that are still being uploaded
+PARTIAL_SUFFIX = ".part"
+
+def _size(value):
+    """File sizes beyond XML-RPC's 32-bit integers are sent as floats, exact up to 2**53"""
+    return float(value) if value > xmlrpc.client.MAXINT else value
+
+class FileStore:
+    """
+    Files below a root directory that clients may read and write.
+    Uploads are written to "<path>.part" and only replace the target once
+    commit_file has verified their checksum, so an interrupted upload can be
+    resumed from the size of the partial file and readers never see half a
+    file. Paths are relative to root; anything resolving outside it (through
+    "..", absolute paths or symlinks) is refused.
+    """
+
+    # Largest chunk get_file and put_file move in one call
+    max_chunk = 8 * 1024 * 1024
+
+    # Bytes read per step when hashing or copying
+    block_size = 1024 * 1024
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        if not os.path.isdir(self.root):
+            raise ValueError(f"File root is not a directory: {root}")
+
+    def resolve(self, path):
+        """
+        Return the absolute path for a client path or raise ValueError.
+        """
+        if not isinstance(path, str) or not path or "\0" in path:
+            raise ValueError(f"Invalid path: {path!r}")
+        full = os.path.realpath(os.path.join(self.root, path.lstrip("/\\")))
+        if full == self.root or os.path.commonpath([self.root, full]) != self.root:
+            raise ValueError(f"Path is outside the file root: {path}")
+        return full
+
+    def _partial(self, path):
+        """
+        Return the absolute path of a file's partial upload or raise ValueError.
+        The partial file may not be a symlink, so writes cannot be redirected.
+        """
+        partial = self.resolve(path) + PARTIAL_SUFFIX
+        if os.path.realpath(partial) != partial:
+            raise ValueError(f"Partial upload of {path} is a symlink")
+        return partial
+
+    def file_info(self, path):
+        """
+        Return whether the file exists, its size and mtime, and the size of a
+        partial upload to resume from.
+        """
+        full = self.resolve(path)
+        info = {"path": path, "exists": os.path.isfile(full), "size": 0, "mtime": None, "partial_size": 0}
+        if info["exists"]:
+            stat = os.stat(full)
+            info["size"] = _size(stat.st_size)
+            info["mtime"] = stat.st_mtime
+        partial = self._partial(path)
+        if os.path.isfile(partial):
+            info["partial_size"] = _size(os.path.getsize(partial))
+        return info
+
+    def get_file(self, path, offset=0, length=0):
+        """
+        Read up to length bytes (at most max_chunk) of a file starting at offset.
+        Returns data (as Binary), offset, next_offset, the file size and eof.
+        """
+        full = self.resolve(path)
+        offset = int(offset)
+        length = min(int(length) or self.max_chunk, self.max_chunk)
+        with open(full, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            data = os.pread(file.fileno(), length, offset) if hasattr(os, "pread") else _read_at(file, offset, length)
+        next_offset = offset + len(data)
+        return {
+            "data": xmlrpc.client.Binary(data),
+            "offset": _size(offset),
+            "next_offset": _size(next_offset),
+            "size": _size(size),
+            "eof": next_offset >= size,
+        }
+
+    def open_partial(self, path, offset):
+        """
+        Open the partial upload of a file for writing at offset.
+        Offset 0 starts a new upload; any other offset must equal the size
+        already received, so uploads resume without gaps or overlaps.
+        """
+        partial = self._partial(path)
+        if offset == 0:
+            os.makedirs(os.path.dirname(partial), exist_ok=True)
+            return open(partial, "wb")
+        current = os.path.getsize(partial) if os.path.isfile(partial) else 0
+        if offset != current:
+            raise ValueError(f"Upload of {path} can only resume at offset {current}, not {offset}")
+        return open(partial, "ab")
+
+    def put_file(self, path, data, offset=0):
+        """
+        Write a chunk of an upload at offset. Returns the partial size so far.
+        """
+        data = data.data if isinstance(data, xmlrpc.client.Binary) else data
+        if len(data) > self.max_chunk:
+            raise ValueError(f"Chunk of {len(data)} bytes exceeds the limit of {self.max_chunk}")
+        with self.open_partial(path, int(offset)) as file:
+            file.write(data)
+            return _size(file.tell())
+
+    def commit_file(self, path, checksum=None, algorithm="sha256"):
+        """
+        Finish an upload: verify the partial file against checksum when given
+        and move it over the target. A partial file that does not match is
+        removed so the next upload starts from scratch.
+        """
+        full = self.resolve(path)
+        partial = self._partial(path)
+        if not os.path.isfile(partial):
+            raise ValueError(f"No upload in progress for {path}")
+        if checksum is not None:
+            actual = file_digest(partial, algorithm, self.block_size)
+            if actual != checksum.lower():
+                os.remove(partial)
+                raise ValueError(f"Checksum mismatch for {path}: expected {checksum}, got {actual}")
+        os.replace(partial, full)
+        return self.file_info(path)
+
+    def file_checksum(self, path, algorithm="sha256"):
+        """
+        Return the hex digest of a file.
+        """
+        return file_digest(self.resolve(path), algorithm, self.block_size)
+
+def file_digest(path, algorithm="sha256", block_size=1024 * 1024):
+    """
+    Return the hex digest of a file, read in blocks into one reused buffer.
+    """
+    if algorithm not in hashlib.algorithms_guaranteed:
+        raise ValueError(f"Unsupported checksum algorithm: {algorithm}")
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as file:
+        while True:
+            count = file.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+def _read_at(file, offset, length):
+    file.seek(offset)
+    return file.read(length)
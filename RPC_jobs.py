@@ -0,0 +1,360 @@
+from collections import OrderedDict
+import os
+import subprocess
+import threading
+import time
+import uuid
+import xmlrpc.client
+from RPC_limits import kill_process
+
+class OutputRingBuffer:
+    """
+    Keeps the most recent `capacity` bytes of a stream.
+    Data is addressed by absolute offset from the start of the stream, so a
+    reader that falls behind can tell how many bytes were dropped.
+    """
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.buffer = bytearray()
+        self.start = 0  # Absolute offset of buffer[0]
+        self.closed = False
+
+    @property
+    def end(self):
+        """Absolute offset just past the last byte written"""
+        return self.start + len(self.buffer)
+
+    def write(self, data):
+        """Append data, discarding the oldest bytes beyond capacity"""
+        self.buffer += data
+        excess = len(self.buffer) - self.capacity
+        if excess > 0:
+            # bytearray trims from the front without copying the rest
+            del self.buffer[:excess]
+            self.start += excess
+
+    def read(self, offset, max_bytes):
+        """
+        Return (data, data_offset) for up to max_bytes starting at offset.
+        data_offset is larger than offset when the requested bytes were dropped.
+        """
+        offset = max(offset, self.start)
+        index = offset - self.start
+        return bytes(self.buffer[index:index + max_bytes]), offset
+
+class Job:
+    """A command started by the JobManager with its buffered output"""
+    def __init__(self, job_id, command, buffer_size):
+        self.id = job_id
+        self.command = command
+        self.client = None
+        self.timed_out = False
+        self.timer = None
+        self.process = None
+        self.returncode = None
+        self.error = None
+        self.cancelled = False
+        self.started = time.time()
+        self.finished = None
+        self.streams = {
+            "stdout": OutputRingBuffer(buffer_size),
+            "stderr": OutputRingBuffer(buffer_size),
+        }
+        self.condition = threading.Condition()
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    @property
+    def state(self):
+        if self.error is not None:
+            return "failed"
+        if not self.done:
+            return "running"
+        return "cancelled" if self.cancelled else "finished"
+
+    def status(self):
+        """Return a summary of the job that is safe to send over XML-RPC"""
+        return {
+            "id": self.id,
+            "command": self.command,
+            "state": self.state,
+            "returncode": self.returncode,
+            "error": self.error,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+class JobManager:
+    """
+    Runs commands in the background and lets clients pull their output in chunks.
+    Each job keeps at most buffer_size bytes per stream on the server, so a
+    command printing hundreds of MB costs bounded memory; readers that fall too
+    far behind see a gap reported as dropped bytes.
+
+    Finished jobs are kept for retention_seconds, and at most max_retained of
+    them are kept at all; the oldest finished jobs are evicted first.
+
+    At most max_running jobs run at once (by default 16 per CPU), starting
+    more raises ValueError. With RPC_limits.CommandLimits jobs get the CPU
+    and memory rlimits and are killed after the timeout; their output is
+    bounded by buffer_size instead of max_output. With an
+    RPC_limits.AdmissionController each running job holds a slot of the
+    client that started it.
+    """
+
+    # Longest a single wait_jobs or read_output call blocks, so clients stay under HTTP timeouts
+    max_wait = 60.0
+
+    def __init__(self, buffer_size=1024 * 1024, chunk_size=64 * 1024, max_read=1024 * 1024,
+                 retention_seconds=3600, max_retained=1000, max_running=None, limits=None, admission=None):
+        self.buffer_size = buffer_size
+        self.chunk_size = chunk_size
+        self.max_read = max_read
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self.max_running = max_running or 16 * (os.cpu_count() or 1)
+        self.limits = limits
+        self.admission = admission
+        self.running = 0
+        self.jobs = {}
+        self._finished = OrderedDict()  # Finished job ids, oldest first
+        self._lock = threading.Lock()
+        self._job_finished = threading.Condition(self._lock)
+
+    def start(self, command, client=None):
+        """
+        Start a command in the background for a client and return its job id.
+        Raises ValueError when max_running jobs are already running or the
+        client is over its admission cap.
+        """
+        if self.admission is not None and not self.admission.try_acquire(client):
+            raise ValueError(f"Too many concurrent commands from {client}, try again later")
+        with self._lock:
+            if self.running >= self.max_running:
+                if self.admission is not None:
+                    self.admission.release(client)
+                raise ValueError(f"Too many running jobs ({self.max_running}), try again later")
+            self.running += 1
+        job = Job(uuid.uuid4().hex, command, self.buffer_size)
+        job.client = client
+        try:
+            job.process = subprocess.Popen(
+                self.limits.wrap(command) if self.limits is not None else command,
+                shell=True, stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                start_new_session=os.name != "nt"
+            )
+        except Exception as e:
+            job.error = str(e)
+            job.finished = time.time()
+            for stream in job.streams.values():
+                stream.closed = True
+            self._release_slot(job)
+        else:
+            stderr_thread = threading.Thread(
+                target=self._pump, args=(job, job.process.stderr, "stderr"), daemon=True
+            )
+            stderr_thread.start()
+            threading.Thread(target=self._run, args=(job, stderr_thread), daemon=True).start()
+            if self.limits is not None and self.limits.timeout is not None:
+                job.timer = threading.Timer(self.limits.timeout, self._time_out, args=(job,))
+                job.timer.daemon = True
+                job.timer.start()
+
+        with self._lock:
+            self.jobs[job.id] = job
+            if job.done:
+                self._finished[job.id] = job
+            self._evict()
+        return job.id
+
+    def _run(self, job, stderr_thread):
+        """
+        Pump stdout, then wait for stderr and the process to finish.
+        """
+        self._pump(job, job.process.stdout, "stdout")
+        stderr_thread.join()
+        returncode = job.process.wait()
+        if job.timer is not None:
+            job.timer.cancel()
+        # Before the job is marked done, so a finished job never holds a slot
+        self._release_slot(job)
+        with job.condition:
+            job.returncode = returncode
+            if job.timed_out:
+                job.error = f"Command timed out after {self.limits.timeout} seconds"
+            job.finished = time.time()
+            job.condition.notify_all()
+        with self._lock:
+            if job.id in self.jobs:
+                self._finished[job.id] = job
+            self._evict()
+            self._job_finished.notify_all()
+
+    def _release_slot(self, job):
+        """
+        Stop counting a job as running.
+        """
+        with self._lock:
+            self.running -= 1
+        if self.admission is not None:
+            self.admission.release(job.client)
+
+    def _time_out(self, job):
+        """
+        Kill a job that ran past the limits' timeout.
+        """
+        with job.condition:
+            if job.done:
+                return
+            job.timed_out = True
+        kill_process(job.process)
+
+    def _evict(self):
+        """
+        Drop expired finished jobs and the oldest ones beyond max_retained.
+        Must be called with the lock held.
+        """
+        deadline = time.time() - self.retention_seconds
+        while self._finished:
+            job_id, job = next(iter(self._finished.items()))
+            if len(self._finished) <= self.max_retained and job.finished >= deadline:
+                break
+            del self._finished[job_id]
+            self.jobs.pop(job_id, None)
+
+    def _pump(self, job, pipe, name):
+        """
+        Copy a pipe into the job's ring buffer chunk by chunk as data arrives.
+        """
+        stream = job.streams[name]
+        try:
+            while True:
+                data = pipe.read1(self.chunk_size)
+                if not data:
+                    break
+                with job.condition:
+                    stream.write(data)
+                    job.condition.notify_all()
+        except (OSError, ValueError):
+            pass
+        finally:
+            pipe.close()
+            with job.condition:
+                stream.closed = True
+                job.condition.notify_all()
+
+    def get_job(self, job_id):
+        """
+        Return the job for an id or raise ValueError.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job id: {job_id}")
+        return job
+
+    def read_output(self, job_id, offset=0, stream="stdout", max_bytes=0, wait=0):
+        """
+        Read output of a job starting at a byte offset.
+        With wait > 0, block up to that many seconds (capped at max_wait) until
+        new data or end of stream.
+        Returns data (as Binary), the offset it starts at, next_offset to pass to
+        the following call, bytes dropped before it, eof and the returncode.
+        """
+        if stream not in ("stdout", "stderr"):
+            raise ValueError(f"Unknown stream: {stream}")
+        job = self.get_job(job_id)
+        buffer = job.streams[stream]
+        max_bytes = min(max_bytes or self.max_read, self.max_read)
+
+        with job.condition:
+            if wait:
+                job.condition.wait_for(lambda: buffer.end > offset or buffer.closed,
+                                       timeout=min(wait, self.max_wait))
+            data, data_offset = buffer.read(offset, max_bytes)
+            next_offset = data_offset + len(data)
+            return {
+                "data": xmlrpc.client.Binary(data),
+                "offset": data_offset,
+                "next_offset": next_offset,
+                "dropped": data_offset - offset,
+                "eof": buffer.closed and next_offset >= buffer.end,
+                "returncode": job.returncode,
+                "error": job.error,
+            }
+
+    def job_status(self, job_id):
+        """
+        Return the state of a job: running, finished, cancelled or failed.
+        """
+        return self.get_job(job_id).status()
+
+    def job_result(self, job_id):
+        """
+        Return the result of a finished job in the same shape as run_command.
+        truncated is set when output exceeded the retained buffer size.
+        """
+        job = self.get_job(job_id)
+        if not job.done:
+            raise ValueError(f"Job {job_id} is still running")
+        if job.error is not None:
+            return {"error": job.error}
+        with job.condition:
+            stdout, stderr = job.streams["stdout"], job.streams["stderr"]
+            return {
+                "stdout": stdout.buffer.decode(errors="replace"),
+                "stderr": stderr.buffer.decode(errors="replace"),
+                "returncode": job.returncode,
+                "truncated": stdout.start > 0 or stderr.start > 0,
+            }
+
+    def wait_jobs(self, job_ids, timeout=None, return_when="all"):
+        """
+        Wait until all (or with return_when="any", at least one) of the jobs finish.
+        Blocks for at most timeout seconds, capped at max_wait.
+        Returns {"done": [...], "pending": [...]} with job ids.
+        """
+        if return_when not in ("all", "any"):
+            raise ValueError(f"Unknown return_when: {return_when}")
+        jobs = [self.get_job(job_id) for job_id in job_ids]
+        timeout = self.max_wait if timeout is None else min(timeout, self.max_wait)
+
+        def finished():
+            done = sum(job.done for job in jobs)
+            return done == len(jobs) or (return_when == "any" and done > 0)
+
+        with self._lock:
+            self._job_finished.wait_for(finished, timeout=timeout)
+        return {
+            "done": [job.id for job in jobs if job.done],
+            "pending": [job.id for job in jobs if not job.done],
+        }
+
+    def cancel_job(self, job_id):
+        """
+        Kill a running job. Returns False if it had already finished.
+        """
+        job = self.get_job(job_id)
+        with job.condition:
+            if job.done:
+                return False
+            job.cancelled = True
+        kill_process(job.process)
+        return True
+
+    def release(self, job_id):
+        """
+        Forget a job, killing its command if it is still running.
+        """
+        job = self.get_job(job_id)
+        if not job.done:
+            kill_process(job.process)
+        with self._lock:
+            self.jobs.pop(job_id, None)
+            self._finished.pop(job_id, None)
+        return True
@@ -0,0 +1,172 @@
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def kill_process(process):
+    """
+    Kill a command started with start_new_session together with its children.
+    """
+    if process.returncode is not None:
+        # Already reaped, its pid may belong to someone else by now
+        return
+    try:
+        if os.name != "nt":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+class CommandLimits:
+    """
+    Limits applied to each command run_command starts.
+    timeout is wall-clock seconds, cpu_seconds and memory_bytes become the
+    RLIMIT_CPU and RLIMIT_AS of the command's process, and max_output caps
+    the combined bytes of stdout and stderr. None means unlimited. A command
+    that runs past its timeout or output cap is killed with its process group.
+    CPU and memory limits need the resource module, so they are POSIX only.
+    """
+    def __init__(self, timeout=None, cpu_seconds=None, memory_bytes=None, max_output=None):
+        if (cpu_seconds or memory_bytes) and resource is None:
+            raise RuntimeError("CPU and memory limits need the resource module (POSIX only)")
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.max_output = max_output
+
+    def ulimit_prefix(self):
+        """
+        Return shell commands setting the CPU and memory rlimits, for commands
+        run through a shell or in a subshell of an already started shell.
+        """
+        prefix = ""
+        if self.cpu_seconds:
+            prefix += f"ulimit -t {int(self.cpu_seconds)}; "
+        if self.memory_bytes:
+            prefix += f"ulimit -v {int(self.memory_bytes) // 1024}; "
+        return prefix
+
+    def wrap(self, command):
+        """
+        Return a command that sets the rlimits with ulimit before running:
+        a command string for shell=True gets the ulimit_prefix, an argv list
+        is started by /bin/sh, which sets them and execs it. Setting them in
+        Popen's preexec_fn instead is not safe in a threaded server, the
+        child can deadlock between fork and exec.
+        """
+        prefix = self.ulimit_prefix()
+        if not prefix:
+            return command
+        if isinstance(command, str):
+            return prefix + command
+        return ["/bin/sh", "-c", prefix + 'exec "$@"', "sh", *command]
+
+def communicate_limited(process, timeout=None, max_output=None):
+    """
+    Read stdout and stderr of a process started with start_new_session until
+    it exits. The process group is killed when it runs past timeout seconds or
+    prints more than max_output bytes in total.
+    Returns (stdout, stderr, reason) as bytes, reason is None, "timeout" or "output".
+    """
+    if os.name == "nt":
+        # Pipes cannot be polled on Windows, only the timeout is enforced while running
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+            return stdout, stderr, "timeout"
+        if max_output is not None and len(stdout) + len(stderr) > max_output:
+            stdout = stdout[:max_output]
+            stderr = stderr[:max_output - len(stdout)]
+            return stdout, stderr, "output"
+        return stdout, stderr, None
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    outputs = {process.stdout: bytearray(), process.stderr: bytearray()}
+    total = 0
+    reason = None
+    with selectors.DefaultSelector() as selector:
+        for pipe in outputs:
+            selector.register(pipe, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            events = selector.select(remaining)
+            if not events:
+                reason = "timeout"
+                break
+            for key, _ in events:
+                data = os.read(key.fileobj.fileno(), 65536)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    continue
+                if max_output is not None and total + len(data) > max_output:
+                    outputs[key.fileobj] += data[:max_output - total]
+                    reason = "output"
+                    break
+                outputs[key.fileobj] += data
+                total += len(data)
+            if reason:
+                break
+    if reason:
+        kill_process(process)
+    process.wait()
+    return bytes(outputs[process.stdout]), bytes(outputs[process.stderr]), reason
+
+class AdmissionController:
+    """
+    Caps how many commands each client runs at once, and optionally how many
+    run in total. Commands over a cap are rejected right away instead of
+    waiting, so one busy client cannot take every worker and an overloaded
+    server answers quickly instead of stalling.
+    """
+    def __init__(self, max_per_client, max_total=None):
+        if max_per_client < 1:
+            raise ValueError("max_per_client must be at least 1")
+        self.max_per_client = max_per_client
+        self.max_total = max_total
+        self.running = 0
+        self.rejected = 0
+        self._clients = {}  # client -> commands running
+        self._lock = threading.Lock()
+
+    def try_acquire(self, client):
+        """
+        Take a slot for the client. Returns False if it is over a cap.
+        """
+        with self._lock:
+            count = self._clients.get(client, 0)
+            if count >= self.max_per_client or (
+                    self.max_total is not None and self.running >= self.max_total):
+                self.rejected += 1
+                return False
+            self._clients[client] = count + 1
+            self.running += 1
+            return True
+
+    def release(self, client):
+        """
+        Give back a slot taken with try_acquire.
+        """
+        with self._lock:
+            count = self._clients[client] - 1
+            if count:
+                self._clients[client] = count
+            else:
+                del self._clients[client]
+            self.running -= 1
+
+    def stats(self):
+        """
+        Return running commands, clients with running commands and rejections.
+        """
+        with self._lock:
+            return {"running": self.running, "clients": len(self._clients), "rejected": self.rejected}
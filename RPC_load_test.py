@@ -0,0 +1,219 @@
+"""
+Load generator for RPC_server.
+
+Starts the server in-process on an ephemeral port (or targets --url), drives
+closed-loop or open-loop load with a weighted command mix and prints a JSON
+report with throughput, latency percentiles and error rate.
+
+Examples:
+    python RPC_load_test.py --mode closed --concurrency 32 --duration 10
+    python RPC_load_test.py --mode open --rate 200 --mix 3:"echo ok" 1:"ls /" --output-size 65536
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from RPC_client import make_proxy
+from RPC_server import create_server
+
+def percentile(sorted_values, fraction):
+    """
+    Return the value at the given fraction (0..1) of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def output_command(size):
+    """
+    Return a portable command that writes size bytes to stdout.
+    """
+    return f'"{sys.executable}" -c "import sys; sys.stdout.write(\'x\' * {size})"'
+
+def parse_mix(entries):
+    """
+    Parse "WEIGHT:COMMAND" entries into (commands, weights).
+    """
+    commands, weights = [], []
+    for entry in entries:
+        weight, separator, command = entry.partition(":")
+        if not separator or not weight.strip().replace(".", "", 1).isdigit():
+            raise ValueError(f"Mix entry must look like WEIGHT:COMMAND, got {entry!r}")
+        commands.append(command)
+        weights.append(float(weight))
+    return commands, weights
+
+@contextmanager
+def running_server(workers=16, queue_size=64):
+    """
+    Run RPC_server in a background thread on an ephemeral port and yield its URL.
+    """
+    server = create_server("localhost", 0, workers=workers, queue_size=queue_size, log_requests=False)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://localhost:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+class _Recorder:
+    """Collects latencies and errors from many threads"""
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, latency, error=None):
+        with self.lock:
+            if error is None:
+                self.latencies.append(latency)
+            else:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+def _call(proxy, command):
+    """
+    Run one command; return None on success or a short error category.
+    """
+    try:
+        result = proxy.run_command(command)
+    except Exception as e:
+        return getattr(e, "errcode", None) and f"http_{e.errcode}" or type(e).__name__
+    if "error" in result:
+        return "command_error"
+    if result.get("returncode") != 0:
+        return "nonzero_exit"
+    return None
+
+def run_load(url, commands, weights=None, mode="closed", concurrency=8, rate=50.0,
+             duration=10.0, requests=None, wire_format="xml", seed=None):
+    """
+    Drive load against url and return a report dictionary.
+
+    closed: concurrency clients each send the next request as soon as the
+            previous one returns.
+    open:   requests are started at a fixed rate regardless of how fast the
+            server answers; latency is measured from the scheduled start so
+            queueing delay is not hidden (no coordinated omission).
+    The run stops after duration seconds or after requests requests.
+    """
+    if mode not in ("closed", "open"):
+        raise ValueError(f"Unknown mode: {mode}")
+    rng = random.Random(seed)
+    pick_lock = threading.Lock()
+
+    def pick():
+        with pick_lock:
+            return rng.choices(commands, weights)[0]
+
+    recorder = _Recorder()
+    proxies = threading.local()
+
+    def proxy():
+        if not hasattr(proxies, "proxy"):
+            proxies.proxy = make_proxy(url, wire_format)
+        return proxies.proxy
+
+    start = time.perf_counter()
+    deadline = start + duration
+    if mode == "closed":
+        issued = 0
+        issued_lock = threading.Lock()
+
+        def client():
+            nonlocal issued
+            while time.perf_counter() < deadline:
+                with issued_lock:
+                    if requests is not None and issued >= requests:
+                        return
+                    issued += 1
+                sent = time.perf_counter()
+                error = _call(proxy(), pick())
+                recorder.record(time.perf_counter() - sent, error)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(client) for _ in range(concurrency)]:
+                future.result()
+    else:
+        def send(scheduled, command):
+            error = _call(proxy(), command)
+            recorder.record(time.perf_counter() - scheduled, error)
+
+        total = int(duration * rate) if requests is None else requests
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for index in range(total):
+                scheduled = start + index / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(send, scheduled, pick())
+    wall = time.perf_counter() - start
+
+    latencies = sorted(recorder.latencies)
+    errors = sum(recorder.errors.values())
+    completed = len(latencies) + errors
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "target_rate": rate if mode == "open" else None,
+        "duration_seconds": round(wall, 3),
+        "requests": completed,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "error_rate": round(errors / completed, 4) if completed else 0.0,
+        "errors": recorder.errors,
+        "latency_ms": {
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": ms(percentile(latencies, 0.50)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(latencies[-1]) if latencies else None,
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test RPC_server")
+    parser.add_argument("--url", help="Target server; by default one is started in-process")
+    parser.add_argument("--workers", type=int, default=16, help="Workers of the in-process server")
+    parser.add_argument("--queue-size", type=int, default=64, help="Queue size of the in-process server")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed", help="Load model")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Clients in closed mode, maximum outstanding requests in open mode")
+    parser.add_argument("--rate", type=float, default=50.0, help="Requests per second in open mode")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--mix", nargs="+", default=["1:echo ok"], metavar="WEIGHT:COMMAND",
+                        help="Weighted command mix")
+    parser.add_argument("--output-size", type=int, nargs="*", default=[], metavar="BYTES",
+                        help="Add commands printing this many bytes to the mix, weight 1 each")
+    parser.add_argument("--wire-format", choices=["xml", "json"], default="xml", help="Client wire format")
+    parser.add_argument("--seed", type=int, help="Seed for the command mix")
+    args = parser.parse_args()
+
+    commands, weights = parse_mix(args.mix)
+    for size in args.output_size:
+        commands.append(output_command(size))
+        weights.append(1.0)
+
+    options = dict(commands=commands, weights=weights, mode=args.mode, concurrency=args.concurrency,
+                   rate=args.rate, duration=args.duration, requests=args.requests,
+                   wire_format=args.wire_format, seed=args.seed)
+    if args.url:
+        report = run_load(args.url, **options)
+    else:
+        with running_server(args.workers, args.queue_size) as url:
+            report = run_load(url, **options)
+        report["server_workers"] = args.workers
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+from collections import deque
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond calls to long commands
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Largest integer XML-RPC can carry
+MAXINT = 2 ** 31 - 1
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is a bisect and three additions, so it
+    is cheap enough for every request.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction):
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class Metrics:
+    """
+    Thread-safe registry of counters and histograms, keyed by name and an
+    optional RPC method label. Gauges such as queue depth are not stored;
+    callers pass their current values when metrics are read, so they cost
+    nothing on the request path.
+    """
+    def __init__(self, slow_threshold=1.0, slow_calls=50):
+        self.slow_threshold = slow_threshold
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._slow_calls = deque(maxlen=slow_calls)
+
+    def describe(self, name, help_text):
+        """Set the HELP text shown for a metric"""
+        self._help[name] = help_text
+
+    def inc(self, name, label=None, amount=1):
+        key = (name, label)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, label=None):
+        key = (name, label)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def record_call(self, method, seconds, failed):
+        """
+        Record one RPC call: latency, errors and slow call traces.
+        """
+        with self._lock:
+            histogram = self._histograms.get(("rpc_request_duration_seconds", method))
+            if histogram is None:
+                histogram = self._histograms[("rpc_request_duration_seconds", method)] = Histogram()
+            histogram.observe(seconds)
+            if failed:
+                key = ("rpc_errors_total", method)
+                self._counters[key] = self._counters.get(key, 0) + 1
+            if seconds >= self.slow_threshold:
+                self._slow_calls.append({"method": method, "seconds": seconds, "finished": time.time()})
+
+    def reset(self):
+        """Forget all recorded values"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._slow_calls.clear()
+
+    def snapshot(self, gauges=None):
+        """
+        Return all metrics plus the given gauge values as nested dictionaries
+        that XML-RPC can marshal.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h.counts), h.count, h.sum, h.quantile(0.5), h.quantile(0.99), h.buckets)
+                          for key, h in self._histograms.items()}
+            slow_calls = list(self._slow_calls)
+
+        result = {"counters": {}, "histograms": {}, "gauges": {}, "slow_calls": slow_calls}
+        for (name, label), value in counters.items():
+            result["counters"].setdefault(name, {})[str(label or "")] = _number(value)
+        for (name, label), (counts, count, total, p50, p99, buckets) in histograms.items():
+            result["histograms"].setdefault(name, {})[str(label or "")] = {
+                "count": _number(count),
+                "sum": total,
+                "p50": p50,
+                "p99": p99,
+                "buckets": {str(bound): _number(c) for bound, c in zip(buckets + ("+Inf",), counts)},
+            }
+        for name, value in (gauges or {}).items():
+            result["gauges"][name] = _number(value)
+        return result
+
+    def render_prometheus(self, gauges=None):
+        """
+        Return all metrics plus the given gauge values in the Prometheus text
+        exposition format.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items(), key=lambda item: (item[0][0], str(item[0][1])))
+            histograms = sorted(((key, (list(h.counts), h.count, h.sum, h.buckets))
+                                 for key, h in self._histograms.items()),
+                                key=lambda item: (item[0][0], str(item[0][1])))
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, label), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_labels(label)} {value}")
+        for (name, label), (counts, count, total, buckets) in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(label, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(label)} {total}")
+            lines.append(f"{name}_count{_labels(label)} {count}")
+        for name, value in sorted((gauges or {}).items()):
+            header(name, "gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+def _number(value):
+    """Integers beyond XML-RPC's 32-bit range are sent as floats"""
+    if isinstance(value, int) and abs(value) > MAXINT:
+        return float(value)
+    return value
+
+def _labels(label, le=None):
+    parts = []
+    if label is not None:
+        escaped = str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'method="{escaped}"')
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+# Process-wide registry used by the RPC server and executors
+metrics = Metrics()
+metrics.describe("rpc_request_duration_seconds", "Time spent handling an RPC call")
+metrics.describe("rpc_errors_total", "RPC calls that raised an error")
+metrics.describe("command_spawn_seconds", "Time to start a command's process")
+metrics.describe("command_exec_seconds", "Time from process start to command completion")
+metrics.describe("command_output_bytes_total", "Bytes of stdout and stderr returned by run_command")
+metrics.describe("command_errors_total", "run_command calls that returned an error")
+metrics.describe("command_timeouts_total", "Commands killed after running past their timeout")
+metrics.describe("command_output_truncated_total", "Commands killed for exceeding the output cap")
+metrics.describe("command_rejected_total", "Commands rejected by admission control")
@@ -1,29 +1,728 @@
-from xmlrpc.server import SimpleXMLRPCServer
-import subprocess
+from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import base64
+import gzip
+import json
+import os
+import queue
+import select
+import selectors
+import socket
+import threading
+import time
+import urllib.parse
+import xmlrpc.client
+from RPC_cache import CommandCache
+from RPC_files import FileStore
+from RPC_executors import EXECUTORS, SubprocessExecutor, ShellPoolExecutor
+from RPC_jobs import JobManager
+from RPC_limits import AdmissionController, CommandLimits
+from RPC_metrics import metrics
+
+# Backend that runs commands for run_command, see RPC_executors
+command_executor = SubprocessExecutor()
+
+# Optional RPC_cache.CommandCache in front of the executor
+command_cache = None
+
+# Optional RPC_limits.AdmissionController capping concurrent commands per client
+admission = None
+
+# Per-thread state of the request being served
+_request = threading.local()
+
+def current_client():
+    """
+    Return the address of the client whose request this thread is serving.
+    """
+    return getattr(_request, "client", None)
+
+def _execute(command):
+    if admission is None:
+        return command_executor.run(command)
+    client = current_client()
+    if not admission.try_acquire(client):
+        metrics.inc("command_rejected_total")
+        return {"error": f"Too many concurrent commands from {client}, try again later"}
+    try:
+        return command_executor.run(command)
+    finally:
+        admission.release(client)
 
 def run_command(command):
     """
     Execute a command on the command line and return the output.
     """
-    try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
-        return {
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "returncode": result.returncode
-        }
-    except Exception as e:
-        return {"error": str(e)}
+    if command_cache is not None:
+        result = command_cache.run(command)
+    else:
+        result = _execute(command)
+    if "error" in result:
+        metrics.inc("command_errors_total")
+    else:
+        metrics.inc("command_output_bytes_total", amount=len(result["stdout"]) + len(result["stderr"]))
+    return result
+
+def cache_stats():
+    """
+    Return result cache counters, or {"enabled": False} without a cache.
+    """
+    if command_cache is None:
+        return {"enabled": False}
+    return dict(command_cache.stats(), enabled=True)
+
+# Upper bound for the parallelism a run_commands caller may ask for
+MAX_BATCH_PARALLELISM = 64
+
+def run_commands(commands, parallelism=8):
+    """
+    Execute a batch of commands concurrently and return their outputs in order.
+    """
+    if not commands:
+        return []
+    parallelism = min(parallelism, MAX_BATCH_PARALLELISM, len(commands))
+    if admission is not None:
+        # A batch should not be rejected by its own client's cap
+        parallelism = min(parallelism, admission.max_per_client)
+    parallelism = max(1, parallelism)
+    client = current_client()
+
+    def run(command):
+        _request.client = client
+        return run_command(command)
+
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        return list(executor.map(run, commands))
+
+def _json_default(value):
+    """
+    Encode values JSON has no type for. Binary data travels as base64.
+    """
+    if isinstance(value, xmlrpc.client.Binary):
+        return {"__binary__": base64.b64encode(value.data).decode("ascii")}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class RPCRequestHandler(SimpleXMLRPCRequestHandler):
+    """
+    Request handler that also accepts JSON-RPC 2.0 on the same paths.
+    Clients opt in with Content-Type: application/json; JSON skips the
+    per-character escaping and parsing of XML, which dominates for large
+    outputs. Responses are gzip compressed (at a fast level) when the client
+    sends Accept-Encoding: gzip and the body is above encode_threshold.
+    """
+
+    json_compress_level = 1
+
+    def setup(self):
+        # Keep connections open between requests only on servers that allow it,
+        # a single-threaded server would be blocked by one idle client
+        if getattr(self.server, "keep_alive", False):
+            self.protocol_version = "HTTP/1.1"
+            self.timeout = self.server.keepalive_timeout
+        self.requests_handled = 0
+        _request.client = self.client_address[0]
+        super().setup()
+
+    def handle_one_request(self):
+        self.raw_requestline = b""
+        if self.requests_handled and not self._wait_for_request():
+            self.close_connection = True
+            return
+        self.requests_handled += 1
+        super().handle_one_request()
+
+    def _wait_for_request(self):
+        """
+        Wait for the next request on a kept-alive connection. Returns False
+        when the connection should be closed instead, so the worker can
+        serve others: it stayed idle for keepalive_idle seconds, or
+        connections are queued waiting for a worker.
+        """
+        self.connection.settimeout(0)
+        try:
+            if self.rfile.peek(1):
+                return True  # already buffered, or the client closed
+        except OSError:
+            return True  # let the request line read report it
+        finally:
+            self.connection.settimeout(self.timeout)
+        deadline = time.monotonic() + self.server.keepalive_idle
+        while not self.server.queue_depth():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.connection], [], [], min(remaining, 0.05))
+            if readable:
+                return True
+        return False
+
+    def end_headers(self):
+        # Give the worker back when other connections are waiting for one
+        if self.protocol_version == "HTTP/1.1" and not self.close_connection and self.server.queue_depth():
+            self.send_header("Connection", "close")
+        super().end_headers()
+
+    def log_error(self, format, *args):
+        if not self.raw_requestline and format.startswith("Request timed out"):
+            return # an idle kept-alive connection expired
+        super().log_error(format, *args)
+
+    def do_GET(self):
+        """
+        Serve metrics in the Prometheus text format on /metrics and files
+        of the server's FileStore on /files/<path>.
+        """
+        if self.path.startswith("/files/"):
+            self._send_file()
+            return
+        if self.path != "/metrics" or not hasattr(self.server, "gauges"):
+            self.report_404()
+            return
+        body = metrics.render_prometheus(self.server.gauges()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-type", "text/plain; version=0.0.4")
+        self.send_header("Content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _file_path(self):
+        """
+        Return the FileStore, client path and absolute path for a /files/ URL,
+        or send an error response and return None.
+        """
+        store = getattr(self.server, "file_store", None)
+        if store is None:
+            self.report_404()
+            return None
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path[len("/files/"):])
+        try:
+            return store, path, store.resolve(path)
+        except ValueError as e:
+            self.send_error(403, str(e))
+            return None
+
+    def _send_file(self):
+        """
+        Send a file, or the byte range asked for with a Range header, using
+        sendfile so the data goes from the page cache to the socket without
+        passing through Python.
+        """
+        target = self._file_path()
+        if target is None:
+            return
+        try:
+            file = open(target[2], "rb")
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        with file:
+            size = os.fstat(file.fileno()).st_size
+            start, end = 0, size - 1
+            ranged = self.headers.get("Range")
+            if ranged:
+                try:
+                    first, last = ranged.strip().removeprefix("bytes=").split("-", 1)
+                    if first:
+                        start = int(first)
+                        end = min(int(last), size - 1) if last else size - 1
+                    else:
+                        start = max(0, size - int(last))  # the last N bytes
+                except ValueError:
+                    self.send_error(400, "Only single byte ranges are supported")
+                    return
+                if start >= size or start > end:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-type", "application/octet-stream")
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-length", str(end - start + 1))
+            self.end_headers()
+            if end >= start:
+                self.wfile.flush()  # headers are buffered, they must go out before the data
+                self.connection.sendfile(file, start, end - start + 1)
+
+    def do_PUT(self):
+        """
+        Receive an upload for the server's FileStore on /files/<path>.
+        A "Content-Range: bytes <start>-<end>/<total>" header resumes a partial
+        upload at start. The data goes to the partial file; commit_file
+        verifies it and moves it into place.
+        """
+        if not self.path.startswith("/files/"):
+            self.report_404()
+            return
+        target = self._file_path()
+        if target is None:
+            return
+        store, path, _ = target
+        if self.headers.get("content-length") is None:
+            self.send_error(411)
+            return
+        try:
+            remaining = int(self.headers["content-length"])
+        except ValueError:
+            remaining = -1
+        if remaining < 0:
+            self.send_error(400, "Invalid Content-Length")
+            return
+        start = 0
+        content_range = self.headers.get("Content-Range")
+        if content_range:
+            try:
+                start = int(content_range.strip().removeprefix("bytes ").split("-", 1)[0])
+            except ValueError:
+                self.send_error(400, "Invalid Content-Range")
+                return
+        try:
+            file = store.open_partial(path, start)
+        except ValueError as e:
+            self.send_error(416, str(e))
+            return
+        with file:
+            while remaining > 0:
+                chunk = self.rfile.read(min(remaining, store.block_size))
+                if not chunk:
+                    break
+                file.write(chunk)
+                remaining -= len(chunk)
+            received = file.tell()
+        if remaining:
+            self.close_connection = True
+            return # client went away, the partial file is kept for resuming
+        body = json.dumps({"partial_size": received}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-type", "application/json")
+        self.send_header("Content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.headers.get("content-type", "").startswith("application/json"):
+            super().do_POST()
+            return
+        if not self.is_rpc_path_valid():
+            self.report_404()
+            return
+
+        try:
+            data = self._read_body()
+            data = self.decode_request_content(data)
+            if data is None:
+                return # response has been sent
+
+            try:
+                request = json.loads(data)
+            except ValueError:
+                response = self._json_error(None, -32700, "Parse error")
+            else:
+                if request == []:
+                    response = self._json_error(None, -32600, "Invalid Request")
+                elif isinstance(request, list):
+                    # Notifications get no entry, a batch of only notifications no body
+                    response = [r for r in map(self._dispatch_json, request) if r is not None] or None
+                else:
+                    response = self._dispatch_json(request)
+            body = b""
+            if response is not None:
+                body = json.dumps(response, default=_json_default, separators=(",", ":")).encode("utf-8")
+        except Exception:
+            # Same answer as SimpleXMLRPCRequestHandler gives for an XML-RPC request,
+            # but the body may be unread so the connection cannot be reused
+            self.close_connection = True
+            self.send_response(500)
+            self.send_header("Content-length", "0")
+            self.end_headers()
+            return
+
+        if response is None:
+            self.send_response(204)
+            self.send_header("Content-length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-type", "application/json")
+        if self.encode_threshold is not None and len(body) > self.encode_threshold:
+            if self.accept_encodings().get("gzip", 0):
+                body = gzip.compress(body, compresslevel=self.json_compress_level)
+                self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        """
+        Read the request body in chunks, like SimpleXMLRPCRequestHandler.do_POST.
+        Raises for a missing or invalid Content-Length.
+        """
+        max_chunk_size = 10 * 1024 * 1024
+        size_remaining = int(self.headers["content-length"])
+        chunks = []
+        while size_remaining > 0:
+            chunk = self.rfile.read(min(size_remaining, max_chunk_size))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size_remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _dispatch_json(self, call):
+        """
+        Run one JSON-RPC call through the server's dispatcher. Returns the
+        response object, or None for a notification (a call without an id).
+        """
+        if not isinstance(call, dict) or not isinstance(call.get("method"), str):
+            return self._json_error(None, -32600, "Invalid Request")
+        call_id = call.get("id")
+        params = call.get("params", [])
+        if not isinstance(params, list):
+            response = self._json_error(call_id, -32602, "Only positional params are supported")
+        else:
+            try:
+                result = self.server._dispatch(call["method"], params)
+            except xmlrpc.client.Fault as fault:
+                response = self._json_error(call_id, fault.faultCode, fault.faultString)
+            except Exception as e:
+                # Same code and message format as an XML-RPC fault from the dispatcher
+                response = self._json_error(call_id, 1, f"{type(e)}:{e}")
+            else:
+                response = {"jsonrpc": "2.0", "result": result, "id": call_id}
+        return response if "id" in call else None
+
+    def _json_error(self, call_id, code, message):
+        return {"jsonrpc": "2.0", "error": {"code": code, "message": message}, "id": call_id}
+
+class RPCServer(SimpleXMLRPCServer):
+    """
+    XML-RPC server that records latency and errors of every call.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    def _dispatch(self, method, params):
+        with self._in_flight_lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = super()._dispatch(method, params)
+            failed = False
+            return result
+        finally:
+            # The name comes from the client, labelling by unknown names would grow the metrics without bound
+            label = method if method in self.funcs else "unknown"
+            metrics.record_call(label, time.perf_counter() - start, failed)
+            with self._in_flight_lock:
+                self.in_flight -= 1
+
+    def gauges(self):
+        """
+        Return current values of the server's gauges.
+        """
+        gauges = {"rpc_in_flight": self.in_flight}
+        if command_cache is not None:
+            for name, value in command_cache.stats().items():
+                gauges[f"command_cache_{name}"] = value
+        if admission is not None:
+            gauges["command_admission_running"] = admission.running
+            gauges["command_admission_clients"] = admission.stats()["clients"]
+        return gauges
+
+    def get_metrics(self):
+        """
+        Return latency histograms, counters, gauges and recent slow calls.
+        """
+        return metrics.snapshot(self.gauges())
+
+class PooledXMLRPCServer(RPCServer):
+    """
+    XML-RPC server that serves requests on a fixed pool of worker threads.
+    Accepted connections wait in a bounded queue; when the queue is full the
+    connection is answered with HTTP 503 instead of piling up.
+    """
+
+    # Response sent to connections that find the queue full
+    busy_response = (b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\n"
+                     b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+
+    # Seconds a rejected client gets to finish sending its request before we hang up
+    reject_timeout = 2.0
+
+    # Rejected connections drained at once, beyond this they are closed right away
+    max_draining = 256
+
+    # HTTP/1.1 keep-alive. A kept-alive connection occupies its worker, so it
+    # is closed after keepalive_idle seconds without a request, or as soon as
+    # other connections are queued. keepalive_timeout limits a stalled request.
+    keep_alive = True
+    keepalive_idle = 2.0
+    keepalive_timeout = 15.0
+
+    def __init__(self, addr, workers=8, queue_size=64, **kwargs):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        super().__init__(addr, **kwargs)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.rejected = 0
+        self._requests = queue.Queue(maxsize=queue_size)
+        self._active = set()  # Connections currently held by a worker
+        self._active_lock = threading.Lock()
+        self._rejected = queue.Queue()
+        self._draining = 0
+        self._drainer = threading.Thread(target=self._drain_rejected, name="rpc-rejected", daemon=True)
+        self._drainer.start()
+        self._threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"rpc-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def queue_depth(self):
+        """
+        Return the number of accepted connections waiting for a worker.
+        """
+        return self._requests.qsize()
+
+    def gauges(self):
+        gauges = super().gauges()
+        gauges["rpc_queue_depth"] = self.queue_depth()
+        gauges["rpc_workers"] = self.workers
+        gauges["rpc_rejected"] = self.rejected
+        return gauges
+
+    def process_request(self, request, client_address):
+        """
+        Queue the connection for a worker, or reject it when the queue is full.
+        """
+        try:
+            self._requests.put_nowait((request, client_address))
+        except queue.Full:
+            self.rejected += 1
+            self._reject_request(request, client_address)
+
+    def _reject_request(self, request, client_address):
+        """
+        Answer a connection with HTTP 503 without waiting for its request, so
+        clients that are slow to send one cannot stall the accepting thread.
+        The connection is then handed to the drain thread.
+        """
+        try:
+            request.setblocking(False)
+            request.sendall(self.busy_response)
+            request.shutdown(socket.SHUT_WR)
+        except OSError:
+            self.shutdown_request(request)
+            return
+        if self._rejected.qsize() + self._draining >= self.max_draining:
+            self.shutdown_request(request)
+        else:
+            self._rejected.put(request)
+
+    def _drain_rejected(self):
+        """
+        Read and discard what rejected clients still send and close their
+        connections once they are done or reject_timeout has passed. Closing
+        a socket with unread data resets the connection, and the client may
+        then never see the 503.
+        """
+        deadlines = {}
+        with selectors.DefaultSelector() as selector:
+            while True:
+                try:
+                    request = self._rejected.get(timeout=0.05 if deadlines else None)
+                except queue.Empty:
+                    request = False
+                if request is None:
+                    break
+                if request:
+                    selector.register(request, selectors.EVENT_READ)
+                    deadlines[request] = time.monotonic() + self.reject_timeout
+                for key, _ in selector.select(0):
+                    try:
+                        data = key.fileobj.recv(65536)
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        data = b""
+                    if not data:
+                        deadlines[key.fileobj] = 0
+                now = time.monotonic()
+                for expired in [r for r, deadline in deadlines.items() if deadline <= now]:
+                    selector.unregister(expired)
+                    del deadlines[expired]
+                    self.shutdown_request(expired)
+                self._draining = len(deadlines)
+            for request in deadlines:
+                self.shutdown_request(request)
+
+    def _worker(self):
+        """
+        Serve queued connections until a None sentinel is received.
+        """
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            request, client_address = item
+            with self._active_lock:
+                self._active.add(request)
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                with self._active_lock:
+                    self._active.discard(request)
+                self.shutdown_request(request)
+
+    def server_close(self):
+        """
+        Close the listening socket and stop the worker threads.
+        """
+        super().server_close()
+        # Wake workers waiting on idle keep-alive connections, replies still go out
+        with self._active_lock:
+            for request in self._active:
+                try:
+                    request.shutdown(socket.SHUT_RD)
+                except OSError:
+                    pass
+        for _ in self._threads:
+            self._requests.put(None)
+        self._rejected.put(None)
+        for thread in self._threads + [self._drainer]:
+            thread.join()
+
+def create_server(host="localhost", port=8000, workers=0, queue_size=64, log_requests=True,
+                  job_manager=None, file_store=None):
+    """
+    Create the RPC server with all functions registered.
+    With workers=0 requests are served one at a time on the calling thread,
+    otherwise a PooledXMLRPCServer with that many worker threads is used.
+    The file transfer functions are only available with a file_store.
+    Without a job_manager, jobs get the limits and admission of run_command.
+    """
+    job_manager = job_manager or JobManager(limits=getattr(command_executor, "limits", None), admission=admission)
+    if workers:
+        server = PooledXMLRPCServer(
+            (host, port), workers=workers, queue_size=queue_size, requestHandler=RPCRequestHandler,
+            allow_none=True, logRequests=log_requests
+        )
+    else:
+        server = RPCServer(
+            (host, port), requestHandler=RPCRequestHandler, allow_none=True, logRequests=log_requests
+        )
+
+    # Register the functions to run commands
+    server.register_function(run_command, "run_command")
+    server.register_function(run_commands, "run_commands")
+    server.register_function(cache_stats, "cache_stats")
+    server.register_function(server.get_metrics, "get_metrics")
+    server.register_multicall_functions()
+    server.register_introspection_functions()
+
+    def start_job(command):
+        """
+        Start a command in the background and return its job id.
+        """
+        return job_manager.start(command, current_client())
+
+    # Register the streaming output functions
+    server.register_function(start_job, "stream_command")
+    server.register_function(job_manager.read_output, "read_output")
+    server.register_function(job_manager.release, "release_job")
+
+    # Register the asynchronous job functions
+    server.register_function(start_job, "submit_command")
+    server.register_function(job_manager.job_status, "job_status")
+    server.register_function(job_manager.job_result, "job_result")
+    server.register_function(job_manager.wait_jobs, "wait_jobs")
+    server.register_function(job_manager.cancel_job, "cancel_job")
+    server.job_manager = job_manager
+
+    # Register the file transfer functions, bulk data also goes over GET and PUT /files/<path>
+    if file_store is not None:
+        server.register_function(file_store.file_info, "file_info")
+        server.register_function(file_store.get_file, "get_file")
+        server.register_function(file_store.put_file, "put_file")
+        server.register_function(file_store.commit_file, "commit_file")
+        server.register_function(file_store.file_checksum, "file_checksum")
+    server.file_store = file_store
+    return server
 
 def main():
     """
     Set up and start the RPC server.
     """
-    server = SimpleXMLRPCServer(("localhost", 8000), allow_none=True)
-    print("RPC server is running on port 8000...")
+    parser = argparse.ArgumentParser(description="Command execution RPC server")
+    parser.add_argument("--host", default="localhost", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=16,
+                        help="Number of worker threads, 0 serves one request at a time")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="Connections allowed to wait for a worker before answering 503")
+    parser.add_argument("--stream-buffer", type=int, default=1024 * 1024,
+                        help="Bytes of output kept per stream of a job")
+    parser.add_argument("--job-retention", type=float, default=3600,
+                        help="Seconds finished jobs are kept for job_status and job_result")
+    parser.add_argument("--max-running-jobs", type=int,
+                        help="Background jobs allowed to run at once, more are rejected (default: 16 per CPU)")
+    parser.add_argument("--max-retained-jobs", type=int, default=1000,
+                        help="Finished jobs kept before the oldest are evicted")
+    parser.add_argument("--executor", choices=sorted(EXECUTORS), default="subprocess",
+                        help="How run_command starts commands: a shell per command, argv lists "
+                             "for simple commands, or a pool of warm shells")
+    parser.add_argument("--shell-pool-size", type=int, default=16,
+                        help="Number of warm shells for --executor shell-pool")
+    parser.add_argument("--cache", action="append", default=[], metavar="PATTERN",
+                        help="Cache results of read-only commands matching this glob, may be repeated")
+    parser.add_argument("--cache-ttl", type=float, default=5.0, help="Seconds a cached result stays valid")
+    parser.add_argument("--cache-size", type=int, default=256, help="Most cached results kept")
+    parser.add_argument("--timeout", type=float, help="Seconds a command may run before it is killed")
+    parser.add_argument("--cpu-limit", type=int, help="CPU seconds per command (RLIMIT_CPU)")
+    parser.add_argument("--memory-limit", type=int, help="Address space per command in MB (RLIMIT_AS)")
+    parser.add_argument("--max-output", type=int,
+                        help="Bytes of stdout and stderr per command, the command is killed beyond this")
+    parser.add_argument("--max-commands-per-client", type=int,
+                        help="Concurrent commands per client address, more are rejected")
+    parser.add_argument("--max-commands", type=int, help="Concurrent commands in total, more are rejected")
+    parser.add_argument("--file-root", help="Directory clients may upload to and download from")
+    args = parser.parse_args()
 
-    # Register the function to run commands
-    server.register_function(run_command, "run_command")
+    global command_executor, command_cache, admission
+    limits = None
+    if any(value is not None for value in (args.timeout, args.cpu_limit, args.memory_limit, args.max_output)):
+        limits = CommandLimits(args.timeout, args.cpu_limit,
+                               args.memory_limit and args.memory_limit * 1024 * 1024, args.max_output)
+    if args.executor == "shell-pool":
+        command_executor = ShellPoolExecutor(args.shell_pool_size, limits=limits)
+    else:
+        command_executor = EXECUTORS[args.executor](limits=limits)
+    if args.max_commands_per_client or args.max_commands:
+        admission = AdmissionController(args.max_commands_per_client or args.max_commands or 1,
+                                        args.max_commands)
+    if args.cache:
+        command_cache = CommandCache(_execute, args.cache, args.cache_ttl, args.cache_size)
+
+    job_manager = JobManager(buffer_size=args.stream_buffer, retention_seconds=args.job_retention,
+                             max_retained=args.max_retained_jobs, max_running=args.max_running_jobs,
+                             limits=limits, admission=admission)
+    file_store = FileStore(args.file_root) if args.file_root else None
+    server = create_server(args.host, args.port, args.workers, args.queue_size, job_manager=job_manager,
+                           file_store=file_store)
+    print(f"RPC server is running on port {args.port}...")
 
     # Start the server
     try:
@@ -31,6 +730,7 @@ def main():
     except KeyboardInterrupt:
         print("\nShutting down the server.")
         server.server_close()
+        command_executor.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,58 @@
+"""
+Commands per second for trivial commands with each run_command executor.
+
+Run from the repository root:
+    python -m benchmarks.bench_executors --count 500 --threads 1 4
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from RPC_executors import SubprocessExecutor, ArgvExecutor, ShellPoolExecutor
+
+def measure(executor, command, count, threads):
+    """
+    Return commands per second running command count times on threads threads.
+    """
+    executor.run(command)  # Warm up, e.g. start the first shell
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda _: executor.run(command), range(count)))
+    elapsed = time.perf_counter() - start
+    failures = sum(1 for r in results if r.get("returncode") != 0)
+    return count / elapsed, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark command executors")
+    parser.add_argument("--count", type=int, default=500, help="Commands per measurement")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4], help="Concurrent callers")
+    parser.add_argument("--commands", nargs="+", default=["true", "echo hello", "uname -r", "ls /"],
+                        help="Commands to run, builtins and external programs")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for threads in args.threads:
+        executors = {
+            "subprocess": SubprocessExecutor(),
+            "argv": ArgvExecutor(),
+            "shell-pool": ShellPoolExecutor(size=threads),
+        }
+        for command in args.commands:
+            for name, executor in executors.items():
+                rate, failures = measure(executor, command, args.count, threads)
+                results.append({"executor": name, "command": command, "threads": threads,
+                                "commands_per_second": round(rate, 1), "failures": failures})
+        for executor in executors.values():
+            executor.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'executor':>11} {'command':>12} {'threads':>8} {'cmd/s':>9} {'failures':>9}")
+    for r in results:
+        print(f"{r['executor']:>11} {r['command']:>12} {r['threads']:>8} "
+              f"{r['commands_per_second']:>9} {r['failures']:>9}")
+
+if __name__ == "__main__":
+    main()
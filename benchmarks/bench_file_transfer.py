@@ -0,0 +1,115 @@
+"""
+Throughput of moving a file through RPC_server: `base64` over run_command,
+chunked get_file/put_file calls, and GET/PUT /files/<path>.
+
+Run from the repository root:
+    python -m benchmarks.bench_file_transfer --size-mb 2048 --cat-max-mb 64
+"""
+import argparse
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from RPC_client import download_file, upload_file
+from RPC_files import FileStore
+from RPC_server import create_server
+
+def write_test_file(path, size):
+    """Write size bytes of incompressible data in 1 MB blocks"""
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as file:
+        for _ in range(size // len(block)):
+            file.write(block)
+        file.write(block[:size % len(block)])
+
+def via_cat(url, root, name, local, chunk):
+    # Binary data has to be base64 encoded to survive run_command's text output
+    result = xmlrpc.client.ServerProxy(url).run_command(f"base64 '{os.path.join(root, name)}'")
+    with open(local, "wb") as file:
+        file.write(base64.b64decode(result["stdout"]))
+
+def via_rpc_download(url, root, name, local, chunk):
+    proxy = xmlrpc.client.ServerProxy(url)
+    offset = 0
+    with open(local, "wb") as file:
+        while True:
+            part = proxy.get_file(name, offset, chunk)
+            file.write(part["data"].data)
+            offset = part["next_offset"]
+            if part["eof"]:
+                return
+
+def via_rpc_upload(url, root, name, local, chunk):
+    proxy = xmlrpc.client.ServerProxy(url)
+    with open(os.path.join(root, name), "rb") as file:
+        offset = 0
+        while True:
+            data = file.read(chunk)
+            if not data and offset:
+                break
+            proxy.put_file("upload.bin", xmlrpc.client.Binary(data), offset)
+            offset += len(data)
+            if not data:
+                break
+    proxy.commit_file("upload.bin")
+
+def via_http_download(url, root, name, local, chunk):
+    download_file(url, name, local, resume=False, verify=False)
+
+def via_http_upload(url, root, name, local, chunk):
+    upload_file(url, "upload.bin", os.path.join(root, name), resume=False, verify=False)
+
+METHODS = {
+    "cat": via_cat,
+    "rpc-download": via_rpc_download,
+    "rpc-upload": via_rpc_upload,
+    "http-download": via_http_download,
+    "http-upload": via_http_upload,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark file transfer methods")
+    parser.add_argument("--size-mb", type=int, nargs="+", default=[256, 2048], help="File sizes to move")
+    parser.add_argument("--cat-max-mb", type=int, default=64,
+                        help="Largest size tried with cat (base64 through run_command), which holds "
+                             "the whole file in memory as text")
+    parser.add_argument("--chunk-mb", type=int, default=8, help="Chunk size of get_file/put_file calls")
+    parser.add_argument("--methods", nargs="+", choices=sorted(METHODS), default=list(METHODS))
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as local:
+        server = create_server("localhost", 0, workers=4, log_requests=False, file_store=FileStore(root))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://localhost:{server.server_address[1]}/"
+        try:
+            for size_mb in args.size_mb:
+                name = f"test-{size_mb}.bin"
+                write_test_file(os.path.join(root, name), size_mb * 1024 * 1024)
+                for method in args.methods:
+                    if method == "cat" and size_mb > args.cat_max_mb:
+                        continue
+                    start = time.perf_counter()
+                    METHODS[method](url, root, name, os.path.join(local, "copy"), args.chunk_mb * 1024 * 1024)
+                    elapsed = time.perf_counter() - start
+                    results.append({"method": method, "size_mb": size_mb, "seconds": round(elapsed, 3),
+                                    "mb_per_second": round(size_mb / elapsed, 1)})
+                os.remove(os.path.join(root, name))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'method':>14} {'size MB':>8} {'seconds':>9} {'MB/s':>9}")
+    for r in results:
+        print(f"{r['method']:>14} {r['size_mb']:>8} {r['seconds']:>9} {r['mb_per_second']:>9}")
+
+if __name__ == "__main__":
+    main()
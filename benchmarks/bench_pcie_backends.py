@@ -0,0 +1,50 @@
+"""
+Time to enumerate PCI devices by reading sysfs with SysfsBackend versus
+starting `lspci -vmm -k` (when it is installed).
+
+Run from the repository root:
+    python -m benchmarks.bench_pcie_backends --repeat 50
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import time
+from PCIe_backends import SysfsBackend
+
+def via_sysfs(root):
+    return len(SysfsBackend(root).pci_devices())
+
+def via_lspci(root):
+    output = subprocess.run(["lspci", "-vmm", "-k"], capture_output=True, text=True, check=True).stdout
+    return output.count("\n\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PCI device enumeration")
+    parser.add_argument("--root", default="/sys/bus/pci/devices", help="sysfs PCI device directory")
+    parser.add_argument("--repeat", type=int, default=20, help="Enumerations per method")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    methods = {"sysfs": via_sysfs}
+    if shutil.which("lspci"):
+        methods["lspci"] = via_lspci
+    results = []
+    for method, function in methods.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            devices = function(args.root)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        results.append({"method": method, "devices": devices, "ms_per_enumeration": round(elapsed * 1000, 3)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'method':>8} {'devices':>8} {'ms':>9}")
+    for r in results:
+        print(f"{r['method']:>8} {r['devices']:>8} {r['ms_per_enumeration']:>9}")
+    if "lspci" not in methods:
+        print("lspci is not installed; only sysfs was measured")
+
+if __name__ == "__main__":
+    main()
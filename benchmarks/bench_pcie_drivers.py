@@ -0,0 +1,54 @@
+"""
+Driver lookup for every PCI device with one Win32_PnPSignedDriver query per
+device (the old check_driver_status) versus one bulk query joined in memory
+(WMIBackend.drivers), against the fake WMI provider from PCIe_fake_wmi.py.
+row_latency makes each query cost time proportional to the rows WMI scans.
+
+Run from the repository root:
+    python -m benchmarks.bench_pcie_drivers --devices 50 200 --other-devices 400
+"""
+import argparse
+import json
+import time
+from PCIe_backends import WMIBackend
+from PCIe_fake_wmi import FakeWMI
+
+def per_device_queries(client):
+    backend = WMIBackend(client)
+    for device in backend.pci_devices():
+        client.query(f"SELECT * FROM Win32_PnPSignedDriver WHERE DeviceID LIKE '%{device['pnp_device_id']}%'")
+
+def bulk_query(client):
+    backend = WMIBackend(client)
+    for device in backend.pci_devices():
+        backend.drivers(device)
+
+METHODS = {"per-device": per_device_queries, "bulk": bulk_query}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark driver lookups over WMI")
+    parser.add_argument("--devices", type=int, nargs="+", default=[50, 200], help="PCI devices on the host")
+    parser.add_argument("--other-devices", type=int, default=400, help="Non-PCI devices with drivers")
+    parser.add_argument("--row-latency", type=float, default=0.00002, help="Seconds per row WMI scans")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for devices in args.devices:
+        for method, function in METHODS.items():
+            client = FakeWMI.generate(devices, args.other_devices, row_latency=args.row_latency)
+            start = time.perf_counter()
+            function(client)
+            elapsed = time.perf_counter() - start
+            results.append({"method": method, "devices": devices, "queries": len(client.queries),
+                            "seconds": round(elapsed, 3)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'method':>11} {'devices':>8} {'queries':>8} {'seconds':>9}")
+    for r in results:
+        print(f"{r['method']:>11} {r['devices']:>8} {r['queries']:>8} {r['seconds']:>9}")
+
+if __name__ == "__main__":
+    main()
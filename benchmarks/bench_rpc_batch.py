@@ -0,0 +1,63 @@
+"""
+Sequential run_command calls versus system.multicall versus run_commands.
+
+Run from the repository root:
+    python -m benchmarks.bench_rpc_batch --commands 200 --parallelism 16
+"""
+import argparse
+import json
+import threading
+import time
+import xmlrpc.client
+from RPC_server import create_server
+from RPC_client import run_commands_multicall, run_commands_batch
+
+def timed(function):
+    start = time.perf_counter()
+    results = function()
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched command execution")
+    parser.add_argument("--commands", type=int, default=200, help="Commands per batch")
+    parser.add_argument("--parallelism", type=int, default=16, help="run_commands parallelism")
+    parser.add_argument("--command", default="echo ok", help="Command to run")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    server = create_server("localhost", 0, workers=4, log_requests=False)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    proxy = xmlrpc.client.ServerProxy(f"http://localhost:{server.server_address[1]}/")
+    commands = [args.command] * args.commands
+
+    cases = {
+        "sequential": lambda: [proxy.run_command(c) for c in commands],
+        "multicall": lambda: run_commands_multicall(proxy, commands),
+        "run_commands": lambda: run_commands_batch(proxy, commands, args.parallelism),
+    }
+    results = []
+    for name, function in cases.items():
+        seconds, outputs = timed(function)
+        failures = sum(1 for r in outputs if r.get("returncode") != 0)
+        results.append({
+            "mode": name,
+            "commands": len(commands),
+            "seconds": round(seconds, 3),
+            "commands_per_second": round(len(commands) / seconds, 1),
+            "failures": failures,
+        })
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':>14} {'seconds':>9} {'cmd/s':>9} {'failures':>9}")
+    for r in results:
+        print(f"{r['mode']:>14} {r['seconds']:>9} {r['commands_per_second']:>9} {r['failures']:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Throughput and latency of RPC_server versus worker count.
+
+Run from the repository root:
+    python -m benchmarks.bench_rpc_workers --workers 0 1 4 16 --clients 32
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from RPC_load_test import percentile
+from RPC_server import create_server
+
+def run_case(workers, clients, requests, queue_size, command):
+    """
+    Start a server with the given worker count and drive it with closed-loop clients.
+    """
+    server = create_server("localhost", 0, workers=workers, queue_size=queue_size, log_requests=False)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://localhost:{server.server_address[1]}/"
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    per_client = max(1, requests // clients)
+
+    def client_loop():
+        nonlocal errors
+        proxy = xmlrpc.client.ServerProxy(url)
+        for _ in range(per_client):
+            start = time.perf_counter()
+            try:
+                result = proxy.run_command(command)
+                ok = result.get("returncode") == 0
+            except (xmlrpc.client.ProtocolError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        for future in [executor.submit(client_loop) for _ in range(clients)]:
+            future.result()
+    wall = time.perf_counter() - start
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+    latencies.sort()
+    return {
+        "workers": workers,
+        "clients": clients,
+        "requests": per_client * clients,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RPC_server worker pool sizes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 4, 16, 32],
+                        help="Worker counts to compare, 0 is the single-threaded server")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent client threads")
+    parser.add_argument("--requests", type=int, default=320, help="Total requests per case")
+    parser.add_argument("--queue-size", type=int, default=256, help="Server request queue size")
+    parser.add_argument("--command", default=f'"{sys.executable}" -c "import time; time.sleep(0.02)"',
+                        help="Command each request runs")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = [run_case(w, args.clients, args.requests, args.queue_size, args.command) for w in args.workers]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'workers':>8} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['throughput_rps']:>9} {r['p50_ms']!s:>9} {r['p99_ms']!s:>9} {r['errors']:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Throughput of SSHConnect's SFTP transfers: a single large upload and
+download, and many small files with transfer_many at several worker counts.
+
+By default the test SSH server from test/ssh_server.py is started on
+localhost; pass --config to measure against a real host instead (remote
+files are written below --remote-dir).
+
+Run from the repository root:
+    python -m benchmarks.bench_sftp --size-mb 256 --files 200 --workers 1 4 8
+"""
+import argparse
+import json
+import os
+import posixpath
+import sys
+import tempfile
+import time
+from ssh_connection_to_remote_mashine import SSHConnect
+
+def write_test_file(path, size):
+    """Write size bytes of incompressible data in 1 MB blocks"""
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as file:
+        for _ in range(size // len(block)):
+            file.write(block)
+        file.write(block[:size % len(block)])
+
+def connect(args, remote_root):
+    if args.config:
+        return SSHConnect(args.config), None, args.remote_dir
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test"))
+    from ssh_server import SSHTestServer
+    server = SSHTestServer()
+    return SSHConnect.from_config(server.config()), server, remote_root
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SFTP transfers")
+    parser.add_argument("--config", help="SSHConnect YAML config of a real host (default: local test server)")
+    parser.add_argument("--remote-dir", default="/tmp", help="Remote directory used with --config")
+    parser.add_argument("--size-mb", type=int, nargs="+", default=[64, 256], help="Sizes of the single file")
+    parser.add_argument("--files", type=int, default=100, help="Number of small files for transfer_many")
+    parser.add_argument("--file-kb", type=int, default=256, help="Size of each small file")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="transfer_many worker counts")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+
+    def record(method, size_mb, workers, elapsed):
+        results.append({"method": method, "size_mb": round(size_mb, 1), "workers": workers,
+                        "seconds": round(elapsed, 3), "mb_per_second": round(size_mb / elapsed, 1)})
+
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as remote_root:
+        ssh, server, remote = connect(args, remote_root)
+        ssh.connect(shell=False)
+        remote = posixpath.join(remote, f"bench-sftp-{os.getpid()}")
+        try:
+            ssh.run(f"mkdir -p '{remote}'")
+            for size_mb in args.size_mb:
+                source = os.path.join(local, "single.bin")
+                write_test_file(source, size_mb * 1024 * 1024)
+                start = time.perf_counter()
+                ssh.upload(source, posixpath.join(remote, "single.bin"))
+                record("upload", size_mb, 1, time.perf_counter() - start)
+                start = time.perf_counter()
+                ssh.download(posixpath.join(remote, "single.bin"), os.path.join(local, "copy.bin"))
+                record("download", size_mb, 1, time.perf_counter() - start)
+                os.remove(source)
+
+            names = [f"small-{index}.bin" for index in range(args.files)]
+            for name in names:
+                write_test_file(os.path.join(local, name), args.file_kb * 1024)
+            total_mb = args.files * args.file_kb / 1024
+            for workers in args.workers:
+                pairs = [(os.path.join(local, name), posixpath.join(remote, name)) for name in names]
+                start = time.perf_counter()
+                ssh.transfer_many(pairs, "upload", workers)
+                record("many-upload", total_mb, workers, time.perf_counter() - start)
+                pairs = [(os.path.join(local, "copy-" + name), posixpath.join(remote, name)) for name in names]
+                start = time.perf_counter()
+                ssh.transfer_many(pairs, "download", workers)
+                record("many-download", total_mb, workers, time.perf_counter() - start)
+        finally:
+            ssh.run(f"rm -rf '{remote}'")
+            ssh.close()
+            if server is not None:
+                server.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'method':>14} {'size MB':>8} {'workers':>8} {'seconds':>9} {'MB/s':>9}")
+    for r in results:
+        print(f"{r['method']:>14} {r['size_mb']:>8} {r['workers']:>8} {r['seconds']:>9} {r['mb_per_second']:>9}")
+
+if __name__ == "__main__":
+    main()
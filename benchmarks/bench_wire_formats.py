@@ -0,0 +1,79 @@
+"""
+CPU cost per MB of command output for each wire format.
+
+The server runs in this process, so process CPU time covers marshalling on
+both the server and the client side. Output is synthesized by a registered
+payload function so subprocess cost does not blur the comparison.
+
+Run from the repository root:
+    python -m benchmarks.bench_wire_formats --sizes 1 8 32
+"""
+import argparse
+import json
+import threading
+import time
+from RPC_server import create_server
+from RPC_client import make_proxy
+
+# Text resembling device listings, including characters XML has to escape
+SAMPLE_LINE = 'DeviceID=PCI\\VEN_8086&DEV_1533 <Intel(R) I210> "OK"\n'
+
+def payload(size):
+    """
+    Return a run_command-shaped result with size bytes of stdout.
+    """
+    repeats = size // len(SAMPLE_LINE) + 1
+    return {"stdout": (SAMPLE_LINE * repeats)[:size], "stderr": "", "returncode": 0}
+
+def measure(proxy, size, repeat):
+    """
+    Return (cpu seconds, wall seconds) per call fetching size bytes.
+    """
+    proxy.payload(1024)  # Warm up the connection
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        result = proxy.payload(size)
+        assert len(result["stdout"]) == size
+    return (time.process_time() - cpu_start) / repeat, (time.perf_counter() - wall_start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RPC wire formats")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32], help="Output sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="Calls per measurement")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    server = create_server("localhost", 0, workers=2, log_requests=False)
+    server.register_function(payload, "payload")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://localhost:{server.server_address[1]}/"
+
+    formats = [("xml", False), ("xml+gzip", True), ("json", False), ("json+gzip", True)]
+    results = []
+    for size_mb in args.sizes:
+        size = size_mb * 1024 * 1024
+        for name, compress in formats:
+            proxy = make_proxy(url, name.split("+")[0], compress=compress)
+            cpu, wall = measure(proxy, size, args.repeat)
+            results.append({
+                "format": name,
+                "size_mb": size_mb,
+                "cpu_ms_per_mb": round(cpu * 1000 / size_mb, 2),
+                "wall_ms_per_mb": round(wall * 1000 / size_mb, 2),
+            })
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'format':>10} {'MB':>5} {'cpu ms/MB':>10} {'wall ms/MB':>11}")
+    for r in results:
+        print(f"{r['format']:>10} {r['size_mb']:>5} {r['cpu_ms_per_mb']:>10} {r['wall_ms_per_mb']:>11}")
+
+if __name__ == "__main__":
+    main()
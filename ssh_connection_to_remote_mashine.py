@@ -1,43 +1,140 @@
 import paramiko
 import yaml
 import argparse
+import hashlib
+import os
+import posixpath
+import re
+import select
+import shlex
+import stat
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Bytes requested per recv from a channel
+BLOCK_SIZE = 64 * 1024
+
+# Flow control window of SFTP channels. The 2 MB default caps throughput at
+# 2 MB per round trip; a larger window keeps more requests in flight.
+SFTP_WINDOW_SIZE = 32 * 1024 * 1024
+
+# Outstanding read requests per download; more keeps high latency links busy
+SFTP_PREFETCH_REQUESTS = 256
+
+def _drain(channel, on_stdout, on_stderr, block_size=BLOCK_SIZE):
+    """Pass all output a channel has buffered to the callbacks"""
+    while channel.recv_ready():
+        on_stdout(channel.recv(block_size))
+    while channel.recv_stderr_ready():
+        on_stderr(channel.recv_stderr(block_size))
+
+def _finished(channel):
+    """True once a channel's command has exited and all its output was read"""
+    return ((channel.closed or (channel.eof_received and channel.exit_status_ready()))
+            and not (channel.recv_ready() or channel.recv_stderr_ready()))
+
+def _result(stdout, stderr, returncode):
+    return {
+        "stdout": stdout.decode('utf-8', errors='replace'),
+        "stderr": stderr.decode('utf-8', errors='replace'),
+        "returncode": returncode
+    }
+
+def read_channel(channel, on_stdout, on_stderr, timeout=None, block_size=BLOCK_SIZE):
+    """
+    Read an exec channel until its command exits, passing stdout and stderr
+    data to the callbacks as it arrives. Both streams are drained together so
+    a command writing a lot to one of them cannot stall on a full window.
+    Returns the exit status, -1 if the server did not send one.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        _drain(channel, on_stdout, on_stderr, block_size)
+        if _finished(channel):
+            return channel.exit_status
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError(f"Command did not finish within {timeout} seconds")
+        if channel.eof_received:
+            # All output is in, the exit status is still on its way
+            channel.status_event.wait(remaining)
+        else:
+            select.select([channel], [], [], remaining)
+
+def _marker_prefix_length(data, marker):
+    """Length of the longest end of data that is a beginning of marker"""
+    for length in range(min(len(marker) - 1, len(data)), 0, -1):
+        if data.endswith(marker[:length]):
+            return length
+    return 0
+
 class SSHConnect:
-    def __init__(self, config_file):
+    def __init__(self, config_file=None, config=None):
         """
-        Initialize the SSHConnect class with configuration file.
+        Initialize the SSHConnect class with a configuration file, or with a
+        dictionary holding the same keys.
         """
         self.config_file = config_file
+        self.config = config
         self.ssh_client = None
         self.shell = None
         self.buffer = ""
+        self._pending = bytearray()  # Shell output received past the end of the last command
+        self._quiet_shell = None  # Shell whose terminal echo execute has turned off
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create an instance from a configuration dictionary instead of a file.
+        """
+        return cls(config=config)
 
     def load_config(self):
         """
         Load the YAML configuration file for SSH credentials.
+        The parsed file is reused until it changes on disk.
         """
+        if self.config is not None:
+            return self.config
+        mtime = os.path.getmtime(self.config_file)
+        cached = _config_cache.get(self.config_file)
+        if cached is not None and cached[0] == mtime:
+            return dict(cached[1])
         with open(self.config_file, 'r') as file:
             config = yaml.safe_load(file)
-        return config
+        _config_cache[self.config_file] = (mtime, config)
+        return dict(config)
 
-    def connect(self):
+    def connect(self, shell=True):
         """
         Setup SSH connection with the remote machine.
+        With shell=False no interactive shell is started, for callers that
+        only use run().
         """
         try:
             config = self.load_config()
             hostname = config.get('hostname')
-            port     = config.get('port')
+            port     = config.get('port', 22)
             username = config.get('username')
             password = config.get('password')
+            key_filename = config.get('key_filename')
 
-            if not all([hostname, port, username, password]):
+            if not all([hostname, port, username]) or not (password or key_filename):
                 raise ValueError("Missing hostname, username, or password in the configuration file.")
 
             self.ssh_client = paramiko.SSHClient()
             self.ssh_client.load_system_host_keys()
             self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self.ssh_client.connect(hostname,port=port, username=username, password=password)
-            self.shell = self.ssh_client.invoke_shell()
+            # look_for_keys and allow_agent: False skips the local keys or agent before the password
+            self.ssh_client.connect(hostname,port=port, username=username, password=password,
+                                    key_filename=key_filename, timeout=config.get('timeout'),
+                                    look_for_keys=config.get('look_for_keys', True),
+                                    allow_agent=config.get('allow_agent', True))
+            if shell:
+                self.shell = self.ssh_client.invoke_shell()
         except paramiko.AuthenticationException:
             raise ConnectionError("Authentication failed, please verify your credentials.")
         except paramiko.SSHException as ssh_exception:
@@ -55,16 +152,360 @@ class SSHConnect:
         else:
             raise ConnectionError("Shell is not active. Please connect first.")
 
+    def run(self, command, timeout=None):
+        """
+        Run a command in its own exec channel and return a dictionary with
+        stdout, stderr and returncode, the same shape RPC_server.run_command
+        returns. Raises TimeoutError if it runs longer than timeout seconds.
+        """
+        channel = self._transport().open_session(timeout=timeout)
+        try:
+            channel.exec_command(command)
+            stdout, stderr = bytearray(), bytearray()
+            returncode = read_channel(channel, stdout.extend, stderr.extend, timeout)
+        finally:
+            channel.close()
+        return _result(stdout, stderr, returncode)
+
+    def run_many(self, commands, max_channels=8, timeout=None):
+        """
+        Run commands concurrently, each on its own exec channel of this one
+        SSH connection, so no extra TCP or SSH handshakes are needed. At most
+        max_channels run at once; OpenSSH allows 10 sessions per connection
+        by default (MaxSessions). Returns one result dictionary per command,
+        in order, like run(). A command still running after timeout seconds,
+        or one whose channel could not be opened, gets an error instead.
+        """
+        transport = self._transport()
+        results = [None] * len(commands)
+        pending = iter(enumerate(commands))
+        active = {}  # channel -> (index, stdout, stderr, deadline)
+
+        def start_next():
+            for index, command in pending:
+                try:
+                    channel = transport.open_session(timeout=timeout)
+                    channel.exec_command(command)
+                except (paramiko.SSHException, EOFError, OSError) as e:
+                    results[index] = {"error": f"Could not start command: {e}"}
+                    continue
+                deadline = None if timeout is None else time.monotonic() + timeout
+                active[channel] = (index, bytearray(), bytearray(), deadline)
+                return
+
+        for _ in range(max(1, max_channels)):
+            start_next()
+        while active:
+            now = time.monotonic()
+            for channel, (index, stdout, stderr, deadline) in list(active.items()):
+                _drain(channel, stdout.extend, stderr.extend)
+                if _finished(channel):
+                    results[index] = _result(stdout, stderr, channel.exit_status)
+                elif deadline is not None and now >= deadline:
+                    results[index] = {"error": f"Command did not finish within {timeout} seconds"}
+                else:
+                    continue
+                channel.close()
+                del active[channel]
+                start_next()
+            if not active:
+                break
+            deadlines = [entry[3] for entry in active.values() if entry[3] is not None]
+            wait = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+            reading = [channel for channel in active if not channel.eof_received]
+            if len(reading) < len(active):
+                # Some channels only wait for their exit status, check back shortly
+                wait = 0.01 if wait is None else min(wait, 0.01)
+            if reading:
+                select.select(reading, [], [], wait)
+            else:
+                time.sleep(wait)
+        return results
+
+    def open_sftp(self, window_size=SFTP_WINDOW_SIZE):
+        """
+        Open an SFTP session on this connection with a large flow control window.
+        """
+        return paramiko.SFTPClient.from_transport(self._transport(), window_size=window_size)
+
+    @contextmanager
+    def _sftp(self, sftp):
+        """Use the given SFTP session, or open one for the duration of the block"""
+        if sftp is not None:
+            yield sftp
+            return
+        sftp = self.open_sftp()
+        try:
+            yield sftp
+        finally:
+            sftp.close()
+
+    def upload(self, local_path, remote_path, progress=None, sftp=None):
+        """
+        Upload a file over SFTP. Writes are pipelined, so the transfer does not
+        wait for the server to acknowledge each 32 KB request. The local mtime
+        is copied to the remote file. progress(done, total) is called as data
+        is sent. Returns the number of bytes transferred.
+        """
+        size = os.path.getsize(local_path)
+        with self._sftp(sftp) as sftp, open(local_path, 'rb') as file:
+            sftp.putfo(file, remote_path, size, progress)
+            local = os.stat(local_path)
+            sftp.utime(remote_path, (local.st_atime, local.st_mtime))
+        return size
+
+    def download(self, remote_path, local_path, progress=None, sftp=None):
+        """
+        Download a file over SFTP with many read requests in flight at once.
+        The file is written next to local_path and renamed when complete; the
+        remote mtime is copied. progress(done, total) is called as data
+        arrives. Returns the number of bytes transferred.
+        """
+        partial = local_path + ".part"
+        with self._sftp(sftp) as sftp:
+            remote = sftp.stat(remote_path)
+            with open(partial, 'wb') as file:
+                sftp.getfo(remote_path, file, progress, prefetch=True,
+                           max_concurrent_prefetch_requests=SFTP_PREFETCH_REQUESTS)
+        os.utime(partial, (remote.st_atime, remote.st_mtime))
+        os.replace(partial, local_path)
+        return remote.st_size
+
+    def transfer_many(self, pairs, direction="upload", workers=4, progress=None):
+        """
+        Transfer many files in parallel, each worker on its own SFTP session of
+        this connection. pairs are (local_path, remote_path). progress(path,
+        done, total) is called from the worker threads. Returns the total
+        bytes transferred; the first failure is raised after all workers stop.
+        """
+        if direction not in ("upload", "download"):
+            raise ValueError(f"Unknown direction: {direction}")
+        sessions = threading.local()
+        opened = []
+        lock = threading.Lock()
+
+        def transfer(pair):
+            local_path, remote_path = pair
+            if not hasattr(sessions, "sftp"):
+                sessions.sftp = self.open_sftp()
+                with lock:
+                    opened.append(sessions.sftp)
+            callback = None
+            if progress is not None:
+                path = local_path if direction == "upload" else remote_path
+                callback = lambda done, total: progress(path, done, total)
+            if direction == "upload":
+                return self.upload(local_path, remote_path, callback, sessions.sftp)
+            return self.download(remote_path, local_path, callback, sessions.sftp)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pairs)))) as executor:
+                return sum(executor.map(transfer, pairs))
+        finally:
+            for sftp in opened:
+                sftp.close()
+
+    def sync_directory(self, local_dir, remote_dir, direction="upload", compare="mtime", workers=4,
+                       progress=None):
+        """
+        Make remote_dir a copy of local_dir (direction="upload") or the other
+        way round, transferring only files that differ. compare="mtime" treats
+        files with equal size and modification time as unchanged; compare=
+        "hash" compares the SHA-256 of files with equal size instead, hashing
+        remote files with sha256sum on the host. Files are never deleted.
+        Returns lists of transferred and skipped relative paths, bytes and seconds.
+        """
+        if compare not in ("mtime", "hash"):
+            raise ValueError(f"Unknown compare mode: {compare}")
+        start = time.perf_counter()
+        with self._sftp(None) as sftp:
+            local_files = _local_tree(local_dir)
+            remote_files = _remote_tree(sftp, remote_dir)
+            if direction == "upload":
+                sources, targets = local_files, remote_files
+            elif direction == "download":
+                sources, targets = remote_files, local_files
+            else:
+                raise ValueError(f"Unknown direction: {direction}")
+
+            candidates = [path for path, (size, mtime) in sources.items()
+                          if path in targets and targets[path][0] == size]
+            if compare == "mtime":
+                unchanged = {path for path in candidates if int(sources[path][1]) == int(targets[path][1])}
+            else:
+                local_hashes = {path: _sha256(os.path.join(local_dir, *path.split("/"))) for path in candidates}
+                remote_hashes = self._remote_sha256(remote_dir, candidates)
+                unchanged = {path for path in candidates if local_hashes[path] == remote_hashes.get(path)}
+
+            changed = sorted(path for path in sources if path not in unchanged)
+            for directory in sorted({posixpath.dirname(path) for path in changed}):
+                if direction == "upload":
+                    _remote_makedirs(sftp, posixpath.join(remote_dir, directory))
+                else:
+                    os.makedirs(os.path.join(local_dir, *directory.split("/")), exist_ok=True)
+
+        pairs = [(os.path.join(local_dir, *path.split("/")), posixpath.join(remote_dir, path)) for path in changed]
+        transferred = self.transfer_many(pairs, direction, workers, progress) if pairs else 0
+        return {
+            "transferred": changed,
+            "skipped": sorted(unchanged),
+            "bytes": transferred,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def _remote_sha256(self, remote_dir, paths, batch=200):
+        """
+        Return {path: sha256} for files below remote_dir, hashed on the host.
+        """
+        hashes = {}
+        for index in range(0, len(paths), batch):
+            names = " ".join(shlex.quote(path) for path in paths[index:index + batch])
+            result = self.run(f"cd {shlex.quote(remote_dir)} && sha256sum -- {names}")
+            for line in result["stdout"].splitlines():
+                digest, _, name = line.partition("  ")
+                hashes[name] = digest
+        return hashes
+
+    def _transport(self):
+        """
+        Return the connection's transport or raise ConnectionError.
+        """
+        transport = self.ssh_client.get_transport() if self.ssh_client else None
+        if transport is None or not transport.is_active():
+            raise ConnectionError("SSH client is not connected.")
+        return transport
+
     def read(self):
         """
         Check if the session is active and read the buffer.
+        Everything the shell has sent so far is returned, not just one packet.
         """
-        if self.shell and self.shell.recv_ready():
-            self.buffer = self.shell.recv(1024).decode('utf-8')
+        if self.shell and (self._pending or self.shell.recv_ready()):
+            data = self._pending
+            self._pending = bytearray()
+            while self.shell.recv_ready():
+                data += self.shell.recv(BLOCK_SIZE)
+            self.buffer = data.decode('utf-8', errors='replace')
             return self.buffer
         else:
             return "No data received or shell is not active."
 
+    def _receive(self, deadline):
+        """
+        Wait until the shell sends data and return it, stderr merged into
+        stdout the way a terminal shows it.
+        """
+        while True:
+            if self.shell.recv_stderr_ready():
+                return self.shell.recv_stderr(BLOCK_SIZE)
+            if self.shell.recv_ready():
+                return self.shell.recv(BLOCK_SIZE)
+            if self.shell.closed or self.shell.eof_received:
+                raise ConnectionError("Shell closed before the command finished.")
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("Shell output did not complete in time.")
+            select.select([self.shell], [], [], remaining)
+
+    def execute(self, command, output=None, timeout=None):
+        """
+        Run a command in the interactive shell and wait until it completes.
+        Completion is detected by markers printed before and after the command,
+        the second one carrying its exit code, so output is complete without
+        sleeping or polling. Output is passed to output (a callable or a binary
+        file) as it arrives; without output it is collected in self.buffer.
+        Returns the exit code. Raises TimeoutError after timeout seconds, the
+        command keeps running in the shell in that case.
+        The first call turns off echo and \n to \r\n translation of the
+        shell's terminal, so output arrives the way the command wrote it.
+        """
+        if not self.shell:
+            raise ConnectionError("Shell is not active. Please connect first.")
+        if output is None:
+            collected = bytearray()
+            write = collected.extend
+        else:
+            write = output.write if hasattr(output, "write") else output
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        setup = ""
+        if self._quiet_shell is not self.shell:
+            setup = "stty -echo -onlcr 2>/dev/null; "
+            self._quiet_shell = self.shell
+        # One input line, so prompts and the echo of the line all come before
+        # the start marker's output. The markers are printed in two halves,
+        # so the echo never contains them.
+        start, end = uuid.uuid4().hex, uuid.uuid4().hex
+        self.shell.send(f"{setup}printf '%s%s\\n' '{start[:16]}' '{start[16:]}'; "
+                        f"eval {shlex.quote(command)}; "
+                        f"printf '%s%s %d\\n' '{end[:16]}' '{end[16:]}' \"$?\"\n")
+        start_marker = start.encode('ascii')
+        end_marker = end.encode('ascii')
+        end_pattern = re.compile(re.escape(end_marker) + rb" (-?\d+)\r?\n")
+
+        data = self._pending
+        self._pending = bytearray()
+        while True:
+            index = data.find(start_marker)
+            newline = data.find(b"\n", index) if index != -1 else -1
+            if newline != -1:
+                del data[:newline + 1]  # Echo and prompts before the command's output
+                break
+            data += self._receive(deadline)
+
+        while True:
+            match = end_pattern.search(data)
+            if match:
+                write(bytes(data[:match.start()]))
+                self._pending = data[match.end():]
+                break
+            # Pass everything on except what may be the start of the end marker
+            index = data.find(end_marker)
+            keep = len(data) - index if index != -1 else _marker_prefix_length(data, end_marker)
+            if len(data) > keep:
+                write(bytes(data[:len(data) - keep]))
+                del data[:len(data) - keep]
+            data += self._receive(deadline)
+
+        if output is None:
+            self.buffer = collected.decode('utf-8', errors='replace')
+        return int(match.group(1))
+
+    def read_until(self, pattern, output=None, timeout=None):
+        """
+        Read the shell until the regular expression pattern, e.g. a prompt,
+        matches the end of what has been received. Output is passed to output
+        as it arrives, or returned as a string without output.
+        """
+        if not self.shell:
+            raise ConnectionError("Shell is not active. Please connect first.")
+        if isinstance(pattern, str):
+            pattern = pattern.encode('utf-8')
+        regex = re.compile(pattern)
+        collected = bytearray()
+        write = collected.extend if output is None else (output.write if hasattr(output, "write") else output)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        window = bytearray()  # Tail of the data already passed on, a match may start in it
+        chunk = self._pending
+        self._pending = bytearray()
+        while True:
+            searched = window + chunk
+            match = regex.search(searched)
+            if match:
+                cut = max(0, match.end() - len(window))
+                write(bytes(chunk[:cut]))
+                self._pending = bytearray(chunk[cut:])
+                break
+            write(bytes(chunk))
+            window = searched[-4096:]
+            chunk = bytearray(self._receive(deadline))
+
+        if output is None:
+            self.buffer = collected.decode('utf-8', errors='replace')
+            return self.buffer
+        return None
+
     def close(self):
         """
         Close the SSH client session.
@@ -84,14 +525,244 @@ class SSHConnect:
 
     
     @classmethod
-    def create_client(cls, config_file):
+    def create_client(cls, config_file, reuse=False):
         """
         Class method to create and return an SSHClient instance.
+        With reuse=True a live connection to the same host, port and user is
+        taken from connection_manager instead of doing a new handshake; such
+        a client is shared and must not be closed by the caller. It is never
+        evicted as idle, only connection_manager.close_all() closes it.
         """
         instance = cls(config_file)
+        if reuse:
+            return connection_manager.get(instance.load_config()).ssh_client
         instance.connect()
         return instance.ssh_client
 
+def _local_tree(root):
+    """Return {relative posix path: (size, mtime)} for the files below root"""
+    files = {}
+    if not os.path.isdir(root):
+        return files
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            info = os.stat(path)
+            files[os.path.relpath(path, root).replace(os.sep, "/")] = (info.st_size, info.st_mtime)
+    return files
+
+def _remote_tree(sftp, root):
+    """Return {relative posix path: (size, mtime)} for the files below a remote directory"""
+    files = {}
+    pending = [""]
+    while pending:
+        relative = pending.pop()
+        try:
+            entries = sftp.listdir_attr(posixpath.join(root, relative) if relative else root)
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            path = posixpath.join(relative, entry.filename) if relative else entry.filename
+            if stat.S_ISDIR(entry.st_mode):
+                pending.append(path)
+            elif stat.S_ISREG(entry.st_mode):
+                files[path] = (entry.st_size, entry.st_mtime)
+    return files
+
+def _remote_makedirs(sftp, path):
+    """Create a remote directory and its parents if they do not exist"""
+    missing = []
+    path = path.rstrip("/")
+    while path not in ("", "/"):
+        try:
+            sftp.stat(path)
+            break
+        except FileNotFoundError:
+            missing.append(path)
+            path = posixpath.dirname(path)
+    for directory in reversed(missing):
+        sftp.mkdir(directory)
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Parsed configuration files by path, with the mtime they were read at
+_config_cache = {}
+
+class _PooledConnection:
+    """A cached connection with the state the manager needs"""
+    def __init__(self, key):
+        self.key = key
+        self.ssh = None
+        self.lock = threading.Lock()
+        self.last_used = 0.0
+        self.users = 0
+
+class SSHConnectionManager:
+    """
+    Keeps SSH connections open and hands them out again, keyed by
+    (hostname, port, username), so repeated calls skip the TCP connect, key
+    exchange and authentication. A cached connection is checked with
+    is_active() before it is reused and replaced if it died. Connections not
+    used for idle_timeout seconds are closed the next time the manager is
+    used. keepalive is the interval in seconds for SSH keepalive packets
+    (0 disables them), a "keepalive" key in a host's config overrides it.
+
+    Connections are connected without an interactive shell and are shared:
+    several threads may run commands on one at the same time (run, run_many),
+    but callers must not close them. A connection taken with get() stays
+    open until every taker has called release().
+    """
+    def __init__(self, idle_timeout=300.0, keepalive=30):
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self._connections = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "connects": 0, "reconnects": 0, "evictions": 0}
+
+    @staticmethod
+    def key(config):
+        """
+        Return the cache key of a configuration: (hostname, port, username).
+        """
+        return (config.get('hostname'), config.get('port', 22), config.get('username'))
+
+    def get(self, config):
+        """
+        Return a connected SSHConnect for the configuration, reusing a live one.
+        The connection is in use, and not evicted as idle, until it is handed
+        back with release(); connection() does that for a with block.
+        """
+        return self._acquire(config).ssh
+
+    def release(self, ssh):
+        """
+        Hand back a connection returned by get().
+        """
+        with self._lock:
+            pooled = next((p for p in self._connections.values() if p.ssh is ssh), None)
+        if pooled is not None:
+            self._release(pooled, ssh)
+
+    @contextmanager
+    def connection(self, config):
+        """
+        Context manager form of get() and release().
+        """
+        pooled = self._acquire(config)
+        ssh = pooled.ssh
+        try:
+            yield ssh
+        finally:
+            self._release(pooled, ssh)
+
+    def _release(self, pooled, ssh):
+        with pooled.lock:
+            # Users of a connection that has been replaced since are not counted
+            if pooled.ssh is ssh and pooled.users:
+                pooled.users -= 1
+                pooled.last_used = time.monotonic()
+
+    def _acquire(self, config):
+        self.evict_idle()
+        key = self.key(config)
+        while True:
+            with self._lock:
+                pooled = self._connections.get(key)
+                if pooled is None:
+                    pooled = self._connections[key] = _PooledConnection(key)
+            # One lock per host, so a slow handshake does not hold up other hosts
+            # and concurrent callers for the same host share one handshake
+            with pooled.lock:
+                with self._lock:
+                    if self._connections.get(key) is not pooled:
+                        continue  # evicted before we got the lock
+                if pooled.ssh is not None and pooled.ssh.is_active():
+                    stat = "hits"
+                else:
+                    stat = "connects"
+                    if pooled.ssh is not None:
+                        stat = "reconnects"
+                        _close_quietly(pooled.ssh)
+                        pooled.ssh = None
+                        pooled.users = 0
+                    ssh = SSHConnect.from_config(config)
+                    ssh.connect(shell=False)
+                    keepalive = config.get('keepalive', self.keepalive)
+                    if keepalive:
+                        ssh.ssh_client.get_transport().set_keepalive(keepalive)
+                    pooled.ssh = ssh
+                pooled.last_used = time.monotonic()
+                pooled.users += 1
+            with self._lock:
+                self._stats[stat] += 1
+            return pooled
+
+    def evict_idle(self):
+        """
+        Close connections nobody holds that have been idle for longer than
+        idle_timeout, and forget them. Dead connections are replaced when
+        they are asked for next.
+        """
+        now = time.monotonic()
+        with self._lock:
+            connections = list(self._connections.values())
+        for pooled in connections:
+            # A connection being set up or handed out right now is not idle
+            if not pooled.lock.acquire(blocking=False):
+                continue
+            try:
+                if pooled.users or (pooled.ssh is not None and now - pooled.last_used < self.idle_timeout):
+                    continue
+                if pooled.ssh is not None:
+                    _close_quietly(pooled.ssh)
+                    pooled.ssh = None
+                    evicted = 1
+                else:
+                    evicted = 0  # a failed connect left the entry empty
+                with self._lock:
+                    if self._connections.get(pooled.key) is pooled:
+                        del self._connections[pooled.key]
+                    self._stats["evictions"] += evicted
+            finally:
+                pooled.lock.release()
+
+    def close_all(self):
+        """
+        Close every cached connection.
+        """
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for pooled in connections:
+            with pooled.lock:
+                if pooled.ssh is not None:
+                    _close_quietly(pooled.ssh)
+                    pooled.ssh = None
+
+    def stats(self):
+        """
+        Return counters of reused, new and re-established connections,
+        evictions, and the number of open connections.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open"] = sum(1 for pooled in self._connections.values() if pooled.ssh is not None)
+        return stats
+
+def _close_quietly(ssh):
+    try:
+        ssh.close()
+    except Exception:
+        pass
+
+# Process-wide connection cache
+connection_manager = SSHConnectionManager()
+
 def main():
     """
     Main method to run the module as a script.
@@ -104,9 +775,9 @@ def main():
     try:
         ssh.connect()
         print("Connection established.")
-        ssh.send_cmd("ls")
+        ssh.execute("ls", timeout=30)
         print("Command output:")
-        print(ssh.read())
+        print(ssh.buffer)
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
@@ -0,0 +1,174 @@
+"""
+Run a command on many hosts over SSH at once.
+
+Hosts come from a YAML inventory:
+
+    defaults:            # applied to every host
+      port: 22
+      username: admin
+      password: secret
+    hosts:
+      web1:
+        hostname: 10.0.0.11
+      web2: 10.0.0.12    # shorthand for {hostname: 10.0.0.12}
+      db1:
+        hostname: 10.0.0.21
+        port: 2222
+    groups:
+      web: [web1, web2]
+      servers: [web, db1]   # groups may contain groups
+
+Example:
+    python ssh_fanout.py ssh_inventory.yaml "uptime" --hosts web --workers 64
+"""
+import argparse
+import fnmatch
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import yaml
+from ssh_connection_to_remote_mashine import SSHConnect
+
+class Inventory:
+    """
+    Hosts with their SSHConnect configuration, and named groups of hosts.
+    """
+    def __init__(self, hosts, groups=None, defaults=None):
+        self.hosts = {}
+        for name, host in hosts.items():
+            if isinstance(host, str):
+                host = {"hostname": host}
+            config = dict(defaults or {})
+            config.update(host or {})
+            config.setdefault("hostname", name)
+            self.hosts[name] = config
+        self.groups = {name: list(members) for name, members in (groups or {}).items()}
+        for name in self.groups:
+            if name in self.hosts:
+                raise ValueError(f"Inventory name used for a host and a group: {name}")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an inventory from a YAML file.
+        """
+        with open(path, 'r') as file:
+            data = yaml.safe_load(file) or {}
+        return cls(data.get("hosts") or {}, data.get("groups"), data.get("defaults"))
+
+    def select(self, patterns=None):
+        """
+        Return host names matching host names, group names or glob patterns,
+        in inventory order. No patterns (or "all") selects every host.
+        """
+        if not patterns or "all" in patterns:
+            return list(self.hosts)
+        selected = set()
+        for pattern in patterns:
+            names = self._expand(pattern, set())
+            if not names:
+                raise ValueError(f"No hosts match {pattern!r}")
+            selected.update(names)
+        return [name for name in self.hosts if name in selected]
+
+    def _expand(self, pattern, seen):
+        if pattern in self.groups:
+            if pattern in seen:
+                raise ValueError(f"Group {pattern!r} contains itself")
+            seen = seen | {pattern}
+            names = set()
+            for member in self.groups[pattern]:
+                names.update(self._expand(member, seen))
+            return names
+        names = {name for name in self.hosts if fnmatch.fnmatchcase(name, pattern)}
+        for group in self.groups:
+            if group != pattern and fnmatch.fnmatchcase(group, pattern):
+                names.update(self._expand(group, seen))
+        return names
+
+    def config(self, name):
+        """
+        Return the SSHConnect configuration dictionary of a host.
+        """
+        return self.hosts[name]
+
+def run_on_host(name, config, command, timeout=None, manager=None):
+    """
+    Connect to one host, run the command and return a result dictionary:
+    host, stdout, stderr, returncode (or error), connect_seconds and seconds.
+    With an SSHConnectionManager the connection is taken from and left in
+    its cache, otherwise a new one is opened and closed.
+    """
+    start = time.perf_counter()
+    result = {"host": name, "connect_seconds": None}
+    config = dict(config, timeout=config.get("timeout", timeout))
+    try:
+        if manager is not None:
+            with manager.connection(config) as ssh:
+                result["connect_seconds"] = round(time.perf_counter() - start, 4)
+                result.update(ssh.run(command, timeout))
+        else:
+            ssh = SSHConnect.from_config(config)
+            try:
+                ssh.connect(shell=False)
+                result["connect_seconds"] = round(time.perf_counter() - start, 4)
+                result.update(ssh.run(command, timeout))
+            finally:
+                if ssh.ssh_client is not None:
+                    ssh.close()
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+def fan_out(inventory, command, hosts=None, max_workers=32, timeout=None, manager=None):
+    """
+    Run a command on the selected hosts, at most max_workers at a time, and
+    yield each host's result as soon as it completes. Hosts that have not
+    started yet are skipped if the caller stops iterating early. Pass an
+    SSHConnectionManager to keep connections open between fan-outs.
+    """
+    names = inventory.select(hosts)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(names))))
+    try:
+        futures = [executor.submit(run_on_host, name, inventory.config(name), command, timeout, manager)
+                   for name in names]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+def main():
+    """
+    Main method to run the module as a script.
+    """
+    parser = argparse.ArgumentParser(description="Run a command on many hosts over SSH")
+    parser.add_argument("inventory", help="Path to the YAML inventory")
+    parser.add_argument("command", help="Command to run on every host")
+    parser.add_argument("--hosts", nargs="+", help="Host names, groups or glob patterns (default: all)")
+    parser.add_argument("--workers", type=int, default=32, help="Hosts handled at the same time")
+    parser.add_argument("--timeout", type=float, help="Seconds allowed per host for connect and command")
+    parser.add_argument("--json", action="store_true", help="Print one JSON result per line")
+    args = parser.parse_args()
+
+    failed = 0
+    start = time.perf_counter()
+    results = fan_out(Inventory.load(args.inventory), args.command, args.hosts, args.workers, args.timeout)
+    for result in results:
+        ok = "error" not in result and result["returncode"] == 0
+        failed += not ok
+        if args.json:
+            print(json.dumps(result), flush=True)
+            continue
+        status = result.get("error") or f"rc={result['returncode']}"
+        print(f"[{result['host']}] {status} {result['seconds']:.2f}s", flush=True)
+        if "error" not in result:
+            sys.stdout.write(result["stdout"])
+            sys.stderr.write(result["stderr"])
+    if not args.json:
+        print(f"{failed} failed, {time.perf_counter() - start:.2f}s total")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+A small SSH server on localhost for the tests, built on paramiko.
+exec requests run the command with the local shell, shell requests
+start an interactive shell (on a pseudo-terminal if the client asked for
+one) and the sftp subsystem serves the local file system; password
+authentication only.
+"""
+import os
+import pty
+import socket
+import subprocess
+import threading
+import time
+import paramiko
+
+USERNAME = "test"
+PASSWORD = "secret"
+
+_host_key = None
+_host_key_lock = threading.Lock()
+
+def host_key():
+    """Generate the server's key once per test run, it takes a moment"""
+    global _host_key
+    with _host_key_lock:
+        if _host_key is None:
+            _host_key = paramiko.RSAKey.generate(2048)
+        return _host_key
+
+class _Interface(paramiko.ServerInterface):
+    def __init__(self, server):
+        self.server = server
+        self.ptys = set()  # Channel ids that asked for a pseudo-terminal
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if (username, password) == (USERNAME, PASSWORD):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_global_request(self, kind, msg):
+        self.server.global_requests.append(kind)
+        return False
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        self.ptys.add(channel.get_id())
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        self.server.commands.append(command.decode())
+        self._start(channel, command.decode(), shell=True)
+        return True
+
+    def check_channel_shell_request(self, channel):
+        if channel.get_id() in self.ptys:
+            threading.Thread(target=_serve_terminal, args=(channel, self.server.shell + ["-i"]),
+                             daemon=True).start()
+        else:
+            self._start(channel, self.server.shell, shell=False)
+        return True
+
+    def _start(self, channel, args, shell):
+        threading.Thread(target=_serve_process, args=(channel, args, shell), daemon=True).start()
+
+def _serve_terminal(channel, args):
+    """
+    Run an interactive shell on a pseudo-terminal for a channel, so it echoes
+    input, prints prompts and translates newlines like on a real host.
+    """
+    master, slave = pty.openpty()
+    process = subprocess.Popen(args, stdin=slave, stdout=slave, stderr=slave, start_new_session=True,
+                               env=dict(os.environ, PS1="$ ", TERM="xterm"))
+    os.close(slave)
+
+    def feed_input():
+        try:
+            while True:
+                data = channel.recv(65536)
+                if not data:
+                    break
+                os.write(master, data)
+        except (OSError, EOFError):
+            pass
+
+    threading.Thread(target=feed_input, daemon=True).start()
+    try:
+        while True:
+            data = os.read(master, 65536)  # EIO once the shell has exited
+            if not data:
+                break
+            channel.sendall(data)
+    except (OSError, EOFError):
+        pass
+    os.close(master)
+    returncode = process.wait()
+    try:
+        channel.send_exit_status(returncode)
+        channel.close()
+    except (OSError, EOFError):
+        pass
+
+def _serve_process(channel, args, shell):
+    """
+    Run a process for a channel, relaying stdin, stdout and stderr.
+    """
+    process = subprocess.Popen(args, shell=shell, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, start_new_session=True)
+
+    def pump(pipe, send):
+        try:
+            while True:
+                data = pipe.read1(65536)
+                if not data:
+                    break
+                send(data)
+        except (OSError, EOFError):
+            pass
+
+    def feed_stdin():
+        try:
+            while True:
+                data = channel.recv(65536)
+                if not data:
+                    break
+                process.stdin.write(data)
+                process.stdin.flush()
+        except (OSError, EOFError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    threading.Thread(target=feed_stdin, daemon=True).start()
+    stderr_thread = threading.Thread(target=pump, args=(process.stderr, channel.sendall_stderr), daemon=True)
+    stderr_thread.start()
+    pump(process.stdout, channel.sendall)
+    stderr_thread.join()
+    returncode = process.wait()
+    try:
+        channel.send_exit_status(returncode)
+        channel.shutdown_write()
+        channel.close()
+    except (OSError, EOFError):
+        pass
+
+def _sftp_errors(function):
+    """Turn OSError into the SFTP status code paramiko expects"""
+    def wrapper(*args):
+        try:
+            return function(*args)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+    return wrapper
+
+class _SFTPHandle(paramiko.SFTPHandle):
+    @_sftp_errors
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    @_sftp_errors
+    def chattr(self, attr):
+        _set_attributes(self.filename, attr)
+        return paramiko.SFTP_OK
+
+def _set_attributes(path, attr):
+    if attr._flags & attr.FLAG_PERMISSIONS:
+        os.chmod(path, attr.st_mode)
+    if attr._flags & attr.FLAG_AMTIME:
+        os.utime(path, (attr.st_atime, attr.st_mtime))
+    if attr._flags & attr.FLAG_SIZE:
+        os.truncate(path, attr.st_size)
+
+class _LocalSFTPServer(paramiko.SFTPServerInterface):
+    """Serves the local file system, paths are used as they are"""
+
+    @_sftp_errors
+    def list_folder(self, path):
+        result = []
+        for name in os.listdir(path):
+            attributes = paramiko.SFTPAttributes.from_stat(os.lstat(os.path.join(path, name)))
+            attributes.filename = name
+            result.append(attributes)
+        return result
+
+    @_sftp_errors
+    def stat(self, path):
+        return paramiko.SFTPAttributes.from_stat(os.stat(path))
+
+    @_sftp_errors
+    def lstat(self, path):
+        return paramiko.SFTPAttributes.from_stat(os.lstat(path))
+
+    @_sftp_errors
+    def open(self, path, flags, attr):
+        mode = attr.st_mode if attr is not None and attr.st_mode is not None else 0o644
+        fd = os.open(path, flags | getattr(os, "O_BINARY", 0), mode)
+        if flags & os.O_WRONLY:
+            fmode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            fmode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            fmode = "rb"
+        handle = _SFTPHandle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(fd, fmode)
+        return handle
+
+    @_sftp_errors
+    def remove(self, path):
+        os.remove(path)
+        return paramiko.SFTP_OK
+
+    @_sftp_errors
+    def rename(self, oldpath, newpath):
+        os.rename(oldpath, newpath)
+        return paramiko.SFTP_OK
+
+    @_sftp_errors
+    def posix_rename(self, oldpath, newpath):
+        os.replace(oldpath, newpath)
+        return paramiko.SFTP_OK
+
+    @_sftp_errors
+    def mkdir(self, path, attr):
+        os.mkdir(path)
+        return paramiko.SFTP_OK
+
+    @_sftp_errors
+    def rmdir(self, path):
+        os.rmdir(path)
+        return paramiko.SFTP_OK
+
+    @_sftp_errors
+    def chattr(self, path, attr):
+        _set_attributes(path, attr)
+        return paramiko.SFTP_OK
+
+class SSHTestServer:
+    """
+    Listens on an ephemeral localhost port. connections counts the TCP
+    connections accepted, commands lists the exec commands received and
+    global_requests the names of global requests such as keepalives.
+    delay seconds pass before each connection's handshake, to imitate a
+    slow host. shell is the command line (a list) serving shell requests.
+    """
+    def __init__(self, delay=0, shell=("/bin/sh",)):
+        self.delay = delay
+        self.shell = list(shell)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(("127.0.0.1", 0))
+        self.socket.listen(128)
+        self.port = self.socket.getsockname()[1]
+        self.connections = 0
+        self.commands = []
+        self.global_requests = []
+        self.transports = []
+        host_key()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def config(self, **overrides):
+        """Return an SSHConnect configuration dictionary for this server"""
+        config = {"hostname": "127.0.0.1", "port": self.port, "username": USERNAME, "password": PASSWORD}
+        config.update(overrides)
+        return config
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.socket.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        if self.delay:
+            time.sleep(self.delay)
+        transport = paramiko.Transport(client)
+        transport.add_server_key(host_key())
+        transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _LocalSFTPServer)
+        self.transports.append(transport)
+        try:
+            transport.start_server(server=_Interface(self))
+        except (paramiko.SSHException, EOFError, OSError):
+            transport.close()
+
+    def close(self):
+        self.socket.close()
+        for transport in self.transports:
+            transport.close()
@@ -0,0 +1,164 @@
+import unittest
+import contextlib
+import io
+import os
+import tempfile
+from PCIe_fake_wmi import FakeWMI, entity, signed_driver
+from PCIe_backends import SysfsBackend, WMIBackend
+from PCEe_tree_check_win import PCIeDiagnostics
+
+def make_device(root, address, attributes, driver=None):
+    """Create a device directory like the kernel's in a fake sysfs tree"""
+    path = os.path.join(root, "devices", address)
+    os.makedirs(path)
+    for name, value in attributes.items():
+        with open(os.path.join(path, name), "w") as file:
+            file.write(value + "\n")
+    if driver:
+        target = os.path.join(root, "drivers", driver)
+        os.makedirs(target, exist_ok=True)
+        os.symlink(target, os.path.join(path, "driver"))
+
+NIC = {
+    "vendor": "0x8086", "device": "0x24f3", "subsystem_vendor": "0x8086", "subsystem_device": "0x0010",
+    "class": "0x028000", "revision": "0x3a", "power_state": "D0",
+    "current_link_speed": "2.5 GT/s PCIe", "max_link_speed": "8.0 GT/s PCIe",
+    "current_link_width": "1", "max_link_width": "1",
+    "aer_dev_correctable": "RxErr 0\nBadTLP 3\nBadDLLP 0\nTOTAL_ERR_COR 3",
+    "aer_dev_nonfatal": "Undefined 0\nTOTAL_ERR_NONFATAL 0",
+    "aer_dev_fatal": "Undefined 0\nTOTAL_ERR_FATAL 0",
+}
+
+class TestSysfsBackend(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        make_device(self.root, "0000:03:00.0", NIC, driver="iwlwifi")
+        make_device(self.root, "0000:00:00.0", {"vendor": "0x8086", "device": "0x1904", "class": "0x060000",
+                                                "revision": "0x08"})
+        self.backend = SysfsBackend(os.path.join(self.root, "devices"))
+
+    def test_devices(self):
+        bridge, nic = self.backend.pci_devices()
+        self.assertEqual(bridge["device_id"], "0000:00:00.0")
+        self.assertEqual(bridge["name"], "Bridge [8086:1904]")
+        self.assertEqual(bridge["status"], "Unknown")
+        self.assertIsNone(bridge["driver"])
+        self.assertIsNone(bridge["max_link_speed"])
+        self.assertEqual(bridge["aer"], {})
+
+        self.assertEqual(nic["name"], "Network controller [8086:24f3]")
+        self.assertEqual(nic["pnp_device_id"], "PCI\\VEN_8086&DEV_24F3&SUBSYS_00108086&REV_3A\\0000:03:00.0")
+        self.assertEqual(nic["status"], "OK")
+        self.assertEqual(nic["driver"], "iwlwifi")
+        self.assertEqual((nic["current_link_speed"], nic["max_link_speed"]), (2.5, 8.0))
+        self.assertEqual((nic["current_link_width"], nic["max_link_width"]), (1, 1))
+        self.assertEqual(nic["aer"], {"correctable": 3, "nonfatal": 0, "fatal": 0})
+        self.assertEqual(nic["aer_counters"]["correctable"]["BadTLP"], 3)
+        self.assertEqual(self.backend.drivers(nic), [{"name": "iwlwifi", "state": "Running", "status": "OK"}])
+        self.assertEqual(self.backend.drivers(bridge), [])
+
+    def test_fatal_errors_mark_the_device(self):
+        make_device(self.root, "0000:04:00.0", dict(NIC, aer_dev_fatal="TOTAL_ERR_FATAL 1"), driver="nvme")
+        self.assertEqual(self.backend.read_device("0000:04:00.0")["status"], "Error")
+
+    def test_diagnostics(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            diagnostics = PCIeDiagnostics(SysfsBackend(os.path.join(self.root, "devices")))
+            diagnostics.run_all_diagnostics()
+        text = output.getvalue()
+        self.assertEqual(len(diagnostics.pcie_devices), 2)
+        self.assertIn("Issue: Link is running below its maximum speed.", text)
+        self.assertNotIn("below its maximum width", text)
+        self.assertIn("correctable: 3", text)
+        self.assertIn("Driver Name: iwlwifi", text)
+        self.assertIn("Skipping event log check: it needs Windows.", text)
+
+class TestWMIBackend(unittest.TestCase):
+    def test_pci_devices(self):
+        client = FakeWMI([entity("PCI\\VEN_8086&DEV_24F3\\4&0", "Wireless", PowerManagementCapabilities=(1, 3)),
+                          entity("ACPI\\PNP0C04\\0", "FPU")])
+        self.assertEqual(WMIBackend(client).pci_devices(), [
+            {"name": "Wireless", "device_id": "PCI\\VEN_8086&DEV_24F3\\4&0", "status": "OK",
+             "pnp_device_id": "PCI\\VEN_8086&DEV_24F3\\4&0", "error_code": 0,
+             "power_management_supported": None, "power_management_capabilities": [1, 3]}])
+
+    def test_drivers_are_fetched_once(self):
+        client = FakeWMI.generate(devices=50, other_devices=20)
+        drivers = client.classes["Win32_PnPSignedDriver"]
+        drivers[3].DeviceID = drivers[3].DeviceID.lower()  # Matched regardless of case
+        drivers[4].State = "Stopped"
+        del drivers[5]
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            diagnostics = PCIeDiagnostics(WMIBackend(client))
+            diagnostics.check_driver_status()
+        text = output.getvalue()
+        self.assertEqual(client.queries, ["Win32_PnPEntity", "Win32_PnPSignedDriver"])
+        self.assertEqual(len(diagnostics.pcie_devices), 50)
+        self.assertEqual(text.count("Driver Name: driver"), 49)
+        self.assertIn("Driver Name: driver3", text)
+        self.assertEqual(text.count("Issue: Driver is not running."), 1)
+        self.assertEqual(text.count("Issue: No driver found for this device."), 1)
+
+    def test_drivers_are_refetched_with_the_devices(self):
+        client = FakeWMI([entity("PCI\\1", "A")], [signed_driver("PCI\\1", "old")])
+        backend = WMIBackend(client)
+        device, = backend.pci_devices()
+        self.assertEqual(backend.drivers(device)[0]["name"], "old")
+        client.classes["Win32_PnPSignedDriver"] = [signed_driver("PCI\\1", "new")]
+        self.assertEqual(backend.drivers(device)[0]["name"], "old")
+        device, = backend.pci_devices()
+        self.assertEqual(backend.drivers(device)[0]["name"], "new")
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeWMI.generate(devices=20, other_devices=10)
+        entities = self.client.classes["Win32_PnPEntity"]
+        entities[2].ConfigManagerErrorCode = 28
+        entities[2].Status = "Error"
+        entities[7].ConfigManagerErrorCode = 43
+        entities[7].PowerManagementSupported = True
+        entities[7].PowerManagementCapabilities = (1,)
+
+    def test_snapshot(self):
+        snapshot = WMIBackend(self.client).snapshot()
+        self.assertEqual((len(snapshot), snapshot.backend), (20, "wmi"))
+        self.assertEqual([device["name"] for device in snapshot.with_errors()], ["PCI device 2", "PCI device 7"])
+        self.assertEqual(snapshot.devices[0]["drivers"][0]["name"], "driver0")
+
+    def test_checks_read_the_snapshot(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            diagnostics = PCIeDiagnostics(WMIBackend(self.client))
+            diagnostics.diagnose_devices()
+            diagnostics.check_driver_status()
+            diagnostics.check_hardware_errors()
+            diagnostics.check_power_state()
+            diagnostics.check_power_status()
+            diagnostics.check_yellow_bang_devices()
+        text = output.getvalue()
+        # One query for the devices and one for their drivers, whatever runs afterwards
+        self.assertEqual(self.client.queries, ["Win32_PnPEntity", "Win32_PnPSignedDriver"])
+        self.assertIn("Issue: Device has error code 28.", text)
+        self.assertEqual(text.count("No hardware errors detected."), 18)
+        self.assertIn("Error Code: 43\nIssue: Unknown error code.", text)
+        self.assertIn("Error Code: 28\nIssue: Unknown error code.", text)
+        self.assertEqual(text.count("Power Management: Supported"), 1)
+        self.assertIn("Power Management Capabilities: [1]", text)
+
+    def test_failed_enumeration(self):
+        class Broken(FakeWMI):
+            def Win32_PnPEntity(self):
+                raise OSError("RPC server unavailable")
+
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            diagnostics = PCIeDiagnostics(WMIBackend(Broken()))
+        self.assertEqual(diagnostics.pcie_devices, [])
+        self.assertEqual(len(diagnostics.snapshot), 0)
+        self.assertIn("RPC server unavailable", output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import io
+import os
+import tempfile
+import time
+from PCIe_log import LogIndex, parse_log, parse_value
+
+LOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PCIe_diagnostic_results.log")
+
+def dump(*devices):
+    """Format devices the way wmic /format:list does"""
+    text = "PCIe Diagnostic Results:\n\n\n\n\n"
+    for device in devices:
+        text += "".join(f"{key}={value}\n\n" for key, value in device.items()) + "\n\n\n"
+    return text
+
+class TestParseLog(unittest.TestCase):
+    def test_values(self):
+        self.assertIsNone(parse_value("Service", ""))
+        self.assertIs(parse_value("Present", "TRUE"), True)
+        self.assertEqual(parse_value("ConfigManagerErrorCode", "28"), 28)
+        self.assertEqual(parse_value("DeviceID", "PCI\\VEN_8086&amp;DEV_1577\\6&amp;0"), "PCI\\VEN_8086&DEV_1577\\6&0")
+        self.assertEqual(parse_value("HardwareID", '{"ACPI\\VEN_PNP&amp;DEV_0C04","*PNP0C04"}'),
+                         ["ACPI\\VEN_PNP&DEV_0C04", "*PNP0C04"])
+        self.assertEqual(parse_value("PowerManagementCapabilities", "{1,3}"), [1, 3])
+        self.assertEqual(parse_value("ClassGuid", "{4d36e97d-e325-11ce-bfc1-08002be10318}"),
+                         "{4d36e97d-e325-11ce-bfc1-08002be10318}")
+
+    def test_records(self):
+        text = dump({"Name": "A", "DeviceID": "PCI\\1", "ConfigManagerErrorCode": "0"},
+                    {"Name": "B", "DeviceID": "PCI\\2", "ConfigManagerErrorCode": "28"})
+        records = list(parse_log(io.StringIO(text.replace("\n", "\r\n"))))
+        self.assertEqual(records, [{"Name": "A", "DeviceID": "PCI\\1", "ConfigManagerErrorCode": 0},
+                                   {"Name": "B", "DeviceID": "PCI\\2", "ConfigManagerErrorCode": 28}])
+
+    def test_repeated_key_starts_a_record(self):
+        records = list(parse_log(io.StringIO("Name=A\n\nDeviceID=1\n\nName=B\n\nDeviceID=2\n")))
+        self.assertEqual([r["Name"] for r in records], ["A", "B"])
+
+    def test_sample_log(self):
+        records = list(parse_log(LOG))
+        self.assertEqual(len(records), 178)
+        self.assertTrue(all(len(record) == 26 for record in records))
+        self.assertEqual(sorted(r["ConfigManagerErrorCode"] for r in records if r["ConfigManagerErrorCode"]),
+                         [28, 43])
+        self.assertFalse(any("&amp;" in (r["DeviceID"] or "") for r in records))
+
+class TestLogIndex(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.index = LogIndex(os.path.join(self.directory, "index.db"))
+        self.addCleanup(self.index.close)
+
+    def write(self, name, *devices):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as file:
+            file.write(dump(*devices))
+        return path
+
+    def test_query(self):
+        first = self.write("a.log", {"DeviceID": "PCI\\VEN_8086&amp;DEV_1", "PNPClass": "Net",
+                                     "ConfigManagerErrorCode": "0"},
+                           {"DeviceID": "ACPI\\PNP0C04", "PNPClass": "System", "ConfigManagerErrorCode": "0"})
+        second = self.write("b.log", {"DeviceID": "PCI\\VEN_8086&amp;DEV_1", "PNPClass": "Net",
+                                      "ConfigManagerErrorCode": "10"})
+        self.assertEqual(self.index.add(first), 2)
+        self.assertEqual(self.index.add(second), 1)
+
+        matches = list(self.index.query(device_id="PCI\\VEN_8086*"))
+        self.assertEqual([(os.path.basename(path), d["ConfigManagerErrorCode"]) for path, d in matches],
+                         [("a.log", 0), ("b.log", 10)])
+        self.assertEqual([d["PNPClass"] for _, d in self.index.query(errors_only=True)], ["Net"])
+        self.assertEqual(len(list(self.index.query(pnp_class="System"))), 1)
+        self.assertEqual(len(list(self.index.query(error_code=0, log_path=second))), 0)
+
+    def test_reindexes_only_changed_logs(self):
+        path = self.write("a.log", {"DeviceID": "1", "ConfigManagerErrorCode": "0"})
+        self.assertEqual(self.index.add(path), 1)
+        self.assertIsNone(self.index.add(path))
+        self.write("a.log", {"DeviceID": "1", "ConfigManagerErrorCode": "0"},
+                   {"DeviceID": "2", "ConfigManagerErrorCode": "22"})
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        self.assertEqual(self.index.add(path), 2)
+        self.assertEqual([log["devices"] for log in self.index.logs()], [2])
+        self.assertEqual(len(list(self.index.query())), 2)
+        self.index.remove(path)
+        self.assertEqual(list(self.index.query()), [])
+
+if __name__ == '__main__':
+    unittest.main()
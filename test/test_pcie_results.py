@@ -0,0 +1,85 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import tempfile
+from PCIe_fake_wmi import FakeWMI
+from PCIe_backends import WMIBackend
+from PCIe_results import device_issues, device_record, diff_records, read_jsonl, update_state, write_jsonl
+from PCEe_tree_check_win import PCIeDiagnostics
+
+class TestRecords(unittest.TestCase):
+    def test_device_record(self):
+        device = {"name": "NIC", "device_id": "0000:03:00.0", "pnp_device_id": "PCI\\VEN_8086", "status": "OK",
+                  "error_code": None, "drivers": [{"name": "iwlwifi", "state": "Running", "status": "OK"}],
+                  "current_link_speed": 2.5, "max_link_speed": 8.0, "aer": {"correctable": 3, "fatal": 0}}
+        record = device_record(device)
+        self.assertNotIn("error_code", record)
+        self.assertEqual(record["type"], "device")
+        self.assertEqual(record["issues"], ["link_speed_degraded", "aer_correctable"])
+        self.assertEqual(json.loads(json.dumps(record)), record)
+
+    def test_issues(self):
+        self.assertEqual(device_issues({"status": "Error", "error_code": 28, "drivers": []}),
+                         ["error_code:28", "status:Error", "no_driver"])
+        self.assertEqual(device_issues({"status": "OK", "error_code": 0,
+                                        "drivers": [{"name": "e1000", "state": "Stopped", "status": "OK"}]}),
+                         ["driver_not_running:e1000"])
+        self.assertEqual(device_issues({"status": "OK", "power_state": "D3hot"}), ["low_power"])
+
+    def test_diff(self):
+        previous = [{"type": "snapshot", "taken": 1.0},
+                    {"type": "device", "device_id": "a", "status": "OK", "issues": []},
+                    {"type": "device", "device_id": "b", "status": "OK", "issues": []},
+                    {"type": "device", "device_id": "c", "status": "OK", "issues": []}]
+        current = [{"type": "snapshot", "host": "h", "taken": 2.0},
+                   {"type": "device", "device_id": "a", "status": "OK", "issues": []},
+                   {"type": "device", "device_id": "c", "status": "Error", "error_code": 10, "issues": ["error_code:10"]},
+                   {"type": "device", "device_id": "d", "status": "OK", "issues": []}]
+        header, *changes = diff_records(previous, current)
+        self.assertEqual(header, {"type": "diff", "host": "h", "backend": None, "taken": 2.0, "previous_taken": 1.0,
+                                  "added": 1, "removed": 1, "changed": 1})
+        self.assertEqual([(c["type"], c["device_id"]) for c in changes], [("removed", "b"), ("changed", "c"),
+                                                                         ("added", "d")])
+        self.assertEqual(changes[1]["changes"], {"status": ["OK", "Error"], "issues": [[], ["error_code:10"]],
+                                                 "error_code": [None, 10]})
+
+class TestState(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.state = os.path.join(directory.name, "state.jsonl")
+        self.client = FakeWMI.generate(devices=30)
+        self.client.classes["Win32_PnPEntity"][4].PowerManagementCapabilities = (1, 3)
+
+    def results(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return PCIeDiagnostics(WMIBackend(self.client)).results(host="host1")
+
+    def test_only_changes_are_reported(self):
+        first = update_state(self.state, self.results())
+        self.assertEqual((first[0]["added"], len(first)), (30, 31))
+        self.assertEqual(read_jsonl(self.state)[0]["devices"], 30)
+
+        unchanged = update_state(self.state, self.results())
+        self.assertEqual(unchanged, [dict(unchanged[0], added=0, removed=0, changed=0)])
+
+        self.client.classes["Win32_PnPEntity"][7].ConfigManagerErrorCode = 43
+        del self.client.classes["Win32_PnPEntity"][9]
+        header, *changes = update_state(self.state, self.results())
+        self.assertEqual((header["added"], header["removed"], header["changed"]), (0, 1, 1))
+        changed = next(c for c in changes if c["type"] == "changed")
+        self.assertEqual(changed["changes"]["error_code"], [0, 43])
+        self.assertEqual(changed["changes"]["issues"], [[], ["error_code:43"]])
+
+    def test_jsonl(self):
+        output = io.StringIO()
+        write_jsonl(self.results(), output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 31)
+        self.assertEqual(json.loads(lines[0])["host"], "host1")
+        self.assertEqual(json.loads(lines[5])["power_management_capabilities"], [1, 3])
+
+if __name__ == '__main__':
+    unittest.main()
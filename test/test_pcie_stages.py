@@ -0,0 +1,95 @@
+import unittest
+import contextlib
+import io
+import subprocess
+import sys
+import threading
+import time
+from PCIe_fake_wmi import FakeWMI
+from PCIe_backends import WMIBackend
+from PCIe_stages import Stage, run_stages
+from PCEe_tree_check_win import PCIeDiagnostics
+
+def sleeper(seconds, value):
+    def stage():
+        time.sleep(seconds)
+        return value
+    return stage
+
+def failing():
+    raise FileNotFoundError("wevtutil not found")
+
+class TestRunStages(unittest.TestCase):
+    def test_concurrent_and_ordered(self):
+        start = time.perf_counter()
+        results = run_stages([Stage("slow", sleeper(0.4, "a")), Stage("fast", sleeper(0.1, "b")),
+                              Stage("broken", failing)])
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, 0.7)
+        self.assertEqual([(r["name"], r["status"], r["result"]) for r in results],
+                         [("slow", "ok", "a"), ("fast", "ok", "b"), ("broken", "error", None)])
+        self.assertEqual(results[2]["error"], "wevtutil not found")
+        self.assertGreaterEqual(results[0]["seconds"], 0.4)
+
+    def test_timeout(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        start = time.perf_counter()
+        results = run_stages([Stage("stuck", release.wait, timeout=0.2), Stage("quick", sleeper(0, 1), timeout=5)])
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual([r["status"] for r in results], ["timeout", "ok"])
+        self.assertIn("timed out after 0.2 seconds", results[0]["error"])
+
+    def test_subprocess_timeout(self):
+        def stage():
+            return subprocess.run([sys.executable, "-c", "import time; time.sleep(5)"], timeout=0.2)
+
+        result, = run_stages([Stage("command", stage, timeout=5)])
+        self.assertEqual(result["status"], "timeout")
+        self.assertLess(result["seconds"], 5)
+        self.assertIn("timed out after", result["error"])
+
+    def test_foreground_runs_while_stages_run(self):
+        started = threading.Event()
+        seen = []
+
+        def stage():
+            started.set()
+            time.sleep(0.2)
+
+        run_stages([Stage("background", stage)], foreground=lambda: seen.append(started.wait(1)))
+        self.assertEqual(seen, [True])
+
+class TestRunAllDiagnostics(unittest.TestCase):
+    def test_external_commands_run_concurrently(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            diagnostics = PCIeDiagnostics(WMIBackend(FakeWMI.generate(devices=5)), log_file="unused.log")
+        diagnostics.query_event_logs = lambda timeout=None: sleeper(0.4, "<Event>9</Event>")()
+        diagnostics.write_diagnostic_log = lambda timeout=None: sleeper(0.4, "devices.log")()
+
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            stages = diagnostics.run_all_diagnostics()
+        self.assertLess(time.perf_counter() - start, 0.75)
+        self.assertEqual([(s["name"], s["status"]) for s in stages], [("event_logs", "ok"), ("diagnostic_log", "ok")])
+        text = output.getvalue()
+        order = [text.index(marker) for marker in ("Checking power status", "<Event>9</Event>",
+                                                   "Diagnostic results written to devices.log",
+                                                   "Checking for devices with a yellow bang")]
+        self.assertEqual(order, sorted(order))
+
+    def test_failed_stage_is_reported(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            diagnostics = PCIeDiagnostics(WMIBackend(FakeWMI.generate(devices=1)), stage_timeout=0.2)
+        diagnostics.query_event_logs = lambda timeout=None: failing()
+        diagnostics.write_diagnostic_log = lambda timeout=None: sleeper(1, "late.log")()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            stages = diagnostics.run_all_diagnostics()
+        self.assertEqual([s["status"] for s in stages], ["error", "timeout"])
+        self.assertIn("An error occurred while checking event logs: wevtutil not found", output.getvalue())
+        self.assertIn("diagnostic_log timed out", output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
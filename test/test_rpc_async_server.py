@@ -0,0 +1,173 @@
+import unittest
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from RPC_async_server import AsyncRPCServer
+
+def sleep_command(seconds):
+    return f'"{sys.executable}" -c "import time; time.sleep({seconds})"'
+
+def exchange(address, request):
+    """Send a raw request and return everything the server sends until it closes."""
+    with socket.create_connection(address) as client:
+        client.settimeout(10)
+        client.sendall(request)
+        data = b""
+        while chunk := client.recv(65536):
+            data += chunk
+    return data
+
+class TestAsyncRPCServer(unittest.TestCase):
+    def start_server(self, **kwargs):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        server = AsyncRPCServer("localhost", 0, **kwargs)
+        asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+
+        def stop():
+            asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+        self.addCleanup(stop)
+        return server, f"http://localhost:{server.server_address[1]}/"
+
+    def test_run_command_contract(self):
+        _, url = self.start_server()
+        proxy = xmlrpc.client.ServerProxy(url)
+        response = proxy.run_command("echo Hello, World!")
+        self.assertEqual(response["returncode"], 0)
+        self.assertIn("Hello, World!", response["stdout"])
+
+        response = proxy.run_command("invalid_command")
+        self.assertNotEqual(response["returncode"], 0)
+        self.assertNotEqual(response["stderr"], "")
+
+        response = proxy.run_command([sys.executable, "-c", "print(6 * 7)"])
+        self.assertEqual(response["stdout"].strip(), "42")
+
+    def test_unknown_method_is_fault(self):
+        _, url = self.start_server()
+        with self.assertRaises(xmlrpc.client.Fault):
+            xmlrpc.client.ServerProxy(url).no_such_method()
+
+    def test_timeout(self):
+        _, url = self.start_server(timeout=0.5)
+        start = time.monotonic()
+        response = xmlrpc.client.ServerProxy(url).run_command(sleep_command(10))
+        self.assertIn("timed out", response["error"])
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_client_timeout_cannot_exceed_server_timeout(self):
+        _, url = self.start_server(timeout=0.5)
+        start = time.monotonic()
+        response = xmlrpc.client.ServerProxy(url).run_command(sleep_command(10), 60)
+        self.assertEqual(response["error"], "Command timed out after 0.5 seconds")
+        self.assertLess(time.monotonic() - start, 5)
+
+        response = xmlrpc.client.ServerProxy(url).run_command(sleep_command(10), 0.2)
+        self.assertEqual(response["error"], "Command timed out after 0.2 seconds")
+
+    def test_client_disconnect_kills_command(self):
+        server, _ = self.start_server()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        pid_file = os.path.join(directory.name, "pid")
+        command = [sys.executable, "-c",
+                   f"import os, time; open({pid_file!r}, 'w').write(str(os.getpid())); time.sleep(30)"]
+        body = xmlrpc.client.dumps((command,), "run_command").encode()
+        client = socket.create_connection(server.server_address)
+        client.sendall(b"POST /RPC2 HTTP/1.1\r\nHost: localhost\r\nContent-Type: text/xml\r\n"
+                       b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        deadline = time.monotonic() + 5
+        while not (os.path.exists(pid_file) and os.path.getsize(pid_file)):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        pid = int(open(pid_file).read())
+        self.assertEqual(server.in_flight, 1)
+
+        client.close()
+        while server.in_flight:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pid, 0)
+
+    def test_half_close_still_gets_response(self):
+        server, _ = self.start_server()
+        body = xmlrpc.client.dumps(([sys.executable, "-c", "import time; time.sleep(1); print(42)"],),
+                                   "run_command").encode()
+        with socket.create_connection(server.server_address) as client:
+            client.settimeout(10)
+            client.sendall(b"POST /RPC2 HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+            client.shutdown(socket.SHUT_WR)
+            data = b""
+            while chunk := client.recv(65536):
+                data += chunk
+        head, _, body = data.partition(b"\r\n\r\n<")
+        self.assertIn(b"HTTP/1.1 200 OK", head)
+        response, = xmlrpc.client.loads(b"<" + body)[0]
+        self.assertEqual(response["stdout"].strip(), "42")
+
+    def test_pipelined_requests(self):
+        server, _ = self.start_server()
+        bodies = [xmlrpc.client.dumps((sleep_command(0.2),), "run_command").encode(),
+                  xmlrpc.client.dumps(((sys.executable, "-c", "print(42)"),), "run_command").encode()]
+        requests = [b"POST /RPC2 HTTP/1.1\r\nContent-Length: %d\r\n%s\r\n" % (len(body), connection) + body
+                    for body, connection in zip(bodies, (b"", b"Connection: close\r\n"))]
+        with socket.create_connection(server.server_address) as client:
+            client.sendall(b"".join(requests))
+            data = b""
+            while chunk := client.recv(65536):
+                data += chunk
+        self.assertEqual(data.count(b"HTTP/1.1 200 OK"), 2)
+        self.assertIn(b"42", data)
+
+    def test_invalid_content_length_is_bad_request(self):
+        server, _ = self.start_server()
+        data = exchange(server.server_address,
+                        b"POST /RPC2 HTTP/1.1\r\nContent-Length: abc\r\n\r\n<methodCall/>")
+        self.assertTrue(data.startswith(b"HTTP/1.1 400 Bad Request"))
+        self.assertIn(b"Connection: close", data)
+
+    def test_invalid_gzip_body_is_bad_request(self):
+        server, _ = self.start_server()
+        body = b"this is not gzip"
+        data = exchange(server.server_address,
+                        b"POST /RPC2 HTTP/1.1\r\nContent-Encoding: gzip\r\n"
+                        b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        self.assertTrue(data.startswith(b"HTTP/1.1 400 Bad Request"))
+        self.assertIn(b"Connection: close", data)
+
+    def test_commands_run_concurrently(self):
+        _, url = self.start_server()
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            results = list(executor.map(
+                lambda _: xmlrpc.client.ServerProxy(url).run_command(sleep_command(0.5)), range(20)
+            ))
+        self.assertTrue(all(r["returncode"] == 0 for r in results))
+        self.assertLess(time.monotonic() - start, 4)
+
+    def test_concurrency_limit(self):
+        server, url = self.start_server(max_concurrency=2)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                lambda _: xmlrpc.client.ServerProxy(url).run_command(sleep_command(0.5)), range(4)
+            ))
+        self.assertTrue(all(r["returncode"] == 0 for r in results))
+        # Four commands with two slots need at least two rounds
+        self.assertGreaterEqual(time.monotonic() - start, 1.0)
+        self.assertEqual(server.in_flight, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import sys
+import threading
+import time
+import xmlrpc.client
+from RPC_server import create_server, run_commands
+from RPC_client import run_commands_multicall, run_commands_batch
+
+class TestRunCommands(unittest.TestCase):
+    def test_results_keep_order(self):
+        results = run_commands([f"echo {i}" for i in range(20)], parallelism=5)
+        self.assertEqual([r["stdout"].strip() for r in results], [str(i) for i in range(20)])
+
+    def test_empty_batch(self):
+        self.assertEqual(run_commands([]), [])
+
+    def test_batch_runs_concurrently(self):
+        command = f'"{sys.executable}" -c "import time; time.sleep(0.5)"'
+        start = time.monotonic()
+        results = run_commands([command] * 8, parallelism=8)
+        self.assertTrue(all(r["returncode"] == 0 for r in results))
+        self.assertLess(time.monotonic() - start, 2.5)
+
+class TestBatchRPC(unittest.TestCase):
+    def setUp(self):
+        self.server = create_server("localhost", 0, workers=2, log_requests=False)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.proxy = xmlrpc.client.ServerProxy(f"http://localhost:{self.server.server_address[1]}/")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_multicall(self):
+        results = run_commands_multicall(self.proxy, ["echo a", "echo b"])
+        self.assertEqual([r["stdout"].strip() for r in results], ["a", "b"])
+
+    def test_run_commands_batch(self):
+        commands = [f"echo {i}" for i in range(7)]
+        results = run_commands_batch(self.proxy, commands, parallelism=4, batch_size=3)
+        self.assertEqual([r["stdout"].strip() for r in results], [str(i) for i in range(7)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import RPC_server
+from RPC_cache import CommandCache
+
+class CountingRunner:
+    def __init__(self, delay=0):
+        self.calls = 0
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, command):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        return {"stdout": f"{command} #{calls}", "stderr": "", "returncode": 0}
+
+class TestCommandCache(unittest.TestCase):
+    def test_allowlist(self):
+        runner = CountingRunner()
+        cache = CommandCache(runner, ["lspci*", "uname -a"])
+        self.assertTrue(cache.is_cacheable("lspci -vv"))
+        self.assertTrue(cache.is_cacheable("uname -a"))
+        self.assertFalse(cache.is_cacheable("uname -r"))
+        cache.run("uname -r")
+        cache.run("uname -r")
+        self.assertEqual(runner.calls, 2)
+        self.assertEqual(cache.stats()["uncacheable"], 2)
+
+    def test_shell_metacharacters_are_not_cached(self):
+        cache = CommandCache(CountingRunner(), ["lspci*"])
+        for command in ["lspci; rm x", "lspci && rm x", "lspci | sh", "lspci $(rm x)", "lspci `rm x`",
+                        "lspci > /etc/passwd", "lspci\nrm x"]:
+            self.assertFalse(cache.is_cacheable(command), command)
+
+    def test_hit_and_ttl(self):
+        runner = CountingRunner()
+        cache = CommandCache(runner, ["*"], ttl=0.2)
+        first = cache.run("lspci")
+        self.assertEqual(cache.run("lspci"), first)
+        self.assertEqual(runner.calls, 1)
+        time.sleep(0.3)
+        self.assertNotEqual(cache.run("lspci"), first)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (1, 2, 1))
+
+    def test_lru_eviction(self):
+        runner = CountingRunner()
+        cache = CommandCache(runner, ["*"], max_size=2)
+        cache.run("a")
+        cache.run("b")
+        cache.run("a")  # b is now least recently used
+        cache.run("c")
+        self.assertEqual(cache.stats()["evictions"], 1)
+        cache.run("a")
+        self.assertEqual(runner.calls, 3)
+        cache.run("b")
+        self.assertEqual(runner.calls, 4)
+
+    def test_single_flight(self):
+        runner = CountingRunner(delay=0.3)
+        cache = CommandCache(runner, ["*"])
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            results = list(executor.map(lambda _: cache.run("inventory"), range(20)))
+        self.assertEqual(runner.calls, 1)
+        self.assertEqual(len(set(r["stdout"] for r in results)), 1)
+        self.assertEqual(cache.stats()["coalesced"], 19)
+
+    def test_errors_are_not_cached(self):
+        calls = []
+
+        def failing(command):
+            calls.append(command)
+            return {"error": "could not start"}
+
+        cache = CommandCache(failing, ["*"])
+        cache.run("x")
+        cache.run("x")
+        self.assertEqual(len(calls), 2)
+
+class TestRunCommandCache(unittest.TestCase):
+    def tearDown(self):
+        RPC_server.command_cache = None
+
+    def test_run_command_uses_cache(self):
+        self.assertEqual(RPC_server.cache_stats(), {"enabled": False})
+        RPC_server.command_cache = CommandCache(RPC_server._execute, ["date +%N"])
+        first = RPC_server.run_command("date +%N")
+        self.assertEqual(RPC_server.run_command("date +%N"), first)
+        self.assertEqual(RPC_server.cache_stats()["hits"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import os
+from concurrent.futures import ThreadPoolExecutor
+from RPC_executors import split_command, SubprocessExecutor, ArgvExecutor, ShellPoolExecutor
+
+class TestSplitCommand(unittest.TestCase):
+    def test_simple_commands_are_split(self):
+        self.assertEqual(split_command("uname -r"), ["uname", "-r"])
+        self.assertEqual(split_command("ls 'a b'"), ["ls", "a b"])
+
+    def test_builtins_stay_in_shell(self):
+        for command in ["echo hello world", "true", "printf x", "test -d /"]:
+            self.assertIsNone(split_command(command), command)
+
+    def test_shell_features_need_shell(self):
+        for command in ["echo a | cat", "echo $HOME", "ls *", "echo a > f", "A=1 env",
+                        "echo safe && echo hacked", "invalid_command", "", "echo 'open"]:
+            self.assertIsNone(split_command(command), command)
+
+class ExecutorContract:
+    def test_success(self):
+        response = self.executor.run("echo Hello, World!")
+        self.assertEqual(response["returncode"], 0)
+        self.assertIn("Hello, World!", response["stdout"])
+
+    def test_invalid(self):
+        response = self.executor.run("invalid_command")
+        self.assertNotEqual(response["returncode"], 0)
+        self.assertIn("not found", response["stderr"])
+
+    def test_stderr_and_returncode(self):
+        response = self.executor.run("echo oops >&2; exit 3")
+        self.assertEqual(response["returncode"], 3)
+        self.assertEqual(response["stderr"].strip(), "oops")
+
+    def test_empty(self):
+        response = self.executor.run("")
+        self.assertEqual(response["returncode"], 0)
+        self.assertEqual(response["stdout"], "")
+
+@unittest.skipIf(os.name == "nt", "POSIX shell required")
+class TestSubprocessExecutor(ExecutorContract, unittest.TestCase):
+    def setUp(self):
+        self.executor = SubprocessExecutor()
+
+@unittest.skipIf(os.name == "nt", "POSIX shell required")
+class TestArgvExecutor(ExecutorContract, unittest.TestCase):
+    def setUp(self):
+        self.executor = ArgvExecutor()
+
+@unittest.skipIf(os.name == "nt", "POSIX shell required")
+class TestShellPoolExecutor(ExecutorContract, unittest.TestCase):
+    def setUp(self):
+        self.executor = ShellPoolExecutor(size=2, timeout=2)
+        self.addCleanup(self.executor.close)
+
+    def test_output_without_newline(self):
+        self.assertEqual(self.executor.run("printf abc")["stdout"], "abc")
+
+    def test_state_does_not_leak(self):
+        start = self.executor.run("pwd")["stdout"]
+        self.executor.run("cd / && FOO=bar && export FOO")
+        self.assertEqual(self.executor.run("pwd")["stdout"], start)
+        self.assertEqual(self.executor.run("echo ${FOO:-unset}")["stdout"].strip(), "unset")
+
+    def test_syntax_error_and_stdin(self):
+        self.assertNotEqual(self.executor.run('echo "unterminated')["returncode"], 0)
+        # Reading stdin must not swallow the shell's own input
+        self.assertEqual(self.executor.run("cat")["returncode"], 0)
+        self.assertEqual(self.executor.run("echo still here")["stdout"], "still here\n")
+
+    def test_timeout_and_dead_shell_are_replaced(self):
+        self.assertIn("timed out", self.executor.run("sleep 10")["error"])
+        self.assertIn("error", self.executor.run("kill $$"))
+        self.assertEqual(self.executor.run("echo ok")["stdout"], "ok\n")
+
+    def test_concurrent_use(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: self.executor.run(f"echo {i}"), range(50)))
+        self.assertEqual([r["stdout"].strip() for r in results], [str(i) for i in range(50)])
+
+if __name__ == "__main__":
+    unittest.main()
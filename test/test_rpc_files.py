@@ -0,0 +1,176 @@
+import unittest
+import hashlib
+import http.client
+import os
+import tempfile
+import threading
+import xmlrpc.client
+import RPC_server
+from RPC_client import download_file, upload_file
+from RPC_files import FileStore
+
+class TestFileStore(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.store = FileStore(self.root)
+
+    def test_paths_outside_root_are_refused(self):
+        os.symlink("/etc", os.path.join(self.root, "etc"))
+        for path in ["../x", "/../../etc/passwd", "a/../../x", "etc/passwd", "", "."]:
+            with self.assertRaises(ValueError, msg=path):
+                self.store.resolve(path)
+        self.assertEqual(self.store.resolve("/a/b"), os.path.join(self.store.root, "a", "b"))
+
+    def test_partial_upload_symlink_is_refused(self):
+        outside = tempfile.TemporaryDirectory()
+        self.addCleanup(outside.cleanup)
+        target = os.path.join(outside.name, "target")
+        os.symlink(target, os.path.join(self.root, "f.part"))
+        with self.assertRaises(ValueError):
+            self.store.put_file("f", b"abc")
+        with self.assertRaises(ValueError):
+            self.store.file_info("f")
+        self.assertFalse(os.path.exists(target))
+
+    def test_chunked_upload_resume_and_commit(self):
+        data = os.urandom(300000)
+        self.assertEqual(self.store.put_file("dir/f.bin", data[:100000], 0), 100000)
+        with self.assertRaises(ValueError):
+            self.store.put_file("dir/f.bin", data[200000:], 200000)  # gap
+        self.assertEqual(self.store.file_info("dir/f.bin")["partial_size"], 100000)
+        self.store.put_file("dir/f.bin", xmlrpc.client.Binary(data[100000:]), 100000)
+        self.assertFalse(self.store.file_info("dir/f.bin")["exists"])
+
+        info = self.store.commit_file("dir/f.bin", hashlib.sha256(data).hexdigest())
+        self.assertEqual((info["exists"], info["size"], info["partial_size"]), (True, 300000, 0))
+        chunk = self.store.get_file("dir/f.bin", 299000, 5000)
+        self.assertEqual(chunk["data"].data, data[299000:])
+        self.assertTrue(chunk["eof"])
+        self.assertEqual(self.store.file_checksum("dir/f.bin", "md5"), hashlib.md5(data).hexdigest())
+
+    def test_checksum_mismatch_discards_upload(self):
+        self.store.put_file("f", b"abc")
+        with self.assertRaises(ValueError):
+            self.store.commit_file("f", hashlib.sha256(b"abd").hexdigest())
+        self.assertEqual(self.store.file_info("f")["partial_size"], 0)
+        with self.assertRaises(ValueError):
+            self.store.commit_file("f")
+
+class TestFileTransfer(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = os.path.join(directory.name, "root")
+        self.local = os.path.join(directory.name, "local")
+        os.mkdir(self.root)
+        os.mkdir(self.local)
+        self.server = RPC_server.create_server("localhost", 0, workers=4, log_requests=False,
+                                               file_store=FileStore(self.root))
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.port = self.server.server_address[1]
+        self.url = f"http://localhost:{self.port}/"
+        self.data = os.urandom(3 * 1024 * 1024 + 17)
+        with open(os.path.join(self.local, "source"), "wb") as file:
+            file.write(self.data)
+
+    def read(self, path):
+        with open(path, "rb") as file:
+            return file.read()
+
+    def test_upload_and_download(self):
+        info = upload_file(self.url, "logs/a.bin", os.path.join(self.local, "source"))
+        self.assertEqual(info["size"], len(self.data))
+        self.assertEqual(self.read(os.path.join(self.root, "logs", "a.bin")), self.data)
+
+        progress = []
+        target = os.path.join(self.local, "copy")
+        size = download_file(self.url, "logs/a.bin", target, progress=lambda done, total: progress.append(done))
+        self.assertEqual(size, len(self.data))
+        self.assertEqual(self.read(target), self.data)
+        self.assertEqual(progress[-1], len(self.data))
+        self.assertFalse(os.path.exists(target + ".part"))
+
+    def test_resume_upload(self):
+        with open(os.path.join(self.root, "b.bin.part"), "wb") as file:
+            file.write(self.data[:1000000])
+        sent = []
+        upload_file(self.url, "b.bin", os.path.join(self.local, "source"),
+                    progress=lambda done, total: sent.append(done))
+        self.assertEqual(self.read(os.path.join(self.root, "b.bin")), self.data)
+        self.assertGreater(sent[0], 1000000)
+
+    def test_resume_download(self):
+        with open(os.path.join(self.root, "c.bin"), "wb") as file:
+            file.write(self.data)
+        target = os.path.join(self.local, "c.bin")
+        with open(target + ".part", "wb") as file:
+            file.write(self.data[:2000000])
+        received = []
+        download_file(self.url, "c.bin", target, progress=lambda done, total: received.append(done))
+        self.assertEqual(self.read(target), self.data)
+        self.assertGreater(received[0], 2000000)
+
+        # A stale partial file longer than the remote file starts over
+        with open(target + ".part", "wb") as file:
+            file.write(self.data + b"extra")
+        download_file(self.url, "c.bin", target)
+        self.assertEqual(self.read(target), self.data)
+
+    def test_range_requests(self):
+        with open(os.path.join(self.root, "d.bin"), "wb") as file:
+            file.write(self.data)
+        connection = http.client.HTTPConnection("localhost", self.port)
+        self.addCleanup(connection.close)
+        for header, expected in [("bytes=10-19", self.data[10:20]), ("bytes=-5", self.data[-5:]),
+                                 (f"bytes={len(self.data) - 3}-", self.data[-3:])]:
+            connection.request("GET", "/files/d.bin", headers={"Range": header})
+            response = connection.getresponse()
+            self.assertEqual(response.status, 206)
+            self.assertEqual(response.read(), expected)
+        connection.request("GET", "/files/d.bin", headers={"Range": f"bytes={len(self.data)}-"})
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 416)
+
+    def test_errors(self):
+        connection = http.client.HTTPConnection("localhost", self.port)
+        self.addCleanup(connection.close)
+        connection.request("GET", "/files/missing")
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 404)
+        connection.request("GET", "/files/%2e%2e/%2e%2e/etc/passwd")
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 403)
+        proxy = xmlrpc.client.ServerProxy(self.url)
+        with self.assertRaises(xmlrpc.client.Fault):
+            proxy.get_file("../outside")
+
+    def test_put_needs_valid_content_length(self):
+        for content_length, status in ((None, 411), ("abc", 400), ("-1", 400)):
+            connection = http.client.HTTPConnection("localhost", self.port)
+            self.addCleanup(connection.close)
+            connection.putrequest("PUT", "/files/upload")
+            if content_length is not None:
+                connection.putheader("Content-Length", content_length)
+            connection.endheaders()
+            response = connection.getresponse()
+            response.read()
+            self.assertEqual(response.status, status, content_length)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "upload.part")))
+
+    def test_disabled_without_file_store(self):
+        server = RPC_server.create_server("localhost", 0, log_requests=False)
+        self.addCleanup(server.server_close)
+        self.assertIsNone(server.file_store)
+        self.assertNotIn("get_file", server.system_listMethods())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import unittest
+import sys
+import threading
+import time
+import xmlrpc.client
+from RPC_jobs import OutputRingBuffer, JobManager
+from RPC_server import create_server
+from RPC_client import iter_output, stream_command, run_jobs
+
+def python_command(code):
+    return f'"{sys.executable}" -c "{code}"'
+
+class TestOutputRingBuffer(unittest.TestCase):
+    def test_read_within_capacity(self):
+        buffer = OutputRingBuffer(10)
+        buffer.write(b"hello")
+        self.assertEqual(buffer.read(0, 100), (b"hello", 0))
+        self.assertEqual(buffer.read(3, 1), (b"l", 3))
+        self.assertEqual(buffer.read(5, 10), (b"", 5))
+
+    def test_oldest_bytes_are_dropped(self):
+        buffer = OutputRingBuffer(4)
+        buffer.write(b"abc")
+        buffer.write(b"defg")
+        self.assertEqual(buffer.start, 3)
+        self.assertEqual(buffer.end, 7)
+        self.assertEqual(buffer.read(0, 100), (b"defg", 3))
+
+class TestJobManager(unittest.TestCase):
+    def test_read_output_until_eof(self):
+        manager = JobManager()
+        job_id = manager.start(python_command("print('x' * 100000)"))
+        received = b""
+        offset = 0
+        while True:
+            chunk = manager.read_output(job_id, offset, wait=5)
+            received += chunk["data"].data
+            offset = chunk["next_offset"]
+            if chunk["eof"]:
+                break
+        self.assertEqual(received.strip(), b"x" * 100000)
+        manager.get_job(job_id).process.wait()
+
+    def test_small_buffer_reports_dropped_bytes(self):
+        manager = JobManager(buffer_size=1000)
+        job_id = manager.start(python_command("print('y' * 50000)"))
+        job = manager.get_job(job_id)
+        with job.condition:
+            job.condition.wait_for(lambda: job.done, timeout=10)
+        chunk = manager.read_output(job_id, 0)
+        self.assertGreater(chunk["dropped"], 0)
+        self.assertLessEqual(len(chunk["data"].data), 1000)
+        self.assertTrue(chunk["eof"])
+        self.assertEqual(chunk["returncode"], 0)
+
+    def test_stderr_and_unknown_job(self):
+        manager = JobManager()
+        job_id = manager.start(python_command("import sys; sys.stderr.write('oops')"))
+        chunk = manager.read_output(job_id, 0, "stderr", wait=5)
+        self.assertEqual(chunk["data"].data, b"oops")
+        with self.assertRaises(ValueError):
+            manager.read_output("missing", 0)
+        manager.release(job_id)
+        with self.assertRaises(ValueError):
+            manager.get_job(job_id)
+
+    def test_release_kills_running_job(self):
+        manager = JobManager()
+        job_id = manager.start(python_command("import time; time.sleep(30)"))
+        job = manager.get_job(job_id)
+        manager.release(job_id)
+        self.assertNotEqual(job.process.wait(timeout=5), 0)
+
+class TestJobAPI(unittest.TestCase):
+    def test_submit_wait_and_result(self):
+        manager = JobManager()
+        job_ids = [manager.start(python_command(f"print({i})")) for i in range(5)]
+        waited = manager.wait_jobs(job_ids, 10)
+        self.assertEqual(sorted(waited["done"]), sorted(job_ids))
+        self.assertEqual(waited["pending"], [])
+        for i, job_id in enumerate(job_ids):
+            self.assertEqual(manager.job_status(job_id)["state"], "finished")
+            result = manager.job_result(job_id)
+            self.assertEqual(result["stdout"].strip(), str(i))
+            self.assertEqual(result["returncode"], 0)
+            self.assertFalse(result["truncated"])
+
+    def test_wait_timeout_and_cancel(self):
+        manager = JobManager()
+        slow = manager.start(python_command("import time; time.sleep(30)"))
+        fast = manager.start(python_command("print(1)"))
+        waited = manager.wait_jobs([slow, fast], 10, "any")
+        self.assertEqual(waited, {"done": [fast], "pending": [slow]})
+        self.assertEqual(manager.wait_jobs([slow], 0.1)["pending"], [slow])
+        with self.assertRaises(ValueError):
+            manager.job_result(slow)
+
+        self.assertTrue(manager.cancel_job(slow))
+        manager.wait_jobs([slow], 10)
+        self.assertEqual(manager.job_status(slow)["state"], "cancelled")
+        self.assertFalse(manager.cancel_job(fast))
+
+    def test_max_running(self):
+        manager = JobManager(max_running=2)
+        slow = [manager.start(python_command("import time; time.sleep(30)")) for _ in range(2)]
+        with self.assertRaisesRegex(ValueError, "Too many running jobs"):
+            manager.start(python_command("print(1)"))
+        self.assertEqual(manager.running, 2)
+        manager.cancel_job(slow[0])
+        manager.wait_jobs(slow[:1], 10)
+        manager.wait_jobs([manager.start(python_command("print(1)"))], 10)
+        manager.cancel_job(slow[1])
+        manager.wait_jobs(slow[1:], 10)
+        self.assertEqual(manager.running, 0)
+
+    def test_read_output_wait_is_capped(self):
+        manager = JobManager()
+        manager.max_wait = 0.2
+        job_id = manager.start(python_command("import time; time.sleep(30)"))
+        self.addCleanup(manager.release, job_id)
+        start = time.monotonic()
+        chunk = manager.read_output(job_id, 0, wait=30)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertFalse(chunk["eof"])
+
+    def test_eviction(self):
+        manager = JobManager(max_retained=2)
+        job_ids = []
+        for i in range(4):
+            job_ids.append(manager.start(python_command(f"print({i})")))
+            manager.wait_jobs(job_ids[-1:], 10)
+        manager.start(python_command("print(4)"))
+        with self.assertRaises(ValueError):
+            manager.job_status(job_ids[0])
+        self.assertEqual(manager.job_status(job_ids[3])["state"], "finished")
+
+        manager = JobManager(retention_seconds=0)
+        job_id = manager.start(python_command("print(1)"))
+        job = manager.get_job(job_id)
+        with job.condition:
+            job.condition.wait_for(lambda: job.done, timeout=10)
+        manager.start(python_command("print(2)"))
+        with self.assertRaises(ValueError):
+            manager.job_status(job_id)
+
+class TestStreamingRPC(unittest.TestCase):
+    def setUp(self):
+        self.server = create_server("localhost", 0, workers=4, log_requests=False)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.proxy = xmlrpc.client.ServerProxy(f"http://localhost:{self.server.server_address[1]}/")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_stream_over_rpc(self):
+        code = "import time\\nfor i in range(3):\\n    print(i, flush=True)\\n    time.sleep(0.1)"
+        chunks = []
+        returncode = stream_command(self.proxy, python_command(f"exec('{code}')"), chunks.append)
+        self.assertEqual(returncode, 0)
+        self.assertEqual(b"".join(chunks).split(), [b"0", b"1", b"2"])
+
+    def test_iter_output(self):
+        job_id = self.proxy.stream_command(python_command("print('z' * 300000)"))
+        data = b"".join(iter_output(self.proxy, job_id))
+        self.assertEqual(data.strip(), b"z" * 300000)
+        self.assertTrue(self.proxy.release_job(job_id))
+
+    def test_run_jobs_over_rpc(self):
+        commands = [python_command(f"print({i})") for i in range(10)]
+        results = run_jobs(self.proxy, commands)
+        self.assertEqual([r["stdout"].strip() for r in results], [str(i) for i in range(10)])
+
+        results = run_jobs(self.proxy, [python_command("import time; time.sleep(30)")], timeout=0.5)
+        self.assertIn("did not finish", results[0]["error"])
+
+if __name__ == "__main__":
+    unittest.main()
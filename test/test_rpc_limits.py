@@ -0,0 +1,163 @@
+import unittest
+import os
+import subprocess
+import sys
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+import RPC_server
+from RPC_executors import SubprocessExecutor, ArgvExecutor, ShellPoolExecutor
+from RPC_jobs import JobManager
+from RPC_limits import AdmissionController, CommandLimits
+
+PYTHON = f'"{sys.executable}"'
+
+class LimitsContract:
+    def make_executor(self, limits):
+        raise NotImplementedError
+
+    def run_limited(self, command, **limits):
+        executor = self.make_executor(CommandLimits(**limits))
+        self.addCleanup(executor.close)
+        return executor.run(command)
+
+    def test_unlimited_command(self):
+        result = self.run_limited("echo ok", timeout=5, max_output=100)
+        self.assertEqual(result, {"stdout": "ok\n", "stderr": "", "returncode": 0})
+
+    def test_timeout_kills_command_and_children(self):
+        start = time.monotonic()
+        result = self.run_limited("sleep 10; echo done", timeout=0.5)
+        self.assertIn("timed out", result["error"])
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_output_cap(self):
+        result = self.run_limited(f"{PYTHON} -c \"print('x' * 10000000)\"", max_output=1000)
+        self.assertTrue(result["truncated"])
+        self.assertLessEqual(len(result["stdout"]) + len(result["stderr"]), 1000)
+        self.assertGreater(len(result["stdout"]), 0)
+
+    def test_cpu_limit(self):
+        result = self.run_limited(f"{PYTHON} -c \"while True: pass\"", cpu_seconds=1, timeout=20)
+        self.assertNotEqual(result["returncode"], 0)
+
+    def test_memory_limit(self):
+        result = self.run_limited(f"{PYTHON} -c \"b = bytearray(1024 ** 3)\"", memory_bytes=256 * 1024 ** 2)
+        self.assertNotEqual(result["returncode"], 0)
+        self.assertIn("MemoryError", result["stderr"])
+
+@unittest.skipIf(os.name == "nt", "POSIX rlimits required")
+class TestSubprocessLimits(LimitsContract, unittest.TestCase):
+    def make_executor(self, limits):
+        return SubprocessExecutor(limits)
+
+@unittest.skipIf(os.name == "nt", "POSIX rlimits required")
+class TestArgvLimits(LimitsContract, unittest.TestCase):
+    def make_executor(self, limits):
+        return ArgvExecutor(limits)
+
+    def test_direct_exec_output_cap(self):
+        result = self.run_limited("head -c 100000 /dev/zero", max_output=10)
+        self.assertEqual(result["stdout"], "\0" * 10)
+
+@unittest.skipIf(os.name == "nt", "POSIX shell required")
+class TestShellPoolLimits(LimitsContract, unittest.TestCase):
+    def make_executor(self, limits):
+        return ShellPoolExecutor(size=1, limits=limits)
+
+    def test_shell_is_replaced_after_limit(self):
+        executor = ShellPoolExecutor(size=1, limits=CommandLimits(max_output=100))
+        self.addCleanup(executor.close)
+        self.assertTrue(executor.run("yes")["truncated"])
+        self.assertEqual(executor.run("echo ok")["stdout"], "ok\n")
+
+@unittest.skipIf(os.name == "nt", "POSIX shell required")
+class TestCommandLimits(unittest.TestCase):
+    def test_wrap(self):
+        self.assertEqual(CommandLimits(timeout=5).wrap("echo ok"), "echo ok")
+        self.assertEqual(CommandLimits(timeout=5).wrap(["echo", "ok"]), ["echo", "ok"])
+        limits = CommandLimits(cpu_seconds=7, memory_bytes=512 * 1024 ** 2)
+        self.assertEqual(limits.wrap("echo ok"), "ulimit -t 7; ulimit -v 524288; echo ok")
+        output = subprocess.run(limits.wrap(["sh", "-c", "ulimit -t; ulimit -v; echo \"$0 $1\"", "a b", "c"]),
+                                capture_output=True, text=True).stdout
+        self.assertEqual(output.split("\n"), ["7", "524288", "a b c", ""])
+
+@unittest.skipIf(os.name == "nt", "POSIX rlimits required")
+class TestJobLimits(unittest.TestCase):
+    def test_rlimits_and_timeout(self):
+        manager = JobManager(limits=CommandLimits(timeout=0.5, cpu_seconds=7))
+        job_id = manager.start("ulimit -t")
+        manager.wait_jobs([job_id], 10)
+        self.assertEqual(manager.job_result(job_id)["stdout"], "7\n")
+
+        start = time.monotonic()
+        job_id = manager.start("sleep 10")
+        manager.wait_jobs([job_id], 10)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(manager.job_result(job_id), {"error": "Command timed out after 0.5 seconds"})
+        self.assertEqual(manager.running, 0)
+
+class TestAdmissionController(unittest.TestCase):
+    def test_per_client_cap(self):
+        admission = AdmissionController(2)
+        self.assertTrue(admission.try_acquire("a"))
+        self.assertTrue(admission.try_acquire("a"))
+        self.assertFalse(admission.try_acquire("a"))
+        self.assertTrue(admission.try_acquire("b"))
+        admission.release("a")
+        self.assertTrue(admission.try_acquire("a"))
+        self.assertEqual(admission.stats(), {"running": 3, "clients": 2, "rejected": 1})
+
+    def test_total_cap(self):
+        admission = AdmissionController(2, max_total=3)
+        for client in ["a", "a", "b"]:
+            self.assertTrue(admission.try_acquire(client))
+        self.assertFalse(admission.try_acquire("c"))
+        admission.release("b")
+        self.assertTrue(admission.try_acquire("c"))
+        self.assertEqual(admission.stats()["clients"], 2)
+
+@unittest.skipIf(os.name == "nt", "POSIX shell required")
+class TestServerAdmission(unittest.TestCase):
+    def setUp(self):
+        previous = RPC_server.admission
+        RPC_server.admission = AdmissionController(2)
+        self.addCleanup(setattr, RPC_server, "admission", previous)
+        self.server = RPC_server.create_server("localhost", 0, workers=8, log_requests=False)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://localhost:{self.server.server_address[1]}/"
+
+    def test_client_over_cap_is_rejected(self):
+        def call(_):
+            return xmlrpc.client.ServerProxy(self.url).run_command("sleep 0.5")
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(call, range(5)))
+        rejected = [r for r in results if "error" in r]
+        self.assertEqual(len(results) - len(rejected), 2)
+        self.assertIn("Too many concurrent commands", rejected[0]["error"])
+        self.assertEqual(RPC_server.admission.running, 0)
+
+    def test_jobs_hold_admission_slots(self):
+        proxy = xmlrpc.client.ServerProxy(self.url)
+        jobs = [proxy.submit_command("sleep 0.5"), proxy.stream_command("sleep 0.5")]
+        for method in ("submit_command", "stream_command"):
+            with self.assertRaisesRegex(xmlrpc.client.Fault, "Too many concurrent commands"):
+                getattr(proxy, method)("echo over the cap")
+        self.assertIn("Too many concurrent commands", proxy.run_command("echo")["error"])
+        proxy.wait_jobs(jobs, 10)
+        self.assertEqual(RPC_server.admission.running, 0)
+        self.assertEqual(proxy.run_command("echo ok")["stdout"], "ok\n")
+
+    def test_batch_stays_within_cap(self):
+        proxy = xmlrpc.client.ServerProxy(self.url)
+        results = proxy.run_commands([f"echo {i}" for i in range(10)], 8)
+        self.assertEqual([r["stdout"] for r in results], [f"{i}\n" for i in range(10)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from RPC_load_test import output_command, parse_mix, percentile, run_load, running_server
+
+class TestLoadTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.context = running_server(workers=4)
+        cls.url = cls.context.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.context.__exit__(None, None, None)
+
+    def test_closed_loop_report(self):
+        report = run_load(self.url, ["echo ok"], mode="closed", concurrency=4, duration=5, requests=40)
+        self.assertEqual(report["requests"], 40)
+        self.assertEqual(report["error_rate"], 0.0)
+        self.assertGreater(report["throughput_rps"], 0)
+        latency = report["latency_ms"]
+        self.assertLessEqual(latency["p50"], latency["p95"])
+        self.assertLessEqual(latency["p95"], latency["p99"])
+        self.assertLessEqual(latency["p99"], latency["max"])
+
+    def test_open_loop_keeps_schedule(self):
+        report = run_load(self.url, ["echo ok"], mode="open", rate=40, concurrency=8, duration=0.5)
+        self.assertEqual(report["requests"], 20)
+        # 20 requests at 40/s are scheduled over half a second
+        self.assertGreaterEqual(report["duration_seconds"], 0.45)
+
+    def test_errors_are_counted(self):
+        report = run_load(self.url, ["echo ok", "exit 3"], weights=[1, 1], mode="closed",
+                          concurrency=2, duration=5, requests=40, seed=1)
+        self.assertEqual(report["requests"], 40)
+        self.assertGreater(report["errors"]["nonzero_exit"], 0)
+        self.assertAlmostEqual(report["error_rate"], report["errors"]["nonzero_exit"] / 40)
+
+    def test_output_size_command(self):
+        report = run_load(self.url, [output_command(100000)], duration=5, requests=3, concurrency=1)
+        self.assertEqual(report["error_rate"], 0.0)
+
+    def test_helpers(self):
+        self.assertEqual(parse_mix(["3:echo a", "1:ls -l"]), (["echo a", "ls -l"], [3.0, 1.0]))
+        with self.assertRaises(ValueError):
+            parse_mix(["echo a"])
+        self.assertIsNone(percentile([], 0.5))
+        self.assertEqual(percentile([1, 2, 3], 0.99), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import threading
+import urllib.request
+import xmlrpc.client
+from RPC_metrics import Histogram, Metrics, metrics
+from RPC_server import create_server
+
+class TestHistogram(unittest.TestCase):
+    def test_buckets_and_quantiles(self):
+        histogram = Histogram(buckets=(1, 2, 5))
+        for value in (0.5, 1.5, 1.7, 4, 10):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.sum, 17.7)
+        self.assertEqual(histogram.quantile(0.5), 2)
+        self.assertEqual(histogram.quantile(1.0), float("inf"))
+        self.assertIsNone(Histogram().quantile(0.5))
+
+class TestMetrics(unittest.TestCase):
+    def test_snapshot(self):
+        registry = Metrics(slow_threshold=1.0)
+        registry.record_call("run_command", 0.01, failed=False)
+        registry.record_call("run_command", 2.0, failed=True)
+        registry.inc("command_output_bytes_total", amount=2 ** 40)
+        snapshot = registry.snapshot({"rpc_in_flight": 3})
+        self.assertEqual(snapshot["histograms"]["rpc_request_duration_seconds"]["run_command"]["count"], 2)
+        self.assertEqual(snapshot["counters"]["rpc_errors_total"]["run_command"], 1)
+        # Too large for an XML-RPC int
+        self.assertIsInstance(snapshot["counters"]["command_output_bytes_total"][""], float)
+        self.assertEqual(snapshot["gauges"], {"rpc_in_flight": 3})
+        self.assertEqual([call["method"] for call in snapshot["slow_calls"]], ["run_command"])
+        xmlrpc.client.dumps((snapshot,), allow_none=True)
+
+    def test_prometheus_text(self):
+        registry = Metrics()
+        registry.describe("rpc_request_duration_seconds", "Time spent handling an RPC call")
+        registry.record_call("run_command", 0.003, failed=False)
+        text = registry.render_prometheus({"rpc_queue_depth": 0})
+        self.assertIn("# TYPE rpc_request_duration_seconds histogram", text)
+        self.assertIn('rpc_request_duration_seconds_bucket{method="run_command",le="0.005"} 1', text)
+        self.assertIn('rpc_request_duration_seconds_bucket{method="run_command",le="+Inf"} 1', text)
+        self.assertIn('rpc_request_duration_seconds_count{method="run_command"} 1', text)
+        self.assertIn("rpc_queue_depth 0", text)
+
+class TestServerMetrics(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.server = create_server("localhost", 0, workers=2, log_requests=False)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://localhost:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_get_metrics(self):
+        proxy = xmlrpc.client.ServerProxy(self.url)
+        for _ in range(3):
+            proxy.run_command("echo metrics")
+        with self.assertRaises(xmlrpc.client.Fault):
+            proxy.no_such_method()
+
+        snapshot = proxy.get_metrics()
+        self.assertEqual(snapshot["histograms"]["rpc_request_duration_seconds"]["run_command"]["count"], 3)
+        self.assertEqual(snapshot["histograms"]["command_spawn_seconds"][""]["count"], 3)
+        self.assertEqual(snapshot["counters"]["command_output_bytes_total"][""], 3 * len("metrics\n"))
+        self.assertEqual(snapshot["counters"]["rpc_errors_total"]["unknown"], 1)
+        self.assertEqual(snapshot["gauges"]["rpc_in_flight"], 1)  # The get_metrics call itself
+        self.assertIn("rpc_queue_depth", snapshot["gauges"])
+
+    def test_unknown_methods_share_one_series(self):
+        proxy = xmlrpc.client.ServerProxy(self.url)
+        with self.assertRaises(xmlrpc.client.Fault):
+            proxy.no_such_method_0()
+        with urllib.request.urlopen(self.url + "metrics") as response:
+            lines = len(response.read().splitlines())
+        for index in range(1, 50):
+            with self.assertRaises(xmlrpc.client.Fault):
+                getattr(proxy, f"no_such_method_{index}")()
+        with urllib.request.urlopen(self.url + "metrics") as response:
+            text = response.read().decode()
+        self.assertEqual(len(text.splitlines()), lines)
+        self.assertIn('rpc_errors_total{method="unknown"} 50', text)
+        self.assertNotIn("no_such_method", text)
+
+    def test_prometheus_endpoint(self):
+        xmlrpc.client.ServerProxy(self.url).run_command("echo metrics")
+        with urllib.request.urlopen(self.url + "metrics") as response:
+            text = response.read().decode()
+        self.assertIn('rpc_request_duration_seconds_count{method="run_command"} 1', text)
+        self.assertIn("command_exec_seconds_count 1", text)
+        self.assertIn("rpc_workers 2", text)
+
+if __name__ == "__main__":
+    unittest.main()
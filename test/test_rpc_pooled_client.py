@@ -0,0 +1,90 @@
+import unittest
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from RPC_server import create_server
+from RPC_client import PooledServerProxy
+
+class TestPooledServerProxy(unittest.TestCase):
+    def start_server(self, workers=8, queue_size=64):
+        server = create_server("localhost", 0, workers=workers, queue_size=queue_size, log_requests=False)
+        self.accepted = 0
+        get_request = server.get_request
+
+        def counting_get_request():
+            self.accepted += 1
+            return get_request()
+
+        server.get_request = counting_get_request
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+        return f"http://localhost:{server.server_address[1]}/"
+
+    def test_connection_is_reused(self):
+        url = self.start_server()
+        for wire_format in ("xml", "json"):
+            self.accepted = 0
+            proxy = PooledServerProxy(url, pool_size=1, wire_format=wire_format)
+            for i in range(20):
+                self.assertEqual(proxy.run_command(f"echo {i}")["stdout"].strip(), str(i))
+            self.assertEqual(self.accepted, 1)
+            proxy.close()
+
+    def test_shared_between_threads(self):
+        url = self.start_server()
+        proxy = PooledServerProxy(url, pool_size=8)
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            results = list(executor.map(lambda i: proxy.run_command(f"echo {i}"), range(200)))
+        self.assertEqual([r["stdout"].strip() for r in results], [str(i) for i in range(200)])
+        # Connections are only replaced when the server asks a client to give one up
+        self.assertLess(self.accepted, 50)
+        self.assertIn("run_command", proxy.system.listMethods())
+
+    def test_retries_when_server_is_busy(self):
+        url = self.start_server(workers=1, queue_size=1)
+        command = f'"{sys.executable}" -c "import time; time.sleep(0.2)"'
+
+        def call(_):
+            return PooledServerProxy(url, pool_size=1, retries=20, backoff=0.05).run_command(command)
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(call, range(5)))
+        self.assertTrue(all(r["returncode"] == 0 for r in results))
+
+    def test_idle_connection_does_not_hold_worker(self):
+        url = self.start_server(workers=1, queue_size=4)
+        idle = PooledServerProxy(url, pool_size=1)
+        self.addCleanup(idle.close)
+        self.assertEqual(idle.run_command("echo idle")["returncode"], 0)
+
+        other = PooledServerProxy(url, pool_size=1)
+        self.addCleanup(other.close)
+        start = time.monotonic()
+        self.assertEqual(other.run_command("echo other")["stdout"].strip(), "other")
+        self.assertLess(time.monotonic() - start, 1)
+        # The closed idle connection is replaced on the next call
+        self.assertEqual(idle.run_command("echo again")["stdout"].strip(), "again")
+
+    def test_failed_connection_is_closed(self):
+        for error in (ConnectionRefusedError, OSError):
+            connection = mock.Mock()
+            connection.run_command.side_effect = error
+            with mock.patch("RPC_client.make_proxy", return_value=connection):
+                proxy = PooledServerProxy("http://localhost:1/", pool_size=1, retries=1, backoff=0,
+                                          wire_format="json")
+                with self.assertRaises(error):
+                    proxy.run_command("echo")
+            self.assertEqual(connection.close.call_count, connection.run_command.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
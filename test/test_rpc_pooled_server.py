@@ -0,0 +1,83 @@
+import unittest
+import socket
+import sys
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from RPC_server import create_server, PooledXMLRPCServer
+
+SLEEP_COMMAND = f'"{sys.executable}" -c "import time; time.sleep(0.5)"'
+
+class TestPooledRPCServer(unittest.TestCase):
+    def start_server(self, workers, queue_size):
+        server = create_server("localhost", 0, workers=workers, queue_size=queue_size, log_requests=False)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+        return server, f"http://localhost:{server.server_address[1]}/"
+
+    def test_create_server_modes(self):
+        server, _ = self.start_server(workers=0, queue_size=1)
+        self.assertNotIsInstance(server, PooledXMLRPCServer)
+        server, _ = self.start_server(workers=2, queue_size=1)
+        self.assertIsInstance(server, PooledXMLRPCServer)
+
+    def test_requests_run_concurrently(self):
+        _, url = self.start_server(workers=8, queue_size=8)
+
+        def send_command():
+            return xmlrpc.client.ServerProxy(url).run_command(SLEEP_COMMAND)
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: send_command(), range(8)))
+        elapsed = time.monotonic() - start
+
+        for result in results:
+            self.assertEqual(result["returncode"], 0)
+        # Serially this would take at least 4 seconds
+        self.assertLess(elapsed, 2.5)
+
+    def test_full_queue_answers_503(self):
+        server, url = self.start_server(workers=1, queue_size=1)
+
+        def send_command():
+            try:
+                xmlrpc.client.ServerProxy(url).run_command(SLEEP_COMMAND)
+                return 200
+            except xmlrpc.client.ProtocolError as e:
+                return e.errcode
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            codes = list(executor.map(lambda _: send_command(), range(6)))
+
+        self.assertIn(200, codes)
+        self.assertIn(503, codes)
+        self.assertEqual(server.rejected, codes.count(503))
+
+    def test_silent_clients_do_not_stall_rejection(self):
+        server, url = self.start_server(workers=1, queue_size=1)
+        busy = threading.Thread(target=lambda: xmlrpc.client.ServerProxy(url).run_command(SLEEP_COMMAND))
+        busy.start()
+        self.addCleanup(busy.join)
+        time.sleep(0.2)
+
+        # The first connection fills the queue, the rest are rejected without sending anything
+        silent = [socket.create_connection(server.server_address) for _ in range(4)]
+        self.addCleanup(lambda: [s.close() for s in silent])
+        start = time.monotonic()
+        with self.assertRaises(xmlrpc.client.ProtocolError) as raised:
+            xmlrpc.client.ServerProxy(url).cache_stats()
+        self.assertEqual(raised.exception.errcode, 503)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(silent[1].recv(100).split(b"\r\n")[0], b"HTTP/1.1 503 Service Unavailable")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,11 @@
 import unittest
-import xmlrpc.client
 from concurrent.futures import ThreadPoolExecutor
+from RPC_client import PooledServerProxy
 
 class TestRPCServerStress(unittest.TestCase):
     def setUp(self):
-        self.proxy = xmlrpc.client.ServerProxy("http://localhost:8000/")
+        # ServerProxy is not thread-safe, the pooled proxy is
+        self.proxy = PooledServerProxy("http://localhost:8000/", pool_size=16)
 
     def test_stress(self):
         def send_command():
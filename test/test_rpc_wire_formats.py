@@ -0,0 +1,95 @@
+import unittest
+import http.client
+import json
+import sys
+import threading
+import xmlrpc.client
+from RPC_server import create_server
+from RPC_client import JSONRPCProxy, make_proxy, iter_output
+
+class TestJSONRPC(unittest.TestCase):
+    def setUp(self):
+        self.server = create_server("localhost", 0, workers=2, log_requests=False)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://localhost:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_run_command_same_result_in_both_formats(self):
+        command = "echo '<tag> & \"quotes\"'"
+        xml_result = make_proxy(self.url, "xml").run_command(command)
+        json_result = make_proxy(self.url, "json").run_command(command)
+        self.assertEqual(xml_result, json_result)
+        self.assertIn("<tag> &", json_result["stdout"])
+
+    def test_large_output_compressed(self):
+        command = f'"{sys.executable}" -c "print(\'x\' * 2000000)"'
+        for compress in (True, False):
+            result = JSONRPCProxy(self.url, compress=compress).run_command(command)
+            self.assertEqual(len(result["stdout"].strip()), 2000000)
+
+    def test_binary_results(self):
+        proxy = JSONRPCProxy(self.url)
+        job_id = proxy.stream_command("echo streamed")
+        self.assertEqual(b"".join(iter_output(proxy, job_id)).strip(), b"streamed")
+        proxy.release_job(job_id)
+
+    def test_dotted_methods_and_faults(self):
+        proxy = JSONRPCProxy(self.url)
+        self.assertIn("run_command", proxy.system.listMethods())
+        with self.assertRaises(xmlrpc.client.Fault):
+            proxy.no_such_method()
+        with self.assertRaises(xmlrpc.client.Fault):
+            proxy.read_output("unknown-job")
+
+    def post_json(self, body, content_length=None):
+        connection = http.client.HTTPConnection("localhost", self.server.server_address[1], timeout=10)
+        self.addCleanup(connection.close)
+        connection.putrequest("POST", "/RPC2")
+        connection.putheader("Content-Type", "application/json")
+        connection.putheader("Content-Length", content_length or str(len(body)))
+        connection.endheaders(body)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+    def test_invalid_content_length_is_server_error(self):
+        status, _ = self.post_json(b"{}", content_length="abc")
+        self.assertEqual(status, 500)
+
+    def test_unserializable_result_is_server_error(self):
+        self.server.register_function(lambda: object(), "make_object")
+        status, _ = self.post_json(b'{"jsonrpc":"2.0","method":"make_object","id":1}')
+        self.assertEqual(status, 500)
+
+    def test_notifications_get_no_response(self):
+        status, body = self.post_json(b'{"jsonrpc":"2.0","method":"system.listMethods"}')
+        self.assertEqual((status, body), (204, b""))
+
+        status, body = self.post_json(b'[{"jsonrpc":"2.0","method":"system.listMethods"},'
+                                      b'{"jsonrpc":"2.0","method":"no_such_method"}]')
+        self.assertEqual((status, body), (204, b""))
+
+        status, body = self.post_json(b'[{"jsonrpc":"2.0","method":"system.listMethods"},'
+                                      b'{"jsonrpc":"2.0","method":"system.listMethods","id":7}]')
+        self.assertEqual(status, 200)
+        response, = json.loads(body)
+        self.assertEqual(response["id"], 7)
+        self.assertIn("run_command", response["result"])
+
+    def test_empty_batch_is_invalid_request(self):
+        status, body = self.post_json(b"[]")
+        self.assertEqual(status, 200)
+        response = json.loads(body)
+        self.assertEqual(response["error"]["code"], -32600)
+        self.assertIsNone(response["id"])
+
+    def test_unknown_wire_format(self):
+        with self.assertRaises(ValueError):
+            make_proxy(self.url, "yaml")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import time
+
+try:
+    import paramiko
+    from ssh_server import SSHTestServer
+    from ssh_connection_to_remote_mashine import SSHConnect
+except ImportError:
+    paramiko = None
+
+@unittest.skipIf(paramiko is None, "paramiko is not installed")
+class TestMultiplexedChannels(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SSHTestServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def setUp(self):
+        self.ssh = SSHConnect.from_config(self.server.config())
+        self.ssh.connect(shell=False)
+        self.addCleanup(self.ssh.close)
+
+    def test_results_in_order(self):
+        commands = [f"sleep 0.{9 - i}; echo {i}; echo e{i} >&2; exit {i}" for i in range(10)]
+        results = self.ssh.run_many(commands, max_channels=10)
+        self.assertEqual(results, [{"stdout": f"{i}\n", "stderr": f"e{i}\n", "returncode": i}
+                                   for i in range(10)])
+
+    def test_commands_run_concurrently_on_one_connection(self):
+        connections = self.server.connections
+        start = time.perf_counter()
+        results = self.ssh.run_many(["sleep 0.5"] * 8, max_channels=8)
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertTrue(all(r["returncode"] == 0 for r in results))
+        self.assertEqual(self.server.connections, connections)
+
+    def test_channel_limit(self):
+        start = time.perf_counter()
+        self.ssh.run_many(["sleep 0.3"] * 6, max_channels=2)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.9)
+
+    def test_large_outputs(self):
+        results = self.ssh.run_many(["head -c 2000000 /dev/zero"] * 4 + ["head -c 2000000 /dev/zero >&2"])
+        self.assertEqual([len(r["stdout"]) for r in results], [2000000] * 4 + [0])
+        self.assertEqual(len(results[4]["stderr"]), 2000000)
+
+    def test_timeout_per_command(self):
+        results = self.ssh.run_many(["sleep 5", "echo quick"], timeout=0.5)
+        self.assertIn("did not finish", results[0]["error"])
+        self.assertEqual(results[1]["stdout"], "quick\n")
+        self.assertEqual(self.ssh.run_many([]), [])
+
+    def test_not_connected(self):
+        with self.assertRaises(ConnectionError):
+            SSHConnect.from_config(self.server.config()).run_many(["true"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import paramiko
+    import yaml
+    from ssh_server import SSHTestServer
+    from ssh_connection_to_remote_mashine import SSHConnect, SSHConnectionManager
+    from ssh_fanout import Inventory, fan_out
+except ImportError:
+    paramiko = None
+
+@unittest.skipIf(paramiko is None, "paramiko is not installed")
+class TestConnectionManager(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SSHTestServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def setUp(self):
+        self.manager = SSHConnectionManager(idle_timeout=60, keepalive=5)
+        self.addCleanup(self.manager.close_all)
+        self.config = self.server.config()
+
+    def test_connection_is_reused(self):
+        connections = self.server.connections
+        first = self.manager.get(self.config)
+        second = self.manager.get(dict(self.config))
+        self.assertIs(first, second)
+        self.assertEqual(second.run("echo hi")["stdout"], "hi\n")
+        self.assertEqual(self.server.connections - connections, 1)
+        stats = self.manager.stats()
+        self.assertEqual((stats["connects"], stats["hits"], stats["open"]), (1, 1, 1))
+
+    def test_keys_separate_users_and_ports(self):
+        other = SSHTestServer()
+        self.addCleanup(other.close)
+        a = self.manager.get(self.config)
+        b = self.manager.get(other.config())
+        self.assertIsNot(a, b)
+        self.assertEqual(self.manager.key(self.config), ("127.0.0.1", self.server.port, "test"))
+
+    def test_dead_connection_is_replaced(self):
+        first = self.manager.get(self.config)
+        first.ssh_client.get_transport().close()
+        second = self.manager.get(self.config)
+        self.assertIsNot(first, second)
+        self.assertTrue(second.is_active())
+        self.assertEqual(self.manager.stats()["reconnects"], 1)
+
+    def test_idle_connections_are_evicted(self):
+        self.manager.idle_timeout = 0.2
+        ssh = self.manager.get(self.config)
+        self.manager.release(ssh)
+        with self.manager.connection(self.config) as in_use:
+            time.sleep(0.3)
+            self.manager.evict_idle()
+            self.assertTrue(in_use.is_active())  # in use, not idle
+        time.sleep(0.3)
+        self.manager.evict_idle()
+        self.assertFalse(ssh.is_active())
+        self.assertEqual(self.manager.stats()["evictions"], 1)
+        self.assertEqual(self.manager.stats()["open"], 0)
+        self.assertEqual(self.manager._connections, {})
+
+    def test_held_connection_is_not_evicted(self):
+        self.manager.idle_timeout = 0
+        first = self.manager.get(self.config)
+        second = self.manager.get(self.config)
+        self.manager.evict_idle()
+        self.assertTrue(first.is_active())
+        self.manager.release(first)
+        self.manager.evict_idle()
+        self.assertTrue(second.is_active())  # still held by the second get()
+        self.manager.release(second)
+        self.manager.evict_idle()
+        self.assertFalse(second.is_active())
+        self.assertEqual(self.manager._connections, {})
+        self.assertIsNot(self.manager.get(self.config), first)
+
+    def test_concurrent_callers_share_one_handshake(self):
+        connections = self.server.connections
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            clients = list(pool.map(lambda _: self.manager.get(self.config), range(8)))
+        self.assertEqual(len({id(c) for c in clients}), 1)
+        self.assertEqual(self.server.connections - connections, 1)
+
+    def test_keepalive(self):
+        manager = SSHConnectionManager(idle_timeout=60, keepalive=0.5)
+        self.addCleanup(manager.close_all)
+        requests = len(self.server.global_requests)
+        manager.get(self.config)
+        deadline = time.monotonic() + 5
+        while "keepalive@lag.net" not in self.server.global_requests[requests:]:
+            self.assertLess(time.monotonic(), deadline, "no keepalive sent on an idle connection")
+            time.sleep(0.1)
+
+    def test_fan_out_reuses_connections(self):
+        inventory = Inventory({f"h{i}": self.config for i in range(4)})
+        connections = self.server.connections
+        for _ in range(3):
+            results = list(fan_out(inventory, "echo ok", manager=self.manager))
+            self.assertTrue(all(r["stdout"] == "ok\n" for r in results))
+        # The four hosts share a key here, so one connection serves all runs
+        self.assertEqual(self.server.connections - connections, 1)
+
+    def test_create_client_reuse(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as file:
+            yaml.safe_dump(self.config, file)
+        self.addCleanup(os.remove, file.name)
+        import ssh_connection_to_remote_mashine as module
+        self.addCleanup(module.connection_manager.close_all)
+        first = SSHConnect.create_client(file.name, reuse=True)
+        self.assertIs(SSHConnect.create_client(file.name, reuse=True), first)
+        idle_timeout = module.connection_manager.idle_timeout
+        self.addCleanup(setattr, module.connection_manager, "idle_timeout", idle_timeout)
+        module.connection_manager.idle_timeout = 0
+        module.connection_manager.evict_idle()
+        self.assertTrue(first.get_transport().is_active())  # pinned by its callers
+        fresh = SSHConnect.create_client(file.name)
+        self.addCleanup(fresh.close)
+        self.assertIsNot(fresh, first)
+
+if __name__ == "__main__":
+    unittest.main()
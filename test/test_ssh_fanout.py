@@ -0,0 +1,114 @@
+import unittest
+import os
+import tempfile
+import time
+
+try:
+    import paramiko
+    from ssh_server import SSHTestServer
+    from ssh_connection_to_remote_mashine import SSHConnect
+    from ssh_fanout import Inventory, fan_out
+except ImportError:
+    paramiko = None
+
+INVENTORY = """
+defaults:
+  username: test
+  password: secret
+hosts:
+  web1: {hostname: 127.0.0.1}
+  web2: 127.0.0.1
+  db1: {hostname: 127.0.0.1}
+groups:
+  web: [web1, web2]
+  servers: [web, db1]
+"""
+
+@unittest.skipIf(paramiko is None, "paramiko is not installed")
+class TestInventory(unittest.TestCase):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as file:
+            file.write(INVENTORY)
+        self.addCleanup(os.remove, file.name)
+        self.inventory = Inventory.load(file.name)
+
+    def test_defaults_and_shorthand(self):
+        self.assertEqual(self.inventory.config("web2"),
+                         {"hostname": "127.0.0.1", "username": "test", "password": "secret"})
+
+    def test_select(self):
+        self.assertEqual(self.inventory.select(), ["web1", "web2", "db1"])
+        self.assertEqual(self.inventory.select(["web"]), ["web1", "web2"])
+        self.assertEqual(self.inventory.select(["servers"]), ["web1", "web2", "db1"])
+        self.assertEqual(self.inventory.select(["db*", "web2"]), ["web2", "db1"])
+        with self.assertRaises(ValueError):
+            self.inventory.select(["missing"])
+
+    def test_recursive_group(self):
+        inventory = Inventory({"a": "x"}, {"g": ["h"], "h": ["g"]})
+        with self.assertRaises(ValueError):
+            inventory.select(["g"])
+
+@unittest.skipIf(paramiko is None, "paramiko is not installed")
+class TestFanOut(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SSHTestServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def test_run_on_one_host(self):
+        ssh = SSHConnect.from_config(self.server.config())
+        ssh.connect(shell=False)
+        self.addCleanup(ssh.close)
+        self.assertEqual(ssh.run("echo out; echo err >&2; exit 4"),
+                         {"stdout": "out\n", "stderr": "err\n", "returncode": 4})
+        # Large output on both streams at once must not stall
+        result = ssh.run("head -c 3000000 /dev/zero; head -c 3000000 /dev/zero >&2")
+        self.assertEqual((len(result["stdout"]), len(result["stderr"])), (3000000, 3000000))
+        with self.assertRaises(TimeoutError):
+            ssh.run("sleep 5", timeout=0.3)
+
+    def test_results_stream_in_completion_order(self):
+        slow_server = SSHTestServer(delay=1)
+        self.addCleanup(slow_server.close)
+        hosts = {f"h{i}": self.server.config() for i in range(12)}
+        hosts["slow"] = slow_server.config()
+        inventory = Inventory(hosts)
+
+        start = time.perf_counter()
+        results = []
+        for result in fan_out(inventory, "echo done", max_workers=13):
+            result["received"] = time.perf_counter() - start
+            results.append(result)
+        self.assertEqual(len(results), 13)
+        self.assertTrue(all(r["returncode"] == 0 and r["stdout"] == "done\n" for r in results))
+        self.assertEqual(results[-1]["host"], "slow")
+        self.assertGreaterEqual(results[-1]["connect_seconds"], 1)
+        # Fast hosts are reported before the slow one finishes
+        self.assertLess(results[0]["received"], 1)
+        for result in results:
+            self.assertGreaterEqual(result["seconds"], result["connect_seconds"])
+
+    def test_errors_are_reported_per_host(self):
+        good = self.server.config()
+        bad = self.server.config(password="wrong")
+        inventory = Inventory({"good": good, "bad": bad, "down": self.server.config(port=1, timeout=2)})
+        results = {r["host"]: r for r in fan_out(inventory, "echo hi", max_workers=3)}
+        self.assertEqual(results["good"]["stdout"], "hi\n")
+        self.assertIn("Authentication failed", results["bad"]["error"])
+        self.assertIn("error", results["down"])
+        self.assertIsNone(results["down"]["connect_seconds"])
+
+    def test_concurrency_is_bounded(self):
+        config = self.server.config()
+        inventory = Inventory({f"h{i}": config for i in range(6)})
+        start = time.perf_counter()
+        list(fan_out(inventory, "sleep 0.5", max_workers=2))
+        # Three rounds of two hosts
+        self.assertGreaterEqual(time.perf_counter() - start, 1.5)
+
+if __name__ == "__main__":
+    unittest.main()
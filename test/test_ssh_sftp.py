@@ -0,0 +1,104 @@
+import unittest
+import os
+import tempfile
+
+try:
+    import paramiko
+    from ssh_server import SSHTestServer
+    from ssh_connection_to_remote_mashine import SSHConnect
+except ImportError:
+    paramiko = None
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+def read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+@unittest.skipIf(paramiko is None, "paramiko is not installed")
+class TestSFTP(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SSHTestServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def setUp(self):
+        self.ssh = SSHConnect.from_config(self.server.config())
+        self.ssh.connect(shell=False)
+        self.addCleanup(self.ssh.close)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # The test server maps remote paths to the local file system
+        self.local = os.path.join(directory.name, "local")
+        self.remote = os.path.join(directory.name, "remote")
+        os.makedirs(self.local)
+        os.makedirs(self.remote)
+
+    def test_upload_and_download(self):
+        data = os.urandom(5 * 1024 * 1024 + 3)
+        write(os.path.join(self.local, "bundle.tar"), data)
+        os.utime(os.path.join(self.local, "bundle.tar"), (1000000000, 1000000000))
+        progress = []
+        size = self.ssh.upload(os.path.join(self.local, "bundle.tar"), os.path.join(self.remote, "bundle.tar"),
+                               lambda done, total: progress.append((done, total)))
+        self.assertEqual(size, len(data))
+        self.assertEqual(read(os.path.join(self.remote, "bundle.tar")), data)
+        self.assertEqual(os.path.getmtime(os.path.join(self.remote, "bundle.tar")), 1000000000)
+        self.assertEqual(progress[-1], (len(data), len(data)))
+
+        self.ssh.download(os.path.join(self.remote, "bundle.tar"), os.path.join(self.local, "copy.tar"))
+        self.assertEqual(read(os.path.join(self.local, "copy.tar")), data)
+        self.assertFalse(os.path.exists(os.path.join(self.local, "copy.tar.part")))
+
+    def test_transfer_many(self):
+        files = {f"f{i}.log": os.urandom(100000 + i) for i in range(10)}
+        for name, data in files.items():
+            write(os.path.join(self.remote, name), data)
+        pairs = [(os.path.join(self.local, name), os.path.join(self.remote, name)) for name in files]
+        seen = set()
+        total = self.ssh.transfer_many(pairs, "download", workers=4,
+                                       progress=lambda path, done, size: seen.add(os.path.basename(path)))
+        self.assertEqual(total, sum(len(d) for d in files.values()))
+        self.assertEqual(seen, set(files))
+        for name, data in files.items():
+            self.assertEqual(read(os.path.join(self.local, name)), data)
+        with self.assertRaises(FileNotFoundError):
+            self.ssh.transfer_many([(os.path.join(self.local, "x"), os.path.join(self.remote, "missing"))],
+                                   "download")
+
+    def test_sync_upload_skips_unchanged(self):
+        write(os.path.join(self.local, "a.txt"), b"a" * 10)
+        write(os.path.join(self.local, "sub", "deeper", "b.txt"), b"b" * 20)
+        target = os.path.join(self.remote, "sync")
+        result = self.ssh.sync_directory(self.local, target)
+        self.assertEqual(result["transferred"], ["a.txt", "sub/deeper/b.txt"])
+        self.assertEqual(result["bytes"], 30)
+        self.assertEqual(read(os.path.join(target, "sub", "deeper", "b.txt")), b"b" * 20)
+
+        write(os.path.join(self.local, "a.txt"), b"A" * 10)
+        os.utime(os.path.join(self.local, "a.txt"), (2000000000, 2000000000))
+        result = self.ssh.sync_directory(self.local, target)
+        self.assertEqual(result["transferred"], ["a.txt"])
+        self.assertEqual(result["skipped"], ["sub/deeper/b.txt"])
+        self.assertEqual(read(os.path.join(target, "a.txt")), b"A" * 10)
+
+    def test_sync_by_hash(self):
+        write(os.path.join(self.local, "same.bin"), b"same")
+        write(os.path.join(self.local, "diff.bin"), b"new!")
+        write(os.path.join(self.remote, "same.bin"), b"same")
+        write(os.path.join(self.remote, "diff.bin"), b"old!")
+        write(os.path.join(self.remote, "only remote.bin"), b"r")
+        result = self.ssh.sync_directory(self.local, self.remote, direction="download", compare="hash")
+        self.assertEqual(result["transferred"], ["diff.bin", "only remote.bin"])
+        self.assertEqual(result["skipped"], ["same.bin"])
+        self.assertEqual(read(os.path.join(self.local, "diff.bin")), b"old!")
+        self.assertEqual(read(os.path.join(self.local, "only remote.bin")), b"r")
+
+if __name__ == "__main__":
+    unittest.main()
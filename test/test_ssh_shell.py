@@ -0,0 +1,89 @@
+import unittest
+import io
+import shutil
+import time
+
+try:
+    import paramiko
+    from ssh_server import SSHTestServer
+    from ssh_connection_to_remote_mashine import SSHConnect
+except ImportError:
+    paramiko = None
+
+@unittest.skipIf(paramiko is None, "paramiko is not installed")
+class TestShellReader(unittest.TestCase):
+    """The client asks for a pseudo-terminal, so the shell echoes input and prints prompts"""
+    shell = ["/bin/sh"]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SSHTestServer(shell=cls.shell)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def setUp(self):
+        self.ssh = SSHConnect.from_config(self.server.config())
+        self.ssh.connect()
+        self.addCleanup(self.ssh.close)
+
+    def test_output_and_exit_code(self):
+        self.assertEqual(self.ssh.execute("echo hello; exit_code() { return 3; }; exit_code"), 3)
+        self.assertEqual(self.ssh.buffer, "hello\n")
+        self.assertEqual(self.ssh.execute("printf 'no newline'"), 0)
+        self.assertEqual(self.ssh.buffer, "no newline")
+        self.assertEqual(self.ssh.execute("echo oops >&2; false"), 1)
+        self.assertEqual(self.ssh.buffer, "oops\n")
+        self.assertNotEqual(self.ssh.execute("invalid_command_xyz"), 0)
+
+    def test_quotes_and_multiple_lines(self):
+        self.assertEqual(self.ssh.execute("echo 'it'\\''s'\nfor i in 1 2; do\n  echo $i\ndone"), 0)
+        self.assertEqual(self.ssh.buffer, "it's\n1\n2\n")
+
+    def test_large_output_is_complete(self):
+        output = io.BytesIO()
+        self.assertEqual(self.ssh.execute("seq 1 300000", output), 0)
+        expected = "".join(f"{i}\n" for i in range(1, 300001)).encode()
+        self.assertEqual(output.getvalue(), expected)
+
+    def test_output_is_streamed(self):
+        arrivals = []
+        start = time.monotonic()
+        self.ssh.execute("echo first; sleep 1; echo second",
+                         lambda data: arrivals.append((time.monotonic() - start, data)))
+        self.assertEqual(b"".join(data for _, data in arrivals), b"first\nsecond\n")
+        self.assertLess(arrivals[0][0], 0.9)
+
+    def test_shell_state_carries_over(self):
+        self.ssh.execute("cd /tmp && FOO=bar")
+        self.ssh.execute("echo $FOO; pwd")
+        self.assertEqual(self.ssh.buffer, "bar\n/tmp\n")
+
+    def test_timeout(self):
+        with self.assertRaises(TimeoutError):
+            self.ssh.execute("sleep 2", timeout=0.3)
+
+    def test_read_until_prompt(self):
+        self.ssh.execute("true")
+        self.ssh.send_cmd("PS1='myhost> '; echo line1")
+        text = self.ssh.read_until(r"myhost> $", timeout=5)
+        # Earlier prompts come before, the command is not echoed once execute has run
+        self.assertIn("line1\n", text)
+        self.assertTrue(text.endswith("myhost> "), text)
+        self.assertNotIn("echo", text)
+        # Output after the prompt is kept for the next command
+        self.assertEqual(self.ssh.execute("echo next"), 0)
+        self.assertEqual(self.ssh.buffer, "next\n")
+
+    def test_closed_shell(self):
+        with self.assertRaises(ConnectionError):
+            self.ssh.execute("exit 0", timeout=5)
+
+@unittest.skipIf(paramiko is None or shutil.which("bash") is None, "paramiko or bash is not installed")
+class TestBashShellReader(TestShellReader):
+    """bash reads input with readline, which echoes lines and sends bracketed paste escapes itself"""
+    shell = [shutil.which("bash"), "--norc"]
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import random
+from IntervalTree import IntervalTree
+from RedBlackTree import Color
+
+class TestIntervalTree(unittest.TestCase):
+    def setUp(self):
+        """Set up a new tree before each test"""
+        self.tree = IntervalTree()
+
+    def test_insert_and_point_query(self):
+        """Test point queries against a few overlapping ranges"""
+        self.tree.insert(0, 10, "a")
+        self.tree.insert(5, 15, "b")
+        self.tree.insert(20, 30, "c")
+        self.assertEqual(self.tree.overlap(7), [(0, 10, "a"), (5, 15, "b")])
+        self.assertEqual(self.tree.overlap(20), [(20, 30, "c")])
+        self.assertEqual(self.tree.overlap(17), [])
+
+    def test_range_query_closed_endpoints(self):
+        """Test that touching endpoints count as overlap"""
+        self.tree.insert(0, 10)
+        self.tree.insert(11, 20)
+        self.assertEqual(self.tree.overlap(10, 11), [(0, 10, None), (11, 20, None)])
+        self.assertEqual(self.tree.overlap(21, 40), [])
+
+    def test_insert_duplicate_replaces_value(self):
+        """Test re-inserting an interval replaces its value"""
+        self.tree.insert(1, 2, "old")
+        self.tree.insert(1, 2, "new")
+        self.assertEqual(self.tree.intervals(), [(1, 2, "new")])
+
+    def test_invalid_interval(self):
+        """Test that invalid intervals are rejected"""
+        with self.assertRaises(ValueError):
+            self.tree.insert(5, 1)
+        with self.assertRaises(ValueError):
+            self.tree.insert(None, 1)
+        with self.assertRaises(ValueError):
+            self.tree.overlap(5, 1)
+
+    def test_delete(self):
+        """Test that deleted intervals are no longer reported"""
+        self.tree.insert(0, 100)
+        self.tree.insert(10, 20)
+        self.tree.delete(0, 100)
+        self.assertEqual(self.tree.overlap(50), [])
+        self.assertEqual(self.tree.overlap(15), [(10, 20, None)])
+        self.tree.delete(42, 43)  # Should not raise any error
+
+    def test_random_operations_match_linear_scan(self):
+        """Test inserts, deletes and queries against a brute-force list"""
+        rng = random.Random(1234)
+        expected = {}
+        for _ in range(2000):
+            lo = rng.randint(0, 1000)
+            hi = lo + rng.randint(0, 50)
+            if expected and rng.random() < 0.3:
+                lo, hi = rng.choice(list(expected))
+                self.tree.delete(lo, hi)
+                del expected[(lo, hi)]
+            else:
+                self.tree.insert(lo, hi, lo * hi)
+                expected[(lo, hi)] = lo * hi
+        self._assert_valid(self.tree)
+        for _ in range(200):
+            lo = rng.randint(-10, 1060)
+            hi = lo + rng.randint(0, 30)
+            brute = sorted((a, b, v) for (a, b), v in expected.items() if a <= hi and b >= lo)
+            self.assertEqual(self.tree.overlap(lo, hi), brute)
+
+    def test_from_sorted(self):
+        """Test bulk construction produces a valid tree for many sizes"""
+        for n in range(0, 130):
+            intervals = [(i * 10, i * 10 + 15, i) for i in range(n)]
+            tree = IntervalTree.from_sorted(intervals)
+            self._assert_valid(tree)
+            self.assertEqual(tree.intervals(), intervals)
+
+        tree = IntervalTree.from_sorted([(0, 5), (3, 4), (10, 12)])
+        self.assertEqual(tree.overlap(4), [(0, 5, None), (3, 4, None)])
+        tree.insert(4, 11, "late")
+        tree.delete(0, 5)
+        self._assert_valid(tree)
+        self.assertEqual(tree.overlap(4), [(3, 4, None), (4, 11, "late")])
+
+    def test_from_sorted_unsorted(self):
+        """Test bulk construction rejects unsorted or duplicate input"""
+        with self.assertRaises(ValueError):
+            IntervalTree.from_sorted([(5, 6), (1, 2)])
+        with self.assertRaises(ValueError):
+            IntervalTree.from_sorted([(1, 2), (1, 2)])
+
+    def _assert_valid(self, tree):
+        """Helper method to verify Red-Black properties and max augmentation"""
+        if tree.root != tree.NIL:
+            self.assertEqual(tree.root.color, Color.BLACK)
+        self._check_node(tree, tree.root)
+
+    def _check_node(self, tree, node):
+        """Return (black height, subtree max) after checking node invariants"""
+        if node == tree.NIL:
+            return 1, None
+        if node.color == Color.RED:
+            self.assertEqual(node.left.color, Color.BLACK)
+            self.assertEqual(node.right.color, Color.BLACK)
+        left_height, left_max = self._check_node(tree, node.left)
+        right_height, right_max = self._check_node(tree, node.right)
+        self.assertEqual(left_height, right_height)
+        expected_max = max(m for m in (node.key[1], left_max, right_max) if m is not None)
+        self.assertEqual(node.max, expected_max)
+        return left_height + (node.color == Color.BLACK), expected_max
+
+if __name__ == '__main__':
+    unittest.main()